@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Latência e vazão de ponta a ponta: batida na serial -> send_message do MIDI.
+
+O simulador (edrum_simulator.py) gera batidas em um pseudo-terminal e anota o
+instante de cada escrita; do outro lado roda o mesmo loop da ponte headless
+(SerialReader + SerialFrameParser + MidiRouter) com uma saída MIDI que apenas
+registra o instante de cada send_message. Como a serial preserva a ordem, a
+n-ésima mensagem enviada corresponde à n-ésima batida gerada.
+
+Mede, para cada modo de leitura:
+  - latência serial -> MIDI (p50/p99/max) a uma taxa fixa
+  - maior taxa sustentada: a maior taxa da rampa sem perdas e com p99 abaixo
+    de --max-p99-ms
+  - CPU do thread de leitura por batida
+
+O pty não tem limite de baud rate; a taxa máxima de uma porta real a 115200
+baud (3 bytes por batida) aparece em link_limit_hits_per_s. O simulador roda
+no mesmo processo, então os números incluem a disputa pelo GIL entre os dois.
+
+Uso: python3 benchmarks/bench_latency.py [--rate 200] [--duration 3] [--json]
+     python3 benchmarks/bench_latency.py --json --output atual.json --compare base.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serial
+
+from bridge import HeadlessBridge
+from edrum_simulator import VirtualEDrum
+from kit import pinArray
+from midi_router import MidiRouter, TARGET_MIDI
+from protocol import SERIAL_SPEED
+from serial_reader import READER_MODE_EVENT, READER_MODE_POLL
+
+RAMP = (500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# Limite de uma porta real: 10 bits por byte (start + 8 + stop), 3 bytes por batida
+LINK_LIMIT = SERIAL_SPEED // 10 // 3
+
+
+class CaptureMidiOut:
+    """Saída MIDI que só registra o instante de cada mensagem"""
+
+    def __init__(self):
+        self.times = []
+
+    def send_message(self, message):
+        self.times.append(time.perf_counter())
+
+    def close_port(self):
+        pass
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_stream(mode, rate, duration, jitter=0.0, running_status=False):
+    """Gera batidas a ``rate`` por ``duration`` segundos e mede o que saiu no MIDI"""
+    sim = VirtualEDrum(pinArray(), seed=1, running_status=running_status)
+    sim.hit_log = []
+    sim.start()
+    ser = serial.Serial(sim.port, baudrate=SERIAL_SPEED)
+    midi_out = CaptureMidiOut()
+    router = MidiRouter(midi_out)
+    router.set_target(TARGET_MIDI)
+    bridge = HeadlessBridge(ser, router, pinArray(), mode)
+    bridge.log = lambda message: None
+    cpu = {}
+
+    def reader_thread():
+        cpu0 = time.thread_time()
+        bridge.run()
+        cpu['reader'] = time.thread_time() - cpu0
+
+    thread = threading.Thread(target=reader_thread, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    sim.start_hits(rate, jitter, duration=duration, notes=[36, 38, 42, 46, 49]).join()
+    # Espera as últimas batidas atravessarem a ponte
+    sent = len(sim.hit_log)
+    deadline = time.perf_counter() + 2.0
+    while len(midi_out.times) < sent and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    bridge.stop()
+    thread.join(2.0)
+    ser.close()
+    sim.close()
+
+    received = midi_out.times[:sent]
+    latencies = sorted((t_out - t_in) * 1e6 for (t_in, *_), t_out in zip(sim.hit_log, received))
+    generated = (sim.hit_log[-1][0] - sim.hit_log[0][0]) if sent > 1 else duration
+    return {
+        'mode': bridge.reader.mode,
+        'rate': rate,
+        'sent': sent,
+        'received': len(received),
+        'dropped': sent - len(received),
+        'framing_errors': sum(bridge.parser.errors.values()),
+        'generated_hits_per_s': round(sent / generated, 1) if generated else None,
+        'latency_us_p50': round(statistics.median(latencies), 1) if latencies else None,
+        'latency_us_p99': round(percentile(latencies, 0.99), 1) if latencies else None,
+        'latency_us_max': round(latencies[-1], 1) if latencies else None,
+        'cpu_us_per_hit': round(cpu.get('reader', 0.0) / len(received) * 1e6, 2) if received else None,
+    }
+
+
+def run_mode(mode, rate, duration, jitter, ramp_duration, max_p99_ms, running_status=False):
+    result = run_stream(mode, rate, duration, jitter, running_status)
+    sustained = 0
+    ramp = []
+    for ramp_rate in RAMP:
+        step = run_stream(mode, ramp_rate, ramp_duration, running_status=running_status)
+        ramp.append({k: step[k] for k in ('rate', 'generated_hits_per_s', 'dropped', 'latency_us_p99', 'cpu_us_per_hit')})
+        ok = step['dropped'] == 0 and step['latency_us_p99'] is not None \
+            and step['latency_us_p99'] <= max_p99_ms * 1000
+        if not ok:
+            break
+        sustained = ramp_rate
+    result['max_sustained_hits_per_s'] = sustained
+    result['link_limit_hits_per_s'] = LINK_LIMIT
+    result['ramp'] = ramp
+    return result
+
+
+# Métricas comparadas com --compare: (nome, True se maior é melhor)
+COMPARED = (
+    ('latency_us_p50', False),
+    ('latency_us_p99', False),
+    ('cpu_us_per_hit', False),
+    ('max_sustained_hits_per_s', True),
+)
+
+
+def compare(results, baseline, tolerance):
+    """Lista as métricas que pioraram mais que ``tolerance`` em relação à base"""
+    base = {r['mode']: r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get(r['mode'])
+        if b is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            old, new = b.get(key), r.get(key)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{r['mode']}: {key} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=200, help='batidas por segundo na medição de latência')
+    parser.add_argument('--duration', type=float, default=3.0, help='segundos da medição de latência')
+    parser.add_argument('--jitter', type=float, default=0.2, help='variação relativa do intervalo entre batidas')
+    parser.add_argument('--ramp-duration', type=float, default=1.0, help='segundos de cada degrau da rampa de vazão')
+    parser.add_argument('--max-p99-ms', type=float, default=5.0, help='p99 máximo para considerar uma taxa sustentada')
+    parser.add_argument('--modes', nargs='+', choices=(READER_MODE_EVENT, READER_MODE_POLL),
+                        default=(READER_MODE_EVENT, READER_MODE_POLL))
+    parser.add_argument('--running-status', action='store_true', help='simulador envia as batidas com running status')
+    parser.add_argument('--json', action='store_true', help='saída em JSON')
+    parser.add_argument('--output', help='grava os resultados em JSON neste arquivo')
+    parser.add_argument('--compare', metavar='BASE', help='compara com um JSON anterior; sai com código 1 se piorar')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='piora relativa tolerada por --compare')
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args.rate, args.duration, args.jitter, args.ramp_duration, args.max_p99_ms,
+                        args.running_status)
+               for mode in args.modes]
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'modo':<8}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'perdas':>8}{'CPU us/batida':>15}{'máx batidas/s':>15}")
+        for r in results:
+            print(f"{r['mode']:<8}{r['latency_us_p50']:>10}{r['latency_us_p99']:>10}{r['latency_us_max']:>10}"
+                  f"{r['dropped']:>8}{r['cpu_us_per_hit']:>15}{r['max_sustained_hits_per_s']:>15}")
+        print(f"Limite de uma porta real a {SERIAL_SPEED} baud: {LINK_LIMIT} batidas/s")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regressão: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
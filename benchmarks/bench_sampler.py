@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Vazão da mixagem do sampler interno (sampler.py), sem hardware de áudio.
+
+Para cada quantidade de vozes, dispara batidas suficientes para manter todas
+as vozes ocupadas (amostras sintéticas longas) e renderiza --seconds de áudio
+offline, medindo o tempo de CPU do processo. Mede:
+  - fator de tempo real: segundos de áudio por segundo de CPU
+  - CPU por bloco (µs) e a fração do prazo de um bloco que ela ocupa
+  - vozes por núcleo: vozes x fator de tempo real, estimativa de quantas
+    vozes um núcleo mixaria no limite
+
+Uso: python3 benchmarks/bench_sampler.py [--voices 16 64 256] [--block 128] [--json]
+     python3 benchmarks/bench_sampler.py --wav render.wav
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sampler import BLOCK_SIZE, SAMPLE_RATE, Sampler, synthetic_kit, write_wav
+
+VOICES = (8, 16, 32, 64, 128, 256)
+
+# Fração do prazo de um bloco que a mixagem pode ocupar em tempo real
+REALTIME_BUDGET = 0.5
+
+
+def run(voices, block, seconds, wav=None):
+    sampler = Sampler(voices=voices, block=block)
+    # Amostras mais longas que a renderização: nenhuma voz termina antes do fim
+    synthetic_kit(sampler, seconds=seconds + 1.0, round_robin=4)
+    notes = sampler.notes()
+    for i in range(voices):
+        sampler.note_on(notes[i % len(notes)], 127 if i % 2 else 64)
+
+    blocks = int(seconds * SAMPLE_RATE) // block
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    rendered = []
+    for _ in range(blocks):
+        chunk = sampler.render_block()
+        if wav:
+            rendered.append(chunk.copy())
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    if wav:
+        write_wav(wav, np.concatenate(rendered))
+
+    audio = blocks * block / SAMPLE_RATE
+    realtime = audio / cpu if cpu else float('inf')
+    block_us = cpu / blocks * 1e6
+    deadline_us = block / SAMPLE_RATE * 1e6
+    return {
+        'voices': voices,
+        'block': block,
+        'active_voices': sampler.active_voices,
+        'audio_s': round(audio, 2),
+        'cpu_s': round(cpu, 3),
+        'wall_s': round(wall, 3),
+        'realtime_factor': round(realtime, 1),
+        'cpu_us_per_block': round(block_us, 1),
+        'deadline_fraction': round(block_us / deadline_us, 3),
+        'voices_per_core': int(voices * realtime),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--voices', type=int, nargs='+', default=VOICES, help='quantidades de vozes medidas')
+    parser.add_argument('--block', type=int, default=BLOCK_SIZE, help='frames por bloco')
+    parser.add_argument('--seconds', type=float, default=5.0, help='segundos de áudio renderizados por medição')
+    parser.add_argument('--wav', metavar='ARQUIVO', help='grava a renderização da maior quantidade de vozes')
+    parser.add_argument('--json', action='store_true', help='saída em JSON')
+    args = parser.parse_args()
+
+    results = []
+    for i, voices in enumerate(args.voices):
+        wav = args.wav if args.wav and i == len(args.voices) - 1 else None
+        results.append(run(voices, args.block, args.seconds, wav))
+    sustained = max((r['voices'] for r in results if r['deadline_fraction'] <= REALTIME_BUDGET), default=0)
+
+    if args.json:
+        print(json.dumps({'results': results, 'max_voices_realtime': sustained,
+                          'realtime_budget': REALTIME_BUDGET}, indent=2))
+    else:
+        print(f"{'vozes':>6}{'tempo real':>12}{'us/bloco':>10}{'prazo':>8}{'vozes/núcleo':>14}")
+        for r in results:
+            print(f"{r['voices']:>6}{r['realtime_factor']:>11}x{r['cpu_us_per_block']:>10}"
+                  f"{r['deadline_fraction']:>8.1%}{r['voices_per_core']:>14}")
+        print(f"Bloco de {args.block} frames ({args.block / SAMPLE_RATE * 1000:.1f} ms a {SAMPLE_RATE} Hz); "
+              f"maior quantidade medida dentro de {REALTIME_BUDGET:.0%} do prazo: {sustained} vozes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
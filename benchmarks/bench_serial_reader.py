@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compara o modo de leitura "poll" (loop antigo de 1 ms) com o modo "event"
+(select/epoll) usando um pseudo-terminal no lugar do Arduino.
+
+Mede, para cada modo:
+  - CPU consumida pelo processo com a porta ociosa (% de um núcleo)
+  - latência entre a escrita de um byte no pty e o retorno do leitor
+
+Uso: python3 benchmarks/bench_serial_reader.py [--idle 3] [--samples 200] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serial
+
+from serial_parser import SerialFrameParser
+from serial_reader import SerialReader, READER_MODE_EVENT, READER_MODE_POLL
+
+
+def run_mode(mode, idle_seconds, samples):
+    master, slave = os.openpty()
+    ser = serial.Serial(os.ttyname(slave), baudrate=115200)
+    parser = SerialFrameParser()
+    reader = SerialReader(ser, parser, mode)
+    running = True
+    arrivals = []
+    arrived = threading.Event()
+
+    def loop():
+        while running:
+            if reader.fill() > 0:
+                arrivals.append(time.perf_counter())
+                for _ in parser.frames():
+                    pass
+                arrived.set()
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    # CPU ociosa: nenhum byte chega durante o intervalo
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu0) / (time.perf_counter() - wall0) * 100.0
+
+    # Latência de despertar: um frame de nota por vez, com a porta ociosa entre eles
+    latencies = []
+    for _ in range(samples):
+        arrived.clear()
+        del arrivals[:]
+        t0 = time.perf_counter()
+        os.write(master, bytes((0x99, 36, 100)))
+        if arrived.wait(1.0) and arrivals:
+            latencies.append((arrivals[0] - t0) * 1e6)
+        time.sleep(0.005)
+
+    running = False
+    reader.wakeup()
+    thread.join(1.0)
+    reader.close()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+    latencies.sort()
+    return {
+        'mode': reader.mode,
+        'idle_cpu_percent': round(idle_cpu, 2),
+        'wake_latency_us_p50': round(statistics.median(latencies), 1) if latencies else None,
+        'wake_latency_us_p99': round(latencies[int(len(latencies) * 0.99) - 1], 1) if latencies else None,
+        'wake_latency_us_max': round(latencies[-1], 1) if latencies else None,
+        'samples': len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--idle', type=float, default=3.0, help='segundos de medição ociosa por modo')
+    parser.add_argument('--samples', type=int, default=200, help='amostras de latência por modo')
+    parser.add_argument('--json', action='store_true', help='saída em JSON')
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args.idle, args.samples) for mode in (READER_MODE_POLL, READER_MODE_EVENT)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'modo':<8}{'CPU ociosa %':>14}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['idle_cpu_percent']:>14}{r['wake_latency_us_p50']:>10}"
+              f"{r['wake_latency_us_p99']:>10}{r['wake_latency_us_max']:>10}")
+
+
+if __name__ == '__main__':
+    main()
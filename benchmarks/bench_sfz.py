@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Carregamento e reprodução de instrumentos SFZ (sfz.py), sem hardware de áudio.
+
+Gera uma biblioteca sintética (notas x camadas de velocidade x round-robin,
+um WAV por região) ou usa um .sfz existente e mede:
+  - tempo de carregamento: leitura do .sfz, mapeamento das amostras e
+    montagem da tabela (nota x velocidade)
+  - tamanho mapeado e memória residente do processo depois de carregar
+  - custo da consulta (nota, velocidade) -> regiões
+  - fator de tempo real da mixagem com --voices vozes lendo das amostras
+
+Com a biblioteca recém-gravada as páginas ainda estão no cache do sistema;
+para medir a leitura do disco, gere com --dir, limpe o cache e rode de novo
+com --sfz.
+
+Uso: python3 benchmarks/bench_sfz.py [--layers 8] [--round-robin 4] [--json]
+     python3 benchmarks/bench_sfz.py --sfz biblioteca/kit.sfz
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sampler import SAMPLE_RATE, write_wav
+from sfz import SfzSampler
+
+NOTES = (36, 38, 40, 42, 44, 46, 48, 49, 51)
+
+
+def make_library(path, layers, round_robin, seconds):
+    """Grava um WAV por região e o .sfz que os usa; retorna o caminho do .sfz"""
+    os.makedirs(os.path.join(path, 'samples'), exist_ok=True)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    rng = np.random.default_rng(1)
+    lines = ['<control> default_path=samples/']
+    for note in NOTES:
+        for layer in range(layers):
+            lovel = layer * 127 // layers + 1
+            hivel = (layer + 1) * 127 // layers
+            lines.append(f'<group> key={note} lovel={lovel} hivel={hivel} seq_length={round_robin}')
+            for rr in range(round_robin):
+                name = f'{note}_v{hivel}_rr{rr + 1}.wav'
+                mono = (0.5 * rng.standard_normal(n) + np.sin(2 * np.pi * (60 + note) * t)) * np.exp(-t * 3)
+                write_wav(os.path.join(path, 'samples', name), np.stack([mono, mono], axis=1) * 0.4)
+                lines.append(f'<region> sample={name} seq_position={rr + 1}')
+    sfz_path = os.path.join(path, 'kit.sfz')
+    with open(sfz_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return sfz_path
+
+
+def resident_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return None
+
+
+def run(sfz_path, voices, seconds):
+    rss0 = resident_mb()
+    sampler = SfzSampler(voices=voices)
+    t0 = time.perf_counter()
+    regions = sampler.load(sfz_path)
+    load = time.perf_counter() - t0
+    rss1 = resident_mb()
+
+    notes = sampler.notes()
+    lookups = 100000
+    pairs = [(notes[i % len(notes)], 1 + i * 37 % 127) for i in range(lookups)]
+    t0 = time.perf_counter()
+    for note, vel in pairs:
+        sampler.lookup(note, vel)
+    lookup_ns = (time.perf_counter() - t0) / lookups * 1e9
+
+    # Batidas espalhadas mantendo as vozes ocupadas durante a renderização
+    blocks = int(seconds * SAMPLE_RATE) // sampler.block
+    cpu = 0.0
+    for b in range(blocks):
+        if b % 8 == 0:
+            for i in range(max(1, voices // 16)):
+                sampler.note_on(notes[(b + i) % len(notes)], 40 + (b * 7 + i * 13) % 88)
+        c0 = time.process_time()
+        sampler.render_block()
+        cpu += time.process_time() - c0
+    audio = blocks * sampler.block / SAMPLE_RATE
+    result = {
+        'regions': regions,
+        'samples': len(sampler.sources),
+        'mapped_mb': round(sampler.mapped_bytes / 1e6, 1),
+        'load_s': round(load, 3),
+        'rss_growth_mb': round(rss1 - rss0, 1) if rss0 is not None else None,
+        'lookup_ns': round(lookup_ns),
+        'voices': voices,
+        'active_voices': sampler.active_voices,
+        'realtime_factor': round(audio / cpu, 1) if cpu else None,
+        'cpu_us_per_block': round(cpu / blocks * 1e6, 1),
+    }
+    sampler.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sfz', help='mede um .sfz existente em vez de gerar a biblioteca')
+    parser.add_argument('--dir', help='grava a biblioteca gerada aqui (padrão: pasta temporária apagada no fim)')
+    parser.add_argument('--layers', type=int, default=8, help='camadas de velocidade por nota')
+    parser.add_argument('--round-robin', type=int, default=4, help='amostras alternadas por camada')
+    parser.add_argument('--sample-seconds', type=float, default=2.0, help='duração de cada amostra gerada')
+    parser.add_argument('--voices', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=5.0, help='segundos de áudio renderizados')
+    parser.add_argument('--json', action='store_true', help='saída em JSON')
+    args = parser.parse_args()
+
+    temp = None
+    sfz_path = args.sfz
+    if not sfz_path:
+        path = args.dir or tempfile.mkdtemp(prefix='bench_sfz_')
+        temp = None if args.dir else path
+        sfz_path = make_library(path, args.layers, args.round_robin, args.sample_seconds)
+    try:
+        result = run(sfz_path, args.voices, args.seconds)
+    finally:
+        if temp:
+            shutil.rmtree(temp, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['regions']} regiões, {result['samples']} amostras, {result['mapped_mb']} MB mapeados")
+        print(f"Carregamento: {result['load_s']} s; memória residente +{result['rss_growth_mb']} MB")
+        print(f"Consulta (nota, velocidade) -> regiões: {result['lookup_ns']} ns")
+        print(f"{result['voices']} vozes: {result['realtime_factor']}x o tempo real, "
+              f"{result['cpu_us_per_block']} µs por bloco")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
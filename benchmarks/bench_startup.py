@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Mede o tempo de inicialização e a memória da ponte headless (bridge.py)
+comparados aos da interface gráfica (mainwindow.py).
+
+Cada caso roda em um processo novo, repetido N vezes; o tempo é medido até o
+ponto em que a aplicação estaria pronta para abrir a porta serial e a memória
+é o pico de RSS do processo filho.
+
+Uso: python3 benchmarks/bench_startup.py [--runs 5] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CASES = {
+    # Módulos e objetos usados pela ponte antes de abrir a porta serial,
+    # incluindo o rtmidi que bridge.main() sempre importa
+    'bridge': (
+        "import bridge, kit, midi_wrapper\n"
+        "pins = kit.pinArray()\n"
+        "try:\n"
+        "    kit.load_pins(pins, 'pins.ini')\n"
+        "except IOError:\n"
+        "    pass\n"
+    ),
+    # Interface completa: carrega o .ui e constrói a janela (sem exibi-la)
+    'gui': (
+        "import os\n"
+        "os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')\n"
+        "from PyQt5.QtWidgets import QApplication\n"
+        "app = QApplication([])\n"
+        "from mainwindow import MainWindow\n"
+        "w = MainWindow()\n"
+    ),
+}
+
+REPORT = (
+    "\nimport resource, sys\n"
+    "sys.stdout.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))\n"
+)
+
+
+def run_case(code):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', code + REPORT], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'erro'
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    rss = int(proc.stdout.strip().splitlines()[-1])
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return (elapsed * 1000.0, rss / 1024.0), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='saída em JSON')
+    args = parser.parse_args()
+
+    results = []
+    for name, code in CASES.items():
+        times, rss, error = [], [], None
+        for _ in range(args.runs):
+            sample, error = run_case(code)
+            if sample is None:
+                break
+            times.append(sample[0])
+            rss.append(sample[1])
+        if times:
+            results.append({'case': name, 'startup_ms_median': round(statistics.median(times), 1),
+                            'startup_ms_min': round(min(times), 1), 'max_rss_mib': round(max(rss), 1),
+                            'runs': len(times)})
+        else:
+            results.append({'case': name, 'error': error})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        if 'error' in r:
+            print(f"{r['case']:<8} não executado: {r['error']}")
+        else:
+            print(f"{r['case']:<8} {r['startup_ms_median']:>8} ms (mín {r['startup_ms_min']} ms)  RSS {r['max_rss_mib']} MiB")
+
+
+if __name__ == '__main__':
+    main()
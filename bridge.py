@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+#============================================================
+#=>             Mega Arduino eDrum - ponte headless
+#=>              CC BY-NC-SA 3.0
+#=============================================================
+"""
+Ponte serial -> MIDI sem interface gráfica, para uso ao vivo.
+
+Não importa PyQt5 nem carrega o microdrum.ui: reutiliza o parser, o leitor
+serial e o roteador usados pela interface, carrega o kit do pins.ini e
+encaminha as batidas para a porta MIDI escolhida.
+
+Exemplos:
+    python3 bridge.py --list
+    python3 bridge.py --serial /dev/ttyACM0 --midi "FLUID"
+    python3 bridge.py --serial /dev/ttyACM0 --virtual "Mega eDrum"
+    python3 bridge.py --serial /dev/ttyACM0 /dev/ttyACM1 --midi 0
+    python3 bridge.py --midi "FLUID" --route "Recorder" --route "Lights;notes=49-57;channels=10;cc=0"
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from double_trigger import DoubleTriggerFilter
+from hihat import HiHatRemapper, HIHAT_NOTES, parse_hihat_map
+from crosstalk import CrosstalkSuppressor, XTALK_ATTENUATE, XTALK_DROP, XTALK_WINDOW
+from hit_timing import HitTiming
+from link_speed import LinkStats, LINK_CODES, LINK_OK, negotiate, probe
+from kit import NUM_PINS, pinArray, kit_array, load_pins, DISABLED_TYPES
+from midi_router import MidiRoute, MidiRouter, TARGET_MIDI, parse_route_spec
+from multi_board import BoardReader, HitMerger
+from protocol import SERIAL_SPEED, CMD_ASKPARAM, CMD_LICENSE, CMD_MODE, MODE_MIDI, apply_param, license_reply, sysex
+from serial_reconnect import SerialReconnector, port_identity
+from serial_parser import SerialFrameParser, FRAME_SYSEX
+from serial_reader import SerialReader, READER_MODE_EVENT, READER_MODE_POLL
+
+
+class HeadlessBridge:
+    """Loop de leitura serial -> MIDI sem dependência do Qt"""
+
+    def __init__(self, ser, router, pins, reader_mode=READER_MODE_EVENT, verbose=False):
+        self.ser = ser
+        self.router = router
+        self.pins = pins
+        self.verbose = verbose
+        self.parser = SerialFrameParser()
+        self.reader = SerialReader(ser, self.parser, reader_mode)
+        self.running = False
+        # Medição de latência por batida (--timing); None quando desligada
+        self.timing = None
+        # Reabre a porta se a conexão cair (SerialReconnector); None encerra a ponte
+        self.reconnector = None
+
+    def log(self, message):
+        print(time.strftime("[%H:%M:%S] ") + message, flush=True)
+
+    def process_sysex(self, data):
+        """Mesmo tratamento de SysEx da interface: parâmetros e licença"""
+        if len(data) < 2:
+            return
+        if data[1] == CMD_ASKPARAM:
+            # Frame truncado ou PIN fora do kit: ignorado
+            if len(data) < 5 or data[2] >= len(self.pins):
+                return
+            param_name = apply_param(self.pins, data[2], data[3], data[4])
+            self.router.rebuild_filters()
+            if self.verbose:
+                self.log(f"Parâmetro recebido: PIN {data[2]}, {param_name}={data[4]}")
+        elif data[1] == CMD_LICENSE:
+            self.ser.write(license_reply(data))
+            self.log("Resposta de licença enviada")
+
+    def process_midi(self, cmd, note, vel, t_available=0.0, t_parsed=0.0):
+        self.router.forward(cmd, note, vel, t_available)
+        if t_parsed:
+            self.timing.hit(t_available, t_parsed, time.perf_counter())
+        if self.verbose:
+            names = [p.name.decode() for p in self.pins if p.note == note and p.type not in DISABLED_TYPES]
+            self.log(f"MIDI: {cmd:02X} {note} {vel} {'/'.join(names)}")
+
+    def run(self):
+        self.running = True
+        # Coloca o firmware no modo MIDI, como a aba Monitor da interface
+        self.ser.write(sysex(CMD_MODE, MODE_MIDI, 0x00))
+        self.log(f"Encaminhando {self.ser.port} -> MIDI (leitura '{self.reader.mode}')")
+        while self.running:
+            try:
+                if self.reader.fill() <= 0:
+                    continue
+            except (serial.SerialException, OSError) as e:
+                self.log(f"Erro na porta serial: {e}")
+                if self.reconnector is None or not self.running or not self.reattach():
+                    break
+                continue
+            # Instante da chegada, usado pelos filtros do host e pela medição de latência
+            t_available = time.perf_counter()
+            timing = self.timing is not None
+            for kind, frame in self.parser.frames():
+                # Um frame inválido é registrado e descartado: a ponte continua tocando
+                try:
+                    if kind == FRAME_SYSEX:
+                        self.process_sysex(frame[1:])
+                    elif timing:
+                        self.process_midi(frame[0], frame[1], frame[2] if len(frame) > 2 else 0,
+                                          t_available, time.perf_counter())
+                    else:
+                        self.process_midi(frame[0], frame[1], frame[2] if len(frame) > 2 else 0, t_available)
+                except Exception as e:
+                    self.log(f"Erro ao processar frame {bytes(frame).hex(' ')}: {e}")
+        self.reader.close()
+        self.log(f"Encerrado: {self.router.sent} mensagens enviadas, erros de framing {self.parser.errors}")
+
+    def reattach(self):
+        """Espera a porta voltar e retoma a leitura; False se a ponte foi parada"""
+        self.reader.close()
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+        self.log("Conexão perdida; tentando reconectar...")
+        result = self.reconnector.connect()
+        if result is None:
+            return False
+        self.ser, port, elapsed = result
+        self.parser.reset()
+        self.reader = SerialReader(self.ser, self.parser, self.reader.mode)
+        self.router.forget_pedal()
+        self.ser.write(sysex(CMD_MODE, MODE_MIDI, 0x00))
+        self.log(f"Reconectado a {port} em {int(elapsed * 1000)} ms ({self.ser.baudrate} baud)")
+        return True
+
+    def stop(self, *args):
+        self.running = False
+        self.reader.wakeup()
+        if self.reconnector is not None:
+            self.reconnector.stop(timeout=0)
+
+
+def list_ports(midi_out):
+    print("Portas seriais:")
+    for port in serial.tools.list_ports.comports():
+        print(f"  {port.device}  {port.description}")
+    print("Portas MIDI:")
+    for i, name in enumerate(midi_out.get_ports()):
+        print(f"  {i}: {name}")
+
+
+def default_serial_port():
+    for port in serial.tools.list_ports.comports():
+        if "ACM" in port.device or "USB" in port.device or "usbmodem" in port.device:
+            return port.device
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ponte serial -> MIDI headless do Mega Arduino eDrum")
+    parser.add_argument("--serial", nargs="+", metavar="PORTA",
+                        help="porta(s) serial(is) do(s) Arduino(s) (padrão: primeira ACM/USB encontrada); "
+                             "com várias portas a placa i usa os pads i*48 em diante do kit")
+    parser.add_argument("--baud", type=int, default=SERIAL_SPEED, help=f"velocidade da porta (padrão {SERIAL_SPEED})")
+    parser.add_argument("--link-speed", default="auto",
+                        help="velocidade negociada após conectar: auto, um valor (ex.: 1000000) ou 'off'")
+    parser.add_argument("--midi", default="0", help="porta MIDI de saída: índice ou parte do nome")
+    parser.add_argument("--route", action="append", default=[], metavar="PORTA[;notes=36-51][;channels=10][;cc=0]",
+                        help="saída MIDI extra com fila e thread próprios (pode repetir)")
+    parser.add_argument("--virtual", metavar="NOME", help="cria uma porta MIDI virtual em vez de abrir uma existente")
+    parser.add_argument("--pins", default="pins.ini", help="arquivo do kit (padrão pins.ini)")
+    parser.add_argument("--reader", choices=(READER_MODE_EVENT, READER_MODE_POLL), default=READER_MODE_EVENT)
+    parser.add_argument("--list", action="store_true", help="lista as portas seriais e MIDI e sai")
+    parser.add_argument("--no-reconnect", action="store_true", help="encerra se a conexão serial cair")
+    parser.add_argument("--curves", action="store_true",
+                        help="aplica no host as curvas de velocidade do kit (e as desenhadas em curves.json)")
+    parser.add_argument("--double-trigger", action="store_true",
+                        help="descarta no host batidas duplas usando masktime e retrigger de cada pad")
+    parser.add_argument("--xtalk", nargs="?", const=XTALK_DROP, choices=(XTALK_DROP, XTALK_ATTENUATE),
+                        help="suprime no host o crosstalk entre pads do mesmo xtalkgroup (padrão: drop)")
+    parser.add_argument("--xtalk-window", type=float, default=XTALK_WINDOW * 1000, metavar="MS",
+                        help=f"janela da supressão de crosstalk (padrão {XTALK_WINDOW * 1000:.0f} ms)")
+    parser.add_argument("--hihat", action="store_true",
+                        help="troca as notas do chimbal pela posição do pedal (CC dos pads HHC) e gera o chick")
+    parser.add_argument("--hihat-map", action="append", default=[], metavar="NOTA=ABERTO,MEIO,FECHADO",
+                        help="variantes de uma nota do chimbal (padrão 46=46,46,42; pode repetir)")
+    parser.add_argument("--timing", metavar="ARQUIVO", help="mede a latência de cada batida e grava os histogramas em JSON ao sair")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostra cada batida recebida")
+    args = parser.parse_args(argv)
+
+    # Importado aqui para que --help não dependa do rtmidi
+    from midi_wrapper import MidiOutWrapper
+    midi_out = MidiOutWrapper()
+
+    if args.list:
+        list_ports(midi_out)
+        return 0
+
+    ports = args.serial or [default_serial_port()]
+    if ports[0] is None:
+        print("Nenhuma porta serial encontrada (use --serial)")
+        return 1
+
+    pins = pinArray() if len(ports) == 1 else kit_array(len(ports))
+    try:
+        count = load_pins(pins, args.pins)
+        print(f"Kit carregado de {args.pins} ({count} pads)")
+    except IOError:
+        print(f"Arquivo {args.pins} não encontrado. Usando configurações padrão.")
+
+    if args.virtual:
+        midi_out.open_virtual_port(args.virtual)
+        print(f"Porta MIDI virtual '{args.virtual}' criada")
+    else:
+        index = midi_out.find_port(args.midi)
+        if index < 0:
+            print(f"Porta MIDI '{args.midi}' não encontrada (use --list)")
+            return 1
+        midi_out.open_port(index)
+        print(f"Porta MIDI {midi_out.ports[index]} selecionada")
+
+    def open_port(device):
+        return serial.Serial(port=device, baudrate=args.baud, bytesize=8, parity="N", stopbits=1,
+                             timeout=0.001, write_timeout=0.1, exclusive=True)
+
+    serials = []
+    for port in ports:
+        try:
+            serials.append(open_port(port))
+        except Exception as e:
+            print(f"Erro ao abrir porta serial {port}: {e}")
+            for ser in serials:
+                ser.close()
+            return 1
+
+    # O Mega reinicia ao abrir a porta; negocia a velocidade depois do boot
+    time.sleep(1.0)
+    for ser in serials:
+        if args.link_speed == "auto":
+            probe(ser)
+        elif args.link_speed != "off":
+            baud = int(args.link_speed)
+            if baud not in LINK_CODES or negotiate(ser, baud) != LINK_OK:
+                print(f"Velocidade {baud} não confirmada pelo firmware em {ser.port}")
+        print(f"Link serial {ser.port} a {ser.baudrate} baud")
+
+    router = MidiRouter(midi_out)
+    router.set_target(TARGET_MIDI)
+    if args.curves:
+        # Importado aqui: só quem usa as curvas depende do NumPy
+        from velocity_curve import VelocityCurves, load_custom_curves
+        router.set_velocity_curves(VelocityCurves(pins, load_custom_curves()))
+        print("Curvas de velocidade aplicadas no host")
+    if args.double_trigger:
+        router.set_double_trigger(DoubleTriggerFilter(pins))
+        print("Filtro de batidas duplas no host")
+    if args.hihat:
+        try:
+            notes = dict(parse_hihat_map(spec) for spec in args.hihat_map) if args.hihat_map else HIHAT_NOTES
+        except ValueError as e:
+            print(f"Erro em --hihat-map: {e}")
+            for ser in serials:
+                ser.close()
+            return 1
+        router.set_hihat(HiHatRemapper(pins, notes))
+        print(f"Chimbal pelo pedal: {notes}")
+    if args.xtalk:
+        router.set_crosstalk(CrosstalkSuppressor(pins, args.xtalk_window / 1000.0, args.xtalk))
+        print(f"Supressão de crosstalk no host ({args.xtalk}, {args.xtalk_window:.0f} ms)")
+    try:
+        open_routes(router, args.route)
+    except (IOError, ValueError) as e:
+        print(f"Erro ao abrir rota MIDI: {e}")
+        close_routes(router)
+        for ser in serials:
+            ser.close()
+        return 1
+    if len(serials) > 1:
+        try:
+            return run_boards(serials, router, pins, args, open_port)
+        finally:
+            report_filters(router)
+            close_routes(router)
+            midi_out.close_port()
+
+    ser = serials[0]
+    link_stats = LinkStats(ser.baudrate)
+    bridge = HeadlessBridge(ser, router, pins, args.reader, args.verbose)
+    if args.timing:
+        bridge.timing = HitTiming()
+    if not args.no_reconnect:
+        bridge.reconnector = SerialReconnector(port_identity(ser.port), open_port, baud=ser.baudrate)
+    signal.signal(signal.SIGINT, bridge.stop)
+    signal.signal(signal.SIGTERM, bridge.stop)
+    try:
+        bridge.run()
+    finally:
+        print("Uso do link: " + link_stats.summary(bridge.parser.bytes_received, 0))
+        bridge.ser.close()
+        report_filters(router)
+        close_routes(router)
+        midi_out.close_port()
+        if bridge.timing is not None:
+            with open(args.timing, "w") as f:
+                json.dump(bridge.timing.to_dict(), f, indent=2)
+            print(f"Latência gravada em {args.timing}")
+    return 0
+
+
+def open_routes(router, specs):
+    from midi_wrapper import open_output
+    for spec in specs:
+        options = parse_route_spec(spec)
+        port = options.pop('port')
+        route = router.add_route(MidiRoute(port, open_output(port), **options))
+        print(f"Rota MIDI extra '{route.name}' aberta")
+
+
+def report_filters(router):
+    if router.hihat is not None:
+        print(f"Chimbal: {router.hihat.remapped} notas trocadas, {router.hihat.chicks} chicks")
+    if router.double_trigger is not None:
+        pins = router.double_trigger.pins
+        for pad, (masked, retriggered) in router.double_trigger.counts().items():
+            print(f"Batidas duplas descartadas em {pins[pad].name.decode()} (pad {pad}): "
+                  f"{masked} na máscara, {retriggered} no retrigger")
+    if router.xtalk is not None:
+        pins = router.xtalk.pins
+        for pad, count in router.xtalk.counts().items():
+            print(f"Crosstalk suprimido em {pins[pad].name.decode()} (pad {pad}): {count}")
+
+
+def close_routes(router):
+    routes = router.routes
+    router.close_routes()
+    for route in routes:
+        print(f"Rota {route.name}: {route.stats()}")
+        try:
+            route.midi_out.close_port()
+        except Exception:
+            pass
+
+
+def run_boards(serials, router, pins, args, open_port):
+    """Várias placas: um thread de leitura por placa e um único thread de envio MIDI"""
+    log = lambda message: print(time.strftime("[%H:%M:%S] ") + message, flush=True)
+    wake = threading.Event()
+    boards = []
+    for i, ser in enumerate(serials):
+        reconnector = None
+        if not args.no_reconnect:
+            reconnector = SerialReconnector(port_identity(ser.port), open_port, baud=ser.baudrate)
+        boards.append(BoardReader(i, ser, pins, wake, args.reader, reconnector, log))
+
+    on_hit = None
+    if args.verbose:
+        def on_hit(board, cmd, note, vel):
+            names = [p.name.decode() for p in pins[board.offset:board.offset + NUM_PINS]
+                     if p.note == note and p.type not in DISABLED_TYPES]
+            log(f"MIDI placa {board.index}: {cmd:02X} {note} {vel} {'/'.join(names)}")
+    merger = HitMerger(router, boards, wake, on_hit=on_hit)
+
+    done = threading.Event()
+    signal.signal(signal.SIGINT, lambda *a: done.set())
+    signal.signal(signal.SIGTERM, lambda *a: done.set())
+    merger.start()
+    for board in boards:
+        board.start()
+    log(f"Encaminhando {len(boards)} placas -> MIDI")
+    while not done.wait(0.5):
+        pass
+
+    for board in boards:
+        board.stop()
+    for board in boards:
+        board.join()
+    merger.stop()
+    for board in boards:
+        board.ser.close()
+        log(f"Placa {board.index}: {board.stats()}")
+    log(f"Encerrado: {router.sent} mensagens enviadas")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
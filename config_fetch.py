@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Leitura do kit completo do Arduino com pedidos em pipeline.
+
+Em vez de enviar os 48 pedidos ASKPARAM com pausas fixas, o KitFetcher mantém
+até ``window`` pads com pedidos em andamento, registra cada par (pin, param)
+que chega e, passado o ``timeout``, pede de novo apenas o que falta. O fim da
+leitura é informado com a contagem exata de parâmetros recebidos e os que
+faltaram, em vez de um número arbitrário de respostas.
+
+Não depende do Qt: quem usa chama poll() periodicamente (timer da interface
+ou loop da ponte) e on_reply() para cada resposta ASKPARAM recebida.
+"""
+
+import collections
+import threading
+import time
+
+from kit import NUM_PINS
+from protocol import CMD_ASKPARAM, PARAM_ALL, PARAM_FIELDS, sysex
+
+# Parâmetros que o firmware devolve para cada pad
+FETCH_PARAMS = tuple(PARAM_FIELDS)
+
+
+class KitFetcher:
+    """Motor de leitura em janela dos parâmetros de todos os pads"""
+
+    def __init__(self, send, num_pins=NUM_PINS, params=FETCH_PARAMS, window=4, timeout=0.25,
+                 max_retries=3, on_finished=None, clock=time.monotonic):
+        self.send = send
+        self.num_pins = num_pins
+        self.params = tuple(params)
+        self.window = window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.on_finished = on_finished
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._inflight = {}  # pin -> [prazo, tentativas]
+        self._missing = {}   # pin -> conjunto de parâmetros ainda não recebidos
+        self.failed = {}     # pin -> parâmetros que não chegaram após todas as tentativas
+        self.received = 0
+        self.requests_sent = 0
+        self.active = False
+        self.finished = False
+        self.started_at = None
+        self.elapsed = None
+
+    @property
+    def total(self):
+        return self.num_pins * len(self.params)
+
+    def start(self, pins=None):
+        """Inicia a leitura de todos os pads (ou apenas dos indicados)"""
+        with self._lock:
+            pins = range(self.num_pins) if pins is None else pins
+            self._pending = collections.deque(pins)
+            self._missing = {pin: set(self.params) for pin in self._pending}
+            self._inflight = {}
+            self.failed = {}
+            self.received = 0
+            self.requests_sent = 0
+            self.active = True
+            self.finished = False
+            self.started_at = self.clock()
+            self.elapsed = None
+        self.poll()
+
+    def cancel(self):
+        with self._lock:
+            self.active = False
+            self._pending.clear()
+            self._inflight.clear()
+
+    def on_reply(self, pin, param):
+        """Registra uma resposta ASKPARAM; retorna True se fazia parte da leitura"""
+        with self._lock:
+            if not self.active:
+                return False
+            missing = self._missing.get(pin)
+            if missing is None or param not in missing:
+                return False
+            missing.discard(param)
+            self.received += 1
+            if not missing and pin in self._inflight:
+                # Pad completo: libera uma vaga na janela
+                del self._inflight[pin]
+            return True
+
+    def progress(self):
+        return self.received, self.total
+
+    def _request(self, pin, params):
+        if len(params) == len(self.params):
+            self.send(sysex(CMD_ASKPARAM, pin, PARAM_ALL))
+            self.requests_sent += 1
+        else:
+            for param in sorted(params):
+                self.send(sysex(CMD_ASKPARAM, pin, param))
+                self.requests_sent += 1
+
+    def poll(self):
+        """Reenvia pedidos vencidos, completa a janela e informa o fim da leitura"""
+        report = None
+        with self._lock:
+            if not self.active:
+                return
+            now = self.clock()
+            for pin, state in list(self._inflight.items()):
+                if now < state[0]:
+                    continue
+                if state[1] >= self.max_retries:
+                    # Desiste do pad e registra o que faltou
+                    self.failed[pin] = sorted(self._missing[pin])
+                    del self._inflight[pin]
+                    continue
+                state[0] = now + self.timeout
+                state[1] += 1
+                self._request(pin, self._missing[pin])
+            while self._pending and len(self._inflight) < self.window:
+                pin = self._pending.popleft()
+                if not self._missing[pin]:
+                    continue
+                self._inflight[pin] = [now + self.timeout, 0]
+                self._request(pin, self._missing[pin])
+            if not self._pending and not self._inflight:
+                self.active = False
+                self.finished = True
+                self.elapsed = now - self.started_at
+                report = (self.received, self.total, dict(self.failed))
+        if report is not None and self.on_finished is not None:
+            self.on_finished(*report)
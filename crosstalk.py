@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Supressão de crosstalk no host, a partir de xtalk e xtalkgroup de cada PIN.
+
+Pads do mesmo grupo (xtalkgroup > 0) competem: dentro de ``window`` segundos
+depois da batida mais forte do grupo, uma batida abaixo de xtalk/127 dessa
+velocidade é tratada como crosstalk e descartada (ou atenuada). Batidas da
+mesma nota que a mais forte nunca são crosstalk dela (notas fantasma, rufos);
+repetições do próprio pad ficam com o filtro de batidas duplas. xtalk 0 ou
+grupo 0 desligam o filtro do pad.
+
+O estado fica em arrays de tamanho fixo indexados por nota e por grupo;
+a decisão de cada batida é O(1) e não cria listas nem dicionários.
+"""
+
+from array import array
+
+from kit import DISABLED_TYPES
+
+XTALK_DROP = 'drop'
+XTALK_ATTENUATE = 'attenuate'
+
+# Janela (s) em que a batida mais forte do grupo suprime as mais fracas
+XTALK_WINDOW = 0.03
+
+# Fator aplicado à velocidade no modo XTALK_ATTENUATE
+XTALK_ATTENUATION = 0.25
+
+# Grupos possíveis (xtalkgroup é um byte de parâmetro: 0-127)
+NUM_GROUPS = 128
+
+
+class CrosstalkSuppressor:
+    """Decide, por batida, se ela é crosstalk de uma batida mais forte do mesmo grupo"""
+
+    def __init__(self, pins, window=XTALK_WINDOW, mode=XTALK_DROP, attenuation=XTALK_ATTENUATION):
+        self.pins = pins
+        self.window = window
+        self.mode = mode
+        self.attenuation = attenuation
+        # Por nota: grupo (0 = sem filtro), razão xtalk/127 e pad
+        self._group = bytearray(128)
+        self._ratio = array('d', bytes(8 * 128))
+        self._pad = array('h', [-1] * 128)
+        # Por grupo: instante, velocidade e nota da batida mais forte na janela
+        self._last_time = array('d', [-1e9] * NUM_GROUPS)
+        self._last_vel = bytearray(NUM_GROUPS)
+        self._last_note = bytearray(NUM_GROUPS)
+        self.suppressed = array('L', [0] * len(pins))
+        self.rebuild()
+
+    def rebuild(self):
+        """Recalcula as tabelas por nota após mudança de xtalk, grupo, nota ou tipo"""
+        group = bytearray(128)
+        ratio = array('d', bytes(8 * 128))
+        pad = array('h', [-1] * 128)
+        # O primeiro pad habilitado de cada nota define o filtro, como no Monitor
+        for i in reversed(range(len(self.pins))):
+            pin = self.pins[i]
+            if pin.type in DISABLED_TYPES or not 0 <= pin.note < 128:
+                continue
+            g = pin.xtalkgroup if 0 < pin.xtalkgroup < NUM_GROUPS and pin.xtalk > 0 else 0
+            group[pin.note] = g
+            ratio[pin.note] = min(pin.xtalk, 127) / 127.0
+            pad[pin.note] = i
+        self._group, self._ratio, self._pad = group, ratio, pad
+
+    def reset(self):
+        for g in range(NUM_GROUPS):
+            self._last_time[g] = -1e9
+            self._last_vel[g] = 0
+            self._last_note[g] = 0
+        for i in range(len(self.suppressed)):
+            self.suppressed[i] = 0
+
+    def filter(self, note, vel, now):
+        """Velocidade a enviar: ``vel``, atenuada, ou 0 para descartar"""
+        g = self._group[note]
+        if not g:
+            return vel
+        last_vel = self._last_vel[g]
+        if now - self._last_time[g] < self.window:
+            if vel < last_vel * self._ratio[note] and note != self._last_note[g]:
+                self.suppressed[self._pad[note]] += 1
+                if self.mode == XTALK_ATTENUATE:
+                    return max(1, int(vel * self.attenuation))
+                return 0
+            if vel <= last_vel:
+                return vel
+        # Batida mais forte do grupo (ou a primeira da janela)
+        self._last_time[g] = now
+        self._last_vel[g] = vel
+        self._last_note[g] = note
+        return vel
+
+    def counts(self):
+        """{pad: batidas suprimidas} dos pads com supressão"""
+        return {i: n for i, n in enumerate(self.suppressed) if n}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Gráfico da curva de velocidade do pad selecionado.
+
+Desenha a LUT (velocidade recebida -> enviada) calculada por velocity_curve.
+Arrastando o mouse o usuário desenha uma curva própria: os pontos são
+emitidos em curveDrawn e compilados para a mesma forma de LUT.
+"""
+
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import Qt, QPointF, pyqtSignal
+
+from velocity_curve import IDENTITY_LUT
+
+# Distância mínima (em velocidade) entre pontos desenhados
+DRAW_STEP = 4
+
+
+class CurveView(QtWidgets.QWidget):
+    curveDrawn = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lut = IDENTITY_LUT
+        self.custom = False
+        self._drawing = None
+        self.setMinimumSize(128, 128)
+        self.setToolTip("Curva de velocidade (entrada -> saída). Arraste para desenhar uma curva própria")
+
+    def setLut(self, lut, custom=False):
+        self.lut = lut
+        self.custom = custom
+        self.update()
+
+    def _to_widget(self, x, y):
+        w = self.width() - 1
+        h = self.height() - 1
+        return QPointF(x * w / 127.0, h - y * h / 127.0)
+
+    def _to_velocity(self, pos):
+        x = round(pos.x() * 127.0 / max(self.width() - 1, 1))
+        y = round((self.height() - 1 - pos.y()) * 127.0 / max(self.height() - 1, 1))
+        return min(max(x, 0), 127), min(max(y, 0), 127)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QtGui.QColor(30, 30, 30))
+        painter.setPen(QtGui.QPen(QtGui.QColor(70, 70, 70), 1, Qt.DotLine))
+        for v in (32, 64, 96):
+            painter.drawLine(self._to_widget(v, 0), self._to_widget(v, 127))
+            painter.drawLine(self._to_widget(0, v), self._to_widget(127, v))
+        painter.drawLine(self._to_widget(0, 0), self._to_widget(127, 127))
+        color = QtGui.QColor(255, 170, 0) if self.custom else QtGui.QColor(0, 200, 120)
+        painter.setPen(QtGui.QPen(color, 2))
+        painter.drawPolyline(QtGui.QPolygonF([self._to_widget(x, self.lut[x]) for x in range(128)]))
+        if self._drawing:
+            painter.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255), 1))
+            painter.drawPolyline(QtGui.QPolygonF([self._to_widget(x, y) for x, y in sorted(self._drawing.items())]))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            x, y = self._to_velocity(event.pos())
+            self._drawing = {x: y}
+            self.update()
+
+    def mouseMoveEvent(self, event):
+        if self._drawing is None:
+            return
+        x, y = self._to_velocity(event.pos())
+        # Um ponto por faixa de DRAW_STEP; o último valor de cada faixa prevalece
+        self._drawing[x - x % DRAW_STEP] = y
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._drawing is None:
+            return
+        points = dict(self._drawing)
+        self._drawing = None
+        # Extremos fixos: 0 -> 0 e a última entrada desenhada até 127
+        points[0] = 0
+        if 127 not in points:
+            points[127] = points[max(points)]
+        if len(points) > 2:
+            self.curveDrawn.emit(sorted(points.items()))
+        self.update()
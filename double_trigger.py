@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Filtro de batidas duplas no host, a partir de masktime e retrigger de cada PIN.
+
+Depois de uma batida aceita em um pad:
+  - até masktime ms, qualquer nova batida do pad é descartada (máscara);
+  - até RETRIGGER_SPAN vezes masktime, uma batida abaixo de retrigger/127
+    da velocidade anterior é descartada (retrigger).
+
+Os instantes vêm do thread de leitura (chegada dos bytes, perf_counter). O
+ajuste é feito nos próprios campos do PIN e vale na hora, sem escrever no
+Arduino. O estado fica em arrays fixos indexados por nota; cada decisão é
+O(1) e leva menos de um microssegundo.
+"""
+
+from array import array
+
+from kit import DISABLED_TYPES
+
+# Janela do retrigger em múltiplos de masktime
+RETRIGGER_SPAN = 3.0
+
+
+class DoubleTriggerFilter:
+    """Descarta batidas repetidas do mesmo pad dentro da máscara ou do retrigger"""
+
+    def __init__(self, pins, span=RETRIGGER_SPAN):
+        self.pins = pins
+        self.span = span
+        # Por nota: máscara e janela do retrigger (s), fração de velocidade e pad
+        self._mask = array('d', bytes(8 * 128))
+        self._window = array('d', bytes(8 * 128))
+        self._fraction = array('d', bytes(8 * 128))
+        self._pad = array('h', [-1] * 128)
+        # Por nota: instante e velocidade da última batida aceita
+        self._last_time = array('d', [-1e9] * 128)
+        self._last_vel = bytearray(128)
+        self.masked = array('L', [0] * len(pins))
+        self.retriggered = array('L', [0] * len(pins))
+        self.rebuild()
+
+    def rebuild(self):
+        """Recalcula as tabelas por nota após mudança de masktime, retrigger, nota ou tipo"""
+        mask = array('d', bytes(8 * 128))
+        window = array('d', bytes(8 * 128))
+        fraction = array('d', bytes(8 * 128))
+        pad = array('h', [-1] * 128)
+        # O primeiro pad habilitado de cada nota define o filtro, como no Monitor
+        for i in reversed(range(len(self.pins))):
+            pin = self.pins[i]
+            if pin.type in DISABLED_TYPES or not 0 <= pin.note < 128:
+                continue
+            mask[pin.note] = max(pin.masktime, 0) / 1000.0
+            window[pin.note] = mask[pin.note] * self.span
+            fraction[pin.note] = min(max(pin.retrigger, 0), 127) / 127.0
+            pad[pin.note] = i
+        self._mask, self._window, self._fraction, self._pad = mask, window, fraction, pad
+
+    def reset(self):
+        for note in range(128):
+            self._last_time[note] = -1e9
+            self._last_vel[note] = 0
+        for i in range(len(self.masked)):
+            self.masked[i] = 0
+            self.retriggered[i] = 0
+
+    def filter(self, note, vel, now):
+        """Velocidade a enviar: ``vel`` ou 0 para descartar"""
+        pad = self._pad[note]
+        if pad < 0:
+            return vel
+        dt = now - self._last_time[note]
+        if dt < self._mask[note]:
+            self.masked[pad] += 1
+            return 0
+        if dt < self._window[note] and vel < self._last_vel[note] * self._fraction[note]:
+            self.retriggered[pad] += 1
+            return 0
+        self._last_time[note] = now
+        self._last_vel[note] = vel
+        return vel
+
+    def counts(self):
+        """{pad: (descartadas pela máscara, descartadas pelo retrigger)} dos pads com descartes"""
+        return {i: (m, r) for i, (m, r) in enumerate(zip(self.masked, self.retriggered)) if m or r}
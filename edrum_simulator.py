@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+#============================================================
+#=>             Mega Arduino eDrum - simulador
+#=>              CC BY-NC-SA 3.0
+#=============================================================
+"""
+Arduino eDrum virtual em um pseudo-terminal (Linux/macOS).
+
+Emula o protocolo do firmware usado pela interface e pela ponte headless:
+respostas ASKPARAM (inclusive PARAM_ALL), SET/SAVE (0x03/0x04), troca de modo
+(0x01), desafio de licença (0x60) com verificação do hash de Pearson e o dump
+do kit completo (CMD_DUMP/CMD_DUMP_WRITE). Gera batidas (nota) e posições do
+pedal do chimbal (CC) com taxa e jitter configuráveis.
+
+A interface e a ponte se conectam ao caminho do pty como a uma porta real;
+por padrão é criado também o link /tmp/ttyEDRUM0, listado pela interface.
+
+Exemplos:
+    python3 edrum_simulator.py --rate 20
+    python3 edrum_simulator.py --rate 500 --jitter 0.3 --cc-rate 10 --license
+"""
+
+import argparse
+import os
+import random
+import select
+import signal
+import sys
+import threading
+import time
+import tty
+
+from kit import DISABLED_TYPES, pinArray, load_pins
+from kit_dump import DUMP_WRITE_OK, KitDumpError, decode_dump, encode_dump
+from link_speed import LINK_CODES, LINK_SPEEDS
+from protocol import (CMD_ASKPARAM, CMD_BAUD, CMD_DUMP, CMD_DUMP_WRITE, CMD_LICENSE, CMD_MODE, CMD_SAVE, CMD_SET,
+                      MODE_MIDI, PARAM_ALL, PARAM_FIELDS, SERIAL_SPEED, apply_param, pearson_hash, sysex)
+from serial_parser import SerialFrameParser, FRAME_SYSEX
+
+DEFAULT_LINK = "/tmp/ttyEDRUM0"
+
+# Status das mensagens geradas
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+HIHAT_PEDAL_CC = 4
+
+# Status de confirmação de um dump rejeitado
+DUMP_WRITE_ERROR = 0x01
+
+
+class VirtualEDrum:
+    """Firmware simulado do outro lado de um pty"""
+
+    def __init__(self, pins=None, bulk_dump=True, reply_loss=0.0, reply_delay=0.0, seed=None, link=None,
+                 max_baud=None, running_status=False):
+        self.pins = pins if pins is not None else pinArray()
+        self.eeprom = pinArray()
+        self.bulk_dump = bulk_dump
+        # Maior velocidade aceita no CMD_BAUD (None = firmware sem suporte)
+        self.max_baud = max_baud
+        # Omite o status repetido das mensagens de canal (running status)
+        self.running_status = running_status
+        self._last_status = 0
+        self.baud = SERIAL_SPEED
+        self.reply_loss = reply_loss
+        self.reply_delay = reply_delay
+        self.random = random.Random(seed)
+        self.mode = MODE_MIDI
+        self.parser = SerialFrameParser()
+        self.link = link
+        self.master, self.slave = os.openpty()
+        # Sem eco nem tradução de fim de linha: os bytes passam como na USB
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            elif os.path.exists(link):
+                # Só substitui links de execuções anteriores, nunca um arquivo ou pasta
+                os.close(self.master)
+                os.close(self.slave)
+                raise FileExistsError(f"{link} existe e não é um link simbólico; remova-o ou use --link")
+            os.symlink(self.port, link)
+        self._write_lock = threading.Lock()
+        self._running = False
+        self._threads = []
+        self._challenge = None
+        # Envios registrados para medir latência: (perf_counter, status, nota, vel)
+        self.hit_log = None
+        self.stats = {
+            'frames_in': 0, 'askparam': 0, 'set': 0, 'save': 0, 'mode': 0, 'dump': 0,
+            'dump_write': 0, 'baud': 0, 'replies': 0, 'replies_lost': 0, 'license_ok': 0, 'license_bad': 0,
+            'notes': 0, 'cc': 0, 'bytes_out': 0,
+        }
+
+    # --- saída ---
+
+    def write(self, data):
+        with self._write_lock:
+            # SysEx cancela o running status
+            self._last_status = 0
+            os.write(self.master, data)
+            self.stats['bytes_out'] += len(data)
+
+    def reply(self, data):
+        """Resposta de configuração, sujeita à perda/atraso configurados"""
+        if self.reply_loss and self.random.random() < self.reply_loss:
+            self.stats['replies_lost'] += 1
+            return
+        if self.reply_delay:
+            time.sleep(self.reply_delay)
+        self.write(data)
+        self.stats['replies'] += 1
+
+    def hit(self, note, velocity, channel=9):
+        self._send_channel(NOTE_ON | channel, note, velocity)
+        self.stats['notes'] += 1
+
+    def pedal(self, value, channel=9):
+        self._send_channel(CONTROL_CHANGE | channel, HIHAT_PEDAL_CC, value)
+        self.stats['cc'] += 1
+
+    def _send_channel(self, status, data1, data2):
+        with self._write_lock:
+            if self.running_status and status == self._last_status:
+                message = bytes((data1 & 0x7F, data2 & 0x7F))
+            else:
+                message = bytes((status, data1 & 0x7F, data2 & 0x7F))
+            self._last_status = status
+            if self.hit_log is not None:
+                self.hit_log.append((time.perf_counter(), status, data1, data2))
+            os.write(self.master, message)
+            self.stats['bytes_out'] += len(message)
+
+    def send_license_challenge(self):
+        """Envia o desafio 0x60; a resposta é conferida com o hash de Pearson"""
+        self._challenge = (self.random.randrange(0x80), self.random.randrange(0x80))
+        self.write(sysex(CMD_LICENSE, *self._challenge))
+
+    # --- entrada ---
+
+    def handle_sysex(self, data):
+        """data são os bytes a partir do F0"""
+        self.stats['frames_in'] += 1
+        if len(data) < 7:
+            return
+        cmd, pin, param, value = data[2], data[3], data[4], data[5]
+        if cmd == CMD_MODE:
+            self.stats['mode'] += 1
+            self.mode = pin
+        elif cmd == CMD_ASKPARAM:
+            self.stats['askparam'] += 1
+            if pin >= len(self.pins):
+                return
+            params = PARAM_FIELDS if param == PARAM_ALL else (param,)
+            for p in params:
+                field = PARAM_FIELDS.get(p)
+                if field is not None:
+                    self.reply(sysex(CMD_ASKPARAM, pin, p, getattr(self.pins[pin], field)))
+        elif cmd in (CMD_SET, CMD_SAVE):
+            if pin >= len(self.pins):
+                return
+            apply_param(self.pins, pin, param, value)
+            if cmd == CMD_SAVE:
+                apply_param(self.eeprom, pin, param, value)
+                self.stats['save'] += 1
+            else:
+                self.stats['set'] += 1
+        elif cmd == CMD_LICENSE:
+            if self._challenge is not None and (pin, param) == self._challenge:
+                ok = value == pearson_hash(list(self._challenge))
+                self.stats['license_ok' if ok else 'license_bad'] += 1
+                self._challenge = None
+        elif cmd == CMD_BAUD and self.max_baud:
+            # O pty ignora a velocidade: apenas confirma ou recusa como o firmware
+            self.stats['baud'] += 1
+            baud = LINK_SPEEDS.get(pin)
+            if baud is not None and baud <= self.max_baud:
+                self.baud = baud
+            self.reply(sysex(CMD_BAUD, LINK_CODES[self.baud], 0x00))
+        elif cmd == CMD_DUMP and self.bulk_dump:
+            self.stats['dump'] += 1
+            self.reply(encode_dump(self.pins, cmd=CMD_DUMP))
+        elif cmd == CMD_DUMP_WRITE and self.bulk_dump:
+            self.stats['dump_write'] += 1
+            try:
+                decode_dump(data, self.pins)
+            except KitDumpError:
+                self.reply(sysex(CMD_DUMP_WRITE, DUMP_WRITE_ERROR, 0x00))
+                return
+            if data[5] & 0x01:
+                # Flag de gravação: copia o kit para a "EEPROM"
+                for i in range(len(self.pins)):
+                    self.eeprom[i] = self.pins[i]
+            self.reply(sysex(CMD_DUMP_WRITE, DUMP_WRITE_OK, 0x00))
+
+    def _read_loop(self):
+        while self._running:
+            ready, _, _ = select.select([self.master], [], [], 0.2)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                # Lado do host fechado (EIO): espera uma nova conexão
+                time.sleep(0.05)
+                continue
+            self.parser.feed(data)
+            for kind, frame in self.parser.frames():
+                if kind == FRAME_SYSEX:
+                    self.handle_sysex(bytes(frame))
+
+    # --- batidas ---
+
+    def playable_notes(self):
+        notes = sorted({p.note for p in self.pins if p.type not in DISABLED_TYPES and p.note})
+        return notes or [36, 38, 42]
+
+    def _hit_loop(self, rate, jitter, cc_rate, duration, notes, velocity):
+        notes = notes or self.playable_notes()
+        period = 1.0 / rate if rate > 0 else None
+        cc_period = 1.0 / cc_rate if cc_rate > 0 else None
+        now = time.perf_counter()
+        end = now + duration if duration else None
+        next_hit = now if period else None
+        next_cc = now if cc_period else None
+        pedal = 0
+        while self._running:
+            now = time.perf_counter()
+            if end is not None and now >= end:
+                break
+            # Atrasos do agendador não acumulam: batidas vencidas saem juntas
+            while next_hit is not None and next_hit <= now:
+                self.hit(self.random.choice(notes), self.random.randint(*velocity))
+                next_hit += period * (1.0 + self.random.uniform(-jitter, jitter))
+            while next_cc is not None and next_cc <= now:
+                pedal = (pedal + 8) % 128
+                self.pedal(pedal)
+                next_cc += cc_period
+            pending = [t for t in (next_hit, next_cc, end) if t is not None]
+            if not pending:
+                break
+            time.sleep(max(0.0, min(pending) - time.perf_counter()))
+
+    # --- ciclo de vida ---
+
+    def start(self):
+        self._running = True
+        thread = threading.Thread(target=self._read_loop, name="SimulatorRx", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def start_hits(self, rate, jitter=0.0, cc_rate=0.0, duration=None, notes=None, velocity=(1, 127)):
+        """Gera batidas a ``rate`` por segundo; ``jitter`` é a variação relativa do intervalo"""
+        thread = threading.Thread(target=self._hit_loop, name="SimulatorHits", daemon=True,
+                                  args=(rate, jitter, cc_rate, duration, notes, velocity))
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(1.0)
+        self._threads = []
+
+    def close(self):
+        self.stop()
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arduino Mega eDrum virtual em um pseudo-terminal")
+    parser.add_argument("--pins", default="pins.ini", help="kit inicial do simulador (padrão pins.ini)")
+    parser.add_argument("--rate", type=float, default=0.0, help="batidas por segundo (0 = nenhuma)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variação relativa do intervalo entre batidas (0-1)")
+    parser.add_argument("--cc-rate", type=float, default=0.0, help="mensagens de pedal do chimbal por segundo")
+    parser.add_argument("--duration", type=float, help="encerra após N segundos")
+    parser.add_argument("--license", action="store_true", help="envia o desafio de licença a cada troca de modo")
+    parser.add_argument("--no-dump", action="store_true", help="simula um firmware sem dump do kit completo")
+    parser.add_argument("--max-baud", type=int, default=1000000,
+                        help="maior velocidade aceita na negociação (0 = firmware sem suporte)")
+    parser.add_argument("--running-status", action="store_true",
+                        help="envia as batidas com running status (sem repetir o byte de status)")
+    parser.add_argument("--reply-loss", type=float, default=0.0, help="fração de respostas descartadas (testa reenvios)")
+    parser.add_argument("--link", default=DEFAULT_LINK, help=f"link simbólico para o pty (padrão {DEFAULT_LINK}, '' desativa)")
+    parser.add_argument("--seed", type=int, help="semente dos números aleatórios")
+    args = parser.parse_args(argv)
+
+    pins = pinArray()
+    try:
+        count = load_pins(pins, args.pins)
+        print(f"Kit carregado de {args.pins} ({count} pads)")
+    except IOError:
+        print(f"Arquivo {args.pins} não encontrado. Usando kit vazio.")
+
+    try:
+        sim = VirtualEDrum(pins, bulk_dump=not args.no_dump, reply_loss=args.reply_loss,
+                           seed=args.seed, link=args.link or None, max_baud=args.max_baud,
+                           running_status=args.running_status)
+    except FileExistsError as e:
+        print(f"Erro: {e}")
+        return 1
+    print(f"Porta do simulador: {sim.port}" + (f" ({args.link})" if args.link else ""), flush=True)
+
+    done = threading.Event()
+    signal.signal(signal.SIGINT, lambda *a: done.set())
+    signal.signal(signal.SIGTERM, lambda *a: done.set())
+    sim.start()
+    if args.rate > 0 or args.cc_rate > 0:
+        sim.start_hits(args.rate, args.jitter, args.cc_rate, args.duration)
+    mode_switches = 0
+    started = time.monotonic()
+    while not done.wait(0.1):
+        if args.duration and time.monotonic() - started >= args.duration:
+            break
+        if args.license and sim.stats['mode'] != mode_switches:
+            mode_switches = sim.stats['mode']
+            sim.send_license_challenge()
+    sim.close()
+    print(f"Encerrado: {sim.stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Chimbal no host: posição do pedal (CC dos pads HHC) e troca da nota tocada.
+
+O CC enviado pelos pads do tipo HHC (o número do CC é a nota do pad; 127 =
+fechado) atualiza a posição do pedal. As notas do chimbal (arco, borda) são
+trocadas pela variante aberta, meio-aberta ou fechada conforme a zona do
+pedal, por uma tabela (zona x velocidade) calculada de antemão: no envio a
+troca é uma consulta indexada; o note off vai para a mesma nota trocada no
+note on. Um fechamento rápido do pedal gera a nota de chick com velocidade
+proporcional à velocidade do pé.
+
+Até o primeiro CC (e depois de uma reconexão) a posição é desconhecida e o
+chimbal é tratado como aberto; esse CC só define a posição, sem chick.
+"""
+
+# Tipo de pad do pedal (cbType: Piezo, Switch, HHC)
+PIN_TYPE_HHC = 2
+
+# CC usado quando nenhum pad HHC está configurado
+HIHAT_PEDAL_CC = 4
+
+ZONE_OPEN = 0
+ZONE_HALF = 1
+ZONE_CLOSED = 2
+ZONE_NAMES = ("aberto", "meio-aberto", "fechado")
+
+# Posição do pedal (0-127) a partir da qual começa cada zona
+HIHAT_HALF_FROM = 40
+HIHAT_CLOSED_FROM = 100
+
+# Nota recebida -> (aberto, meio-aberto, fechado); padrão GM: 46 aberto, 42 fechado
+HIHAT_NOTES = {46: (46, 46, 42)}
+
+# Chick: nota e velocidade mínima do pé (posições por segundo) para gerá-lo;
+# a velocidade MIDI chega a 127 em HIHAT_CHICK_FULL_SPEED
+HIHAT_CHICK_NOTE = 44
+HIHAT_CHICK_MIN_SPEED = 300.0
+HIHAT_CHICK_FULL_SPEED = 2000.0
+
+# Sem CC por mais que isto (s), o pedal estava parado: o fechamento recomeça
+HIHAT_MOVE_GAP = 0.05
+
+# Intervalo típico entre CCs com o pedal em movimento; piso do tempo medido,
+# para um salto grande em um único CC
+HIHAT_CC_INTERVAL = 0.005
+
+
+class HiHatRemapper:
+    """Acompanha o pedal e troca as notas do chimbal conforme a zona"""
+
+    def __init__(self, pins, notes=None, half_from=HIHAT_HALF_FROM, closed_from=HIHAT_CLOSED_FROM,
+                 tight_velocity=0, chick_note=HIHAT_CHICK_NOTE, chick_min_speed=HIHAT_CHICK_MIN_SPEED):
+        self.pins = pins
+        self.notes = dict(HIHAT_NOTES if notes is None else notes)
+        self.half_from = half_from
+        self.closed_from = closed_from
+        # Meio-aberto tocado abaixo desta velocidade soa fechado (0 desliga)
+        self.tight_velocity = tight_velocity
+        self.chick_note = chick_note
+        self.chick_min_speed = chick_min_speed
+        # -1: posição desconhecida
+        self.position = -1
+        self.remapped = 0
+        self.chicks = 0
+        self._pedal_cc = bytearray(128)
+        self._zone = bytearray(128)
+        self._remap = [None] * 128
+        self._current = ZONE_OPEN
+        # Por nota recebida: nota enviada no último note on, usada pelo note off
+        self._sounding = bytearray(range(128))
+        # Início do movimento de fechamento em andamento (posição, instante)
+        self._close_from = 0
+        self._close_at = -1.0
+        self._last_at = -1.0
+        self.rebuild()
+
+    def rebuild(self):
+        """Recalcula os CCs do pedal, as zonas e as tabelas (zona x velocidade) de cada nota"""
+        pedal_cc = bytearray(128)
+        for pin in self.pins:
+            if pin.type == PIN_TYPE_HHC and 0 <= pin.note < 128:
+                pedal_cc[pin.note] = 1
+        if not any(pedal_cc):
+            pedal_cc[HIHAT_PEDAL_CC] = 1
+        zone = bytearray(ZONE_OPEN if p < self.half_from else ZONE_HALF if p < self.closed_from else ZONE_CLOSED
+                         for p in range(128))
+        remap = [None] * 128
+        for note, variants in self.notes.items():
+            table = bytearray(3 * 128)
+            for z in (ZONE_OPEN, ZONE_HALF, ZONE_CLOSED):
+                for vel in range(128):
+                    out = variants[z]
+                    if z == ZONE_HALF and vel < self.tight_velocity:
+                        out = variants[ZONE_CLOSED]
+                    table[z * 128 + vel] = out
+            remap[note] = bytes(table)
+        self._pedal_cc, self._zone, self._remap = pedal_cc, zone, remap
+        self._current = zone[self.position] if self.position >= 0 else ZONE_OPEN
+
+    @property
+    def zone(self):
+        return self._current
+
+    def zone_of(self, position):
+        return self._zone[position]
+
+    def is_pedal(self, cc):
+        return self._pedal_cc[cc]
+
+    def remap(self, note, vel):
+        """Nota a enviar para uma batida ``note`` com o pedal na posição atual"""
+        table = self._remap[note]
+        if table is None:
+            return note
+        out = table[self._current * 128 + vel]
+        self._sounding[note] = out
+        if out != note:
+            self.remapped += 1
+        return out
+
+    def release(self, note):
+        """Nota do note off: a mesma enviada no note on de ``note``"""
+        return self._sounding[note]
+
+    def pedal(self, value, now):
+        """Atualiza a posição; retorna a velocidade do chick (0 se não houver)"""
+        previous = self.position
+        self.position = value
+        self._current = self._zone[value]
+        last_at, self._last_at = self._last_at, now
+        if previous < 0:
+            # Primeiro CC: só a posição inicial, sem medir o movimento
+            self._close_at = -1.0
+            return 0
+        if value <= previous:
+            # Abrindo ou parado: nenhum fechamento em andamento
+            self._close_at = -1.0
+            return 0
+        if self._close_at < 0 or now - last_at > HIHAT_MOVE_GAP:
+            # Começo do fechamento (o CC só chega quando o pedal se move)
+            self._close_from = previous
+            self._close_at = now
+        if previous >= self.closed_from or value < self.closed_from:
+            return 0
+        # Entrou na zona fechada: velocidade média do pé desde o início do fechamento
+        speed = (value - self._close_from) / max(now - self._close_at, HIHAT_CC_INTERVAL)
+        self._close_at = -1.0
+        if speed < self.chick_min_speed:
+            return 0
+        self.chicks += 1
+        return min(127, max(1, int(127 * speed / HIHAT_CHICK_FULL_SPEED)))
+
+    def forget_pedal(self):
+        """Posição desconhecida até o próximo CC (início, reconexão)"""
+        self.position = -1
+        self._current = ZONE_OPEN
+        self._close_at = -1.0
+
+    def reset(self):
+        self.remapped = 0
+        self.chicks = 0
+        self.forget_pedal()
+
+
+def parse_hihat_map(spec):
+    """'46=46,46,42' -> (46, (46, 46, 42)); todas as notas entre 0 e 127"""
+    note, _, variants = spec.partition('=')
+    try:
+        note = int(note)
+        values = tuple(int(v) for v in variants.split(','))
+    except ValueError:
+        raise ValueError(f"esperado nota=aberto,meio,fechado: {spec}") from None
+    if len(values) != 3:
+        raise ValueError(f"esperado nota=aberto,meio,fechado: {spec}")
+    if not all(0 <= n <= 127 for n in (note,) + values):
+        raise ValueError(f"notas devem estar entre 0 e 127: {spec}")
+    return note, values
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Buffer circular de batidas entre o thread de leitura e a interface.
+
+Um único produtor (thread de leitura) e um único consumidor (timer da aba
+Monitor). Cada lado só escreve o seu próprio índice, e a atribuição de um int
+é atômica no CPython, então não há locks no caminho de cada batida. Quando o
+buffer está cheio a batida nova é descartada e contada em ``dropped``: o
+monitor é apenas visual, o MIDI já foi enviado.
+
+Cada batida pode levar um instante (perf_counter do envio MIDI) usado pela
+medição de latência do monitor; 0.0 quando a medição está desligada.
+"""
+
+from array import array
+
+
+class HitRing:
+    """Fila SPSC de tamanho fixo com mensagens (cmd, note, vel, instante)"""
+
+    def __init__(self, size=1024):
+        # Tamanho arredondado para potência de 2 para usar máscara no índice
+        size = 1 << max(size - 1, 1).bit_length()
+        self._cmd = bytearray(size)
+        self._note = bytearray(size)
+        self._vel = bytearray(size)
+        self._stamp = array('d', bytes(8 * size))
+        self._mask = size - 1
+        self._head = 0  # escrito apenas pelo produtor
+        self._tail = 0  # escrito apenas pelo consumidor
+        self.dropped = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, cmd, note, vel, stamp=0.0):
+        """Adiciona uma batida; retorna False se o buffer estiver cheio"""
+        head = self._head
+        if head - self._tail > self._mask:
+            self.dropped += 1
+            return False
+        i = head & self._mask
+        self._cmd[i] = cmd
+        self._note[i] = note
+        self._vel[i] = vel
+        self._stamp[i] = stamp
+        # Publica o item só depois de escrito
+        self._head = head + 1
+        return True
+
+    def drain(self, max_items=None):
+        """Gera as batidas disponíveis no momento da chamada (no máximo ``max_items``)"""
+        tail = self._tail
+        head = self._head
+        if max_items is not None and head - tail > max_items:
+            head = tail + max_items
+        mask = self._mask
+        while tail < head:
+            i = tail & mask
+            yield self._cmd[i], self._note[i], self._vel[i], self._stamp[i]
+            tail += 1
+            self._tail = tail
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Medição opcional da latência de cada batida, por etapa.
+
+Instantes registrados (time.perf_counter):
+  - bytes disponíveis: o leitor serial retornou com dados
+  - frame separado: o parser entregou a mensagem
+  - MIDI enviado: send_message retornou
+  - monitor desenhado: a barra da aba Monitor foi atualizada
+
+Os intervalos vão para histogramas de faixas fixas (contadores em um array),
+sem alocação por batida; com a medição desligada o custo é um teste de flag
+por leitura. Os resultados podem ser exportados em CSV ou JSON.
+"""
+
+import bisect
+import json
+import time
+from array import array
+
+STAGE_PARSE = 'parse'          # bytes disponíveis -> frame separado
+STAGE_MIDI = 'midi'            # frame separado -> send_message retornou
+STAGE_SERIAL_MIDI = 'serial_midi'  # bytes disponíveis -> send_message retornou
+STAGE_MONITOR = 'monitor'      # send_message retornou -> monitor desenhado
+STAGES = (STAGE_PARSE, STAGE_MIDI, STAGE_SERIAL_MIDI, STAGE_MONITOR)
+
+STAGE_NAMES = {
+    STAGE_PARSE: "Serial -> frame",
+    STAGE_MIDI: "Frame -> MIDI",
+    STAGE_SERIAL_MIDI: "Serial -> MIDI",
+    STAGE_MONITOR: "MIDI -> Monitor",
+}
+
+# Limites superiores das faixas em microssegundos; a última faixa é aberta
+BIN_EDGES_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+
+class LatencyHistogram:
+    """Histograma de faixas fixas em microssegundos"""
+
+    def __init__(self, edges=BIN_EDGES_US):
+        self.edges = tuple(edges)
+        self.counts = array('L', [0] * (len(self.edges) + 1))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, us):
+        self.counts[bisect.bisect_left(self.edges, us)] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def percentile(self, p):
+        """Limite superior da faixa que contém o percentil p (0-1)"""
+        if not self.count:
+            return None
+        target = p * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                # Limitado ao máximo observado
+                return min(self.edges[i], round(self.max)) if i < len(self.edges) else round(self.max)
+        return round(self.max)
+
+    def labels(self):
+        lower = (0,) + self.edges
+        return [f"{lo}-{hi}" for lo, hi in zip(lower, self.edges)] + [f">{self.edges[-1]}"]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_us': round(self.total / self.count, 1) if self.count else None,
+            'p50_us': self.percentile(0.5),
+            'p99_us': self.percentile(0.99),
+            'max_us': round(self.max, 1),
+            'bins_us': dict(zip(self.labels(), self.counts)),
+        }
+
+
+class HitTiming:
+    """Histogramas por etapa, ligados e desligados pela aba Tool"""
+
+    def __init__(self, edges=BIN_EDGES_US):
+        self.enabled = False
+        self.histograms = {stage: LatencyHistogram(edges) for stage in STAGES}
+        self.started_at = time.time()
+
+    def hit(self, t_available, t_parsed, t_sent):
+        """Registra as etapas do thread de leitura de uma batida"""
+        self.histograms[STAGE_PARSE].add((t_parsed - t_available) * 1e6)
+        self.histograms[STAGE_MIDI].add((t_sent - t_parsed) * 1e6)
+        self.histograms[STAGE_SERIAL_MIDI].add((t_sent - t_available) * 1e6)
+
+    def record(self, stage, start, end):
+        self.histograms[stage].add((end - start) * 1e6)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.started_at = time.time()
+
+    def to_dict(self):
+        return {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'stages': {stage: self.histograms[stage].to_dict() for stage in STAGES},
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_csv(self):
+        """Uma linha por etapa: resumo seguido das contagens de cada faixa"""
+        labels = self.histograms[STAGES[0]].labels()
+        lines = [",".join(['stage', 'count', 'mean_us', 'p50_us', 'p99_us', 'max_us'] + labels)]
+        for stage in STAGES:
+            h = self.histograms[stage]
+            summary = h.to_dict()
+            row = [stage] + ['' if summary[k] is None else str(summary[k])
+                             for k in ('count', 'mean_us', 'p50_us', 'p99_us', 'max_us')]
+            lines.append(",".join(row + [str(n) for n in h.counts]))
+        return "\n".join(lines) + "\n"
@@ -130,6 +130,10 @@ echo  - Instalando python-rtmidi...
 %PYTHON_CMD% -m pip install python-rtmidi --no-build-isolation >nul 2>nul
 echo  - Instalando psutil...
 %PYTHON_CMD% -m pip install psutil >nul 2>nul
+echo  - Instalando numpy...
+%PYTHON_CMD% -m pip install numpy >nul 2>nul
+echo  - Instalando sounddevice (opcional, audio do sampler interno)...
+%PYTHON_CMD% -m pip install sounddevice >nul 2>nul
 
 echo [SUCESSO] Todas as dependencias foram instaladas!
 
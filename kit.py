@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Estrutura PIN e persistência do kit no arquivo pins.ini.
+"""
+
+from ctypes import Structure, c_char, c_int
+
+NUM_PINS = 48
+
+# Tipos de pad que não geram som
+DISABLED_TYPES = (15, 127)
+
+
+class PIN(Structure):
+    _fields_ = [("name", c_char*20),("type", c_int),("note", c_int),("thresold", c_int),("scantime", c_int),("masktime", c_int),("retrigger", c_int),
+                ("gain", c_int),("curve", c_int),("curveform", c_int),("xtalk", c_int),("xtalkgroup", c_int),("channel", c_int)]
+
+pinArray=PIN*NUM_PINS
+
+
+def kit_array(num_boards=1):
+    """Kit combinado de várias placas: a placa i ocupa os pads i*NUM_PINS em diante"""
+    return (PIN * (NUM_PINS * num_boards))()
+
+# Ordem dos campos em cada linha do pins.ini
+PIN_FILE_FIELDS = ("type", "note", "thresold", "scantime", "masktime", "retrigger",
+                   "gain", "curve", "curveform", "xtalk", "xtalkgroup", "channel")
+
+
+def load_pins(pins, path="pins.ini"):
+    """Carrega o kit de pins.ini para pins; lança IOError se o arquivo não existir"""
+    with open(path, "r") as f:
+        i=0
+        for line in f:
+            if i >= len(pins):
+                break
+            data=line.rstrip().split(';')
+            pins[i].name=data[0].encode()
+            for field, value in zip(PIN_FILE_FIELDS, data[1:]):
+                setattr(pins[i], field, int(value))
+            i=i+1
+    return i
+
+
+def save_pins(pins, path="pins.ini"):
+    """Salva o kit no formato do pins.ini"""
+    with open(path, "w") as f:
+        for pin in pins:
+            f.write(pin.name.decode()+';'+';'.join(str(getattr(pin, field)) for field in PIN_FILE_FIELDS)+'\n')
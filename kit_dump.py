@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Codec do dump do kit completo em uma única mensagem SysEx.
+
+Formato (todos os bytes entre F0 e F7 são de 7 bits):
+
+    F0 77 cmd versão n_pins flags <payload empacotado> checksum F7
+
+O payload são os n_pins registros PIN (nome com 20 bytes + 12 campos de um
+byte, na ordem do pins.ini) empacotados de 8 para 7 bits: a cada 7 bytes
+é enviado um byte com os bits mais significativos seguido dos 7 bytes com o
+bit 7 zerado. O checksum é o complemento de 7 bits da soma de versão, n_pins,
+flags e payload. Em flags, DUMP_FLAG_SAVE pede a gravação na EEPROM. Um kit de 48 pads ocupa cerca de 1,8 KB (~150 ms a 115200 baud)
+contra 576 frames de 7 bytes em cada direção no protocolo por parâmetro.
+
+Firmwares que não conhecem CMD_DUMP simplesmente não respondem; nesse caso a
+interface volta para a leitura/escrita por parâmetro.
+"""
+
+from kit import PIN_FILE_FIELDS
+from protocol import CMD_DUMP, CMD_DUMP_WRITE, SYSEX_END, SYSEX_ID, SYSEX_START, sysex
+
+DUMP_VERSION = 1
+NAME_LEN = 20
+RECORD_LEN = NAME_LEN + len(PIN_FILE_FIELDS)
+
+DUMP_FLAG_SAVE = 0x01
+
+# Status da confirmação de gravação (F0 77 CMD_DUMP_WRITE status 00 00 F7)
+DUMP_WRITE_OK = 0x00
+
+
+class KitDumpError(ValueError):
+    """Dump com tamanho, versão ou checksum inválidos"""
+
+
+def pack7(data):
+    """Empacota bytes de 8 bits em bytes de 7 bits (grupos de 7 -> 8)"""
+    out = bytearray()
+    for i in range(0, len(data), 7):
+        chunk = data[i:i + 7]
+        msb = 0
+        for bit, byte in enumerate(chunk):
+            msb |= (byte >> 7) << bit
+        out.append(msb)
+        out.extend(byte & 0x7F for byte in chunk)
+    return bytes(out)
+
+
+def unpack7(data):
+    """Inverso de pack7"""
+    out = bytearray()
+    for i in range(0, len(data), 8):
+        msb = data[i]
+        for bit, byte in enumerate(data[i + 1:i + 8]):
+            out.append(byte | (((msb >> bit) & 1) << 7))
+    return bytes(out)
+
+
+def checksum(data):
+    return (-sum(data)) & 0x7F
+
+
+def packed_length(n_pins):
+    raw = n_pins * RECORD_LEN
+    return raw + (raw + 6) // 7
+
+
+def dump_request():
+    """Pedido do dump completo ao firmware (frame de 7 bytes)"""
+    return sysex(CMD_DUMP, 0x00, 0x00)
+
+
+def encode_pins(pins):
+    """Serializa os registros PIN (sem empacotamento)"""
+    raw = bytearray()
+    for pin in pins:
+        raw += pin.name[:NAME_LEN].ljust(NAME_LEN, b'\0')
+        raw += bytes(getattr(pin, field) & 0xFF for field in PIN_FILE_FIELDS)
+    return bytes(raw)
+
+
+def encode_dump(pins, cmd=CMD_DUMP_WRITE, save=False):
+    """Monta o frame SysEx com o kit completo"""
+    flags = DUMP_FLAG_SAVE if save else 0
+    body = bytes((DUMP_VERSION, len(pins), flags)) + pack7(encode_pins(pins))
+    return bytes((SYSEX_START, SYSEX_ID, cmd)) + body + bytes((checksum(body), SYSEX_END))
+
+
+def decode_dump(frame, pins):
+    """Valida um frame de dump (de F0 a F7) e aplica os registros em pins.
+
+    Retorna o número de pads lidos; lança KitDumpError se o frame for inválido.
+    """
+    if len(frame) < 7 or frame[0] != SYSEX_START or frame[1] != SYSEX_ID or frame[-1] != SYSEX_END:
+        raise KitDumpError("frame de dump malformado")
+    body = bytes(frame[3:-2])
+    if checksum(body) != frame[-2]:
+        raise KitDumpError("checksum inválido")
+    if len(body) < 3:
+        raise KitDumpError("dump sem cabeçalho")
+    version, n_pins = body[0], body[1]
+    if version != DUMP_VERSION:
+        raise KitDumpError(f"versão de dump não suportada: {version}")
+    if len(body) - 3 != packed_length(n_pins):
+        raise KitDumpError(f"tamanho inválido para {n_pins} pads")
+    raw = unpack7(body[3:])
+    n_pins = min(n_pins, len(pins))
+    for i in range(n_pins):
+        record = raw[i * RECORD_LEN:(i + 1) * RECORD_LEN]
+        pins[i].name = record[:NAME_LEN].rstrip(b'\0')
+        for field, value in zip(PIN_FILE_FIELDS, record[NAME_LEN:]):
+            setattr(pins[i], field, value)
+    return n_pins
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Último estado conhecido do kit no Arduino e campos alterados desde então.
+
+A interface marca (pin, campo) como alterado quando um parâmetro é editado; as
+respostas ASKPARAM (leitura do kit, GETs e confirmações da fila de
+transmissão) registram o valor que está no dispositivo. A sincronização envia
+apenas os campos marcados cujo valor difere do que o Arduino tem, em vez dos
+dez parâmetros de cada pad.
+"""
+
+import threading
+
+from kit import NUM_PINS, PIN
+from protocol import FIELD_PARAMS, PARAM_FIELDS
+
+
+class KitState:
+    """Espelho do kit no dispositivo com rastreamento de campos alterados"""
+
+    def __init__(self, num_pins=NUM_PINS):
+        # num_pins > NUM_PINS espelha um kit combinado de várias placas (kit_array)
+        self.device = (PIN * num_pins)()
+        # Campos cujo valor no dispositivo já foi lido ou confirmado
+        self._known = set()
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def mark(self, pin, field):
+        """Marca um campo editado na interface"""
+        if field not in FIELD_PARAMS:
+            return
+        with self._lock:
+            self._dirty.add((pin, field))
+
+    def mark_all(self, field, pins):
+        with self._lock:
+            for pin in pins:
+                self._dirty.add((pin, field))
+
+    def set_device(self, pin, param, value, current=None):
+        """Registra o valor de um parâmetro no dispositivo (resposta ASKPARAM)
+
+        Se ``current`` (o kit da interface) tiver o mesmo valor, o campo deixa
+        de estar alterado.
+        """
+        field = PARAM_FIELDS.get(param)
+        if field is None or pin >= len(self.device):
+            return
+        with self._lock:
+            setattr(self.device[pin], field, value)
+            self._known.add((pin, field))
+            if current is not None and getattr(current[pin], field) == value:
+                self._dirty.discard((pin, field))
+
+    def set_device_pins(self, pins, count, current=None):
+        """Registra todos os campos dos primeiros ``count`` pads (dump do kit)"""
+        for pin in range(count):
+            for param, field in PARAM_FIELDS.items():
+                self.set_device(pin, param, getattr(pins[pin], field), current)
+
+    def dirty_count(self):
+        with self._lock:
+            return len(self._dirty)
+
+    def dirty_params(self, pins):
+        """Lista (pin, param, value) dos campos alterados que diferem do dispositivo"""
+        params = []
+        with self._lock:
+            for pin, field in sorted(self._dirty):
+                value = getattr(pins[pin], field)
+                if (pin, field) in self._known and getattr(self.device[pin], field) == value:
+                    # Voltou ao valor do dispositivo: nada a enviar
+                    self._dirty.discard((pin, field))
+                    continue
+                params.append((pin, FIELD_PARAMS[field], value))
+        return params
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Negociação da velocidade da porta serial e estatísticas de uso do link.
+
+A conexão sempre começa em SERIAL_SPEED (115200). O host pede uma velocidade
+maior com F0 77 CMD_BAUD código 00 00 F7; o firmware que a suporta confirma
+com o mesmo frame, ainda na velocidade antiga, e passa para a nova. O host
+então troca a velocidade da porta e envia um pedido ASKPARAM: só quando a
+resposta chega na nova velocidade a troca é aceita. Sem confirmação ou sem
+resposta, o host volta para a velocidade anterior; o firmware deve fazer o
+mesmo se não receber um frame válido em LINK_REVERT_TIMEOUT. Firmwares que
+não conhecem CMD_BAUD não respondem e a conexão segue a 115200.
+
+A 115200 baud uma nota de 3 bytes ocupa ~0,26 ms no fio; a 1 Mbaud, ~0,03 ms.
+"""
+
+import time
+
+from protocol import CMD_ASKPARAM, CMD_BAUD, PARAM_NOTE, SERIAL_SPEED, sysex
+from serial_parser import SerialFrameParser, FRAME_SYSEX
+
+# Código enviado no frame CMD_BAUD -> velocidade
+LINK_SPEEDS = {
+    0x00: SERIAL_SPEED,
+    0x01: 250000,
+    0x02: 500000,
+    0x03: 1000000,
+    0x04: 2000000,
+}
+LINK_CODES = {baud: code for code, baud in LINK_SPEEDS.items()}
+
+# Ordem testada no modo automático (da mais rápida para a mais lenta)
+LINK_PROBE_ORDER = (2000000, 1000000, 500000)
+
+# Prazo para o firmware voltar à velocidade anterior após uma troca não confirmada
+LINK_REVERT_TIMEOUT = 1.0
+
+# Prazo para o firmware responder a ASKPARAM antes de repetir um CMD_BAUD sem resposta
+LINK_READY_TIMEOUT = 1.0
+
+# Resultado de negotiate()
+LINK_OK = 'ok'                    # confirmado nas duas pontas
+LINK_UNSUPPORTED = 'unsupported'  # firmware não respondeu ao CMD_BAUD
+LINK_REFUSED = 'refused'          # firmware respondeu com outra velocidade
+LINK_FAILED = 'failed'            # confirmado, mas sem resposta na nova velocidade
+
+# Bits por byte no fio (start + 8 dados + stop)
+BITS_PER_BYTE = 10
+
+
+def baud_request(baud):
+    """Frame que pede ao firmware a troca para ``baud``"""
+    return sysex(CMD_BAUD, LINK_CODES[baud], 0x00)
+
+
+def _wait_sysex(ser, cmd, timeout):
+    """Lê a porta até chegar um SysEx do comando ``cmd``; retorna os bytes após o F0"""
+    parser = SerialFrameParser()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if parser.read_from(ser) <= 0:
+            continue
+        for kind, frame in parser.frames():
+            if kind == FRAME_SYSEX and len(frame) > 2 and frame[2] == cmd:
+                return bytes(frame[1:])
+    return None
+
+
+def wait_ready(ser, timeout, stop=None):
+    """Envia pedidos ASKPARAM até o firmware responder (ex.: após reiniciar)"""
+    old_timeout = ser.timeout
+    ser.timeout = 0.01
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not (stop is not None and stop.is_set()):
+            ser.write(sysex(CMD_ASKPARAM, 0x00, PARAM_NOTE))
+            if _wait_sysex(ser, CMD_ASKPARAM, 0.1) is not None:
+                return True
+        return False
+    finally:
+        ser.timeout = old_timeout
+
+
+def negotiate(ser, baud, timeout=0.3):
+    """Troca a porta e o firmware para ``baud``; retorna um dos LINK_* """
+    if baud == ser.baudrate:
+        return LINK_OK
+    if baud not in LINK_CODES:
+        raise ValueError(f"velocidade não suportada: {baud}")
+    base = ser.baudrate
+    old_timeout = ser.timeout
+    ser.timeout = 0.01
+    try:
+        ser.reset_input_buffer()
+        ser.write(baud_request(baud))
+        ser.flush()
+        ack = _wait_sysex(ser, CMD_BAUD, timeout)
+        if ack is None:
+            return LINK_UNSUPPORTED
+        if ack[2] != LINK_CODES[baud]:
+            # O firmware respondeu com outra velocidade: recusou esta
+            return LINK_REFUSED
+        ser.baudrate = baud
+        ser.reset_input_buffer()
+        ser.write(sysex(CMD_ASKPARAM, 0x00, PARAM_NOTE))
+        if _wait_sysex(ser, CMD_ASKPARAM, timeout) is not None:
+            return LINK_OK
+        # Sem resposta na nova velocidade: volta e espera o firmware voltar também
+        ser.baudrate = base
+        time.sleep(LINK_REVERT_TIMEOUT)
+        ser.reset_input_buffer()
+        return LINK_FAILED
+    finally:
+        ser.timeout = old_timeout
+
+
+# Placas (port_identity) que não responderam ao CMD_BAUD nesta execução
+_unsupported = set()
+
+
+def _identity_key(identity):
+    return tuple(sorted(identity.items())) if isinstance(identity, dict) else identity
+
+
+def probe(ser, candidates=LINK_PROBE_ORDER, timeout=0.3, identity=None):
+    """Tenta as velocidades em ordem e retorna a que ficou em uso
+
+    Com ``identity`` (port_identity), uma placa cujo firmware não conhece
+    CMD_BAUD não é testada de novo: reconectar não espera o prazo outra vez.
+    Só é registrada se responde a ASKPARAM (wait_ready) e um segundo CMD_BAUD
+    também fica sem resposta; uma placa ainda reiniciando é testada de novo
+    na próxima conexão.
+    """
+    key = _identity_key(identity) if identity is not None else None
+    if key is not None and key in _unsupported:
+        return ser.baudrate
+    for baud in candidates:
+        if baud <= ser.baudrate:
+            break
+        result = negotiate(ser, baud, timeout)
+        if result == LINK_UNSUPPORTED:
+            # Sem resposta: pode ser firmware sem CMD_BAUD ou placa ainda ocupada
+            if not wait_ready(ser, LINK_READY_TIMEOUT):
+                break
+            result = negotiate(ser, baud, timeout)
+            if result == LINK_UNSUPPORTED:
+                # O firmware responde, mas não conhece CMD_BAUD: não adianta tentar as outras
+                if key is not None:
+                    _unsupported.add(key)
+                break
+        if result == LINK_OK:
+            return baud
+    return ser.baudrate
+
+
+class LinkStats:
+    """Uso do link (fração da capacidade) por sessão e por janela de amostragem"""
+
+    def __init__(self, baud):
+        self.baud = baud
+        self.started_at = time.monotonic()
+        self._last = (self.started_at, 0, 0)
+        self.rx_peak = 0.0
+        self.tx_peak = 0.0
+
+    def _utilization(self, nbytes, seconds):
+        if seconds <= 0:
+            return 0.0
+        return nbytes * BITS_PER_BYTE / (self.baud * seconds)
+
+    def sample(self, rx_bytes, tx_bytes):
+        """Uso desde a amostra anterior; retorna (rx, tx) entre 0 e 1"""
+        now = time.monotonic()
+        t0, rx0, tx0 = self._last
+        self._last = (now, rx_bytes, tx_bytes)
+        rx = self._utilization(rx_bytes - rx0, now - t0)
+        tx = self._utilization(tx_bytes - tx0, now - t0)
+        self.rx_peak = max(self.rx_peak, rx)
+        self.tx_peak = max(self.tx_peak, tx)
+        return rx, tx
+
+    def summary(self, rx_bytes, tx_bytes):
+        """Texto com o uso médio e de pico da sessão"""
+        seconds = time.monotonic() - self.started_at
+        rx = self._utilization(rx_bytes, seconds)
+        tx = self._utilization(tx_bytes, seconds)
+        return (f"{self.baud} baud, {seconds:.0f} s: recebidos {rx_bytes} bytes "
+                f"({rx:.2%} médio, {self.rx_peak:.2%} pico), enviados {tx_bytes} bytes "
+                f"({tx:.2%} médio, {self.tx_peak:.2%} pico)")
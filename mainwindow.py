@@ -10,7 +10,7 @@
 import serial
 import time
 import datetime
-import _thread as thread
+import threading
 import struct
 import sys
 import os
@@ -18,9 +18,30 @@ import rtmidi
 import serial.tools.list_ports
 from PyQt5 import uic
 from PyQt5 import QtGui, QtWidgets
-from PyQt5.QtCore import QObject, pyqtSignal, Qt, QFile, QMetaType
+from PyQt5.QtCore import QObject, pyqtSignal, Qt, QFile, QMetaType, QTimer
 from ctypes import *
 
+from serial_parser import SerialFrameParser, FRAME_SYSEX
+from serial_reader import SerialReader
+from midi_router import MidiRoute, MidiRouter, parse_route_spec, TARGET_NONE, TARGET_MIDI, TARGET_SAMPLER, TARGET_SFZ
+from kit import pinArray, load_pins, save_pins, DISABLED_TYPES
+from hit_ring import HitRing
+from double_trigger import DoubleTriggerFilter
+from sampler import Sampler, AudioOutput, load_kit_dir
+from sfz import SfzSampler
+from hihat import HiHatRemapper, ZONE_NAMES
+from crosstalk import CrosstalkSuppressor, XTALK_ATTENUATE, XTALK_DROP
+from velocity_curve import VelocityCurves, load_custom_curves, save_custom_curves
+from curve_editor import CurveView
+from hit_timing import HitTiming, STAGES, STAGE_NAMES, STAGE_MONITOR, STAGE_SERIAL_MIDI
+from config_fetch import KitFetcher
+from tx_queue import SerialWriteQueue
+from kit_state import KitState
+from serial_reconnect import SerialReconnector, port_identity
+from link_speed import LinkStats, LINK_PROBE_ORDER, probe
+from kit_dump import KitDumpError, DUMP_WRITE_OK, decode_dump, dump_request, encode_dump
+from protocol import SERIAL_SPEED, CMD_ASKPARAM, CMD_LICENSE, CMD_DUMP, CMD_DUMP_WRITE, FIELD_PARAMS, PARAM_FIELDS, apply_param, license_reply, pearson_hash
+
 # Importa o wrapper para rtmidi.MidiOut
 try:
     from midi_wrapper import MidiOutWrapper
@@ -56,32 +77,6 @@ except ImportError:
         def close_port(self):
             self._midi_out.close_port()
 
-# NOTA: As funcionalidades relacionadas ao FluidSynth não foram completamente testadas
-# Tenta importar fluidsynth, mas trata possíveis erros
-fluidsynth_available = False
-try:
-    import fluidsynth
-    fluidsynth_available = True
-except (ImportError, SyntaxError):
-    # Se falhar, cria uma classe dummy para evitar erros
-    class DummyFluidSynth:
-        def __init__(self, *args, **kwargs):
-            pass
-        def start(self):
-            pass
-        def sfload(self, *args):
-            return 0
-        def program_select(self, *args):
-            pass
-        def noteon(self, *args):
-            pass
-        def delete(self):
-            pass
-    
-    # Substitui o módulo fluidsynth pelo dummy
-    import sys
-    sys.modules['fluidsynth'] = type('fluidsynth', (), {'Synth': DummyFluidSynth})
-    
 # Registrar tipos personalizados para uso em sinais/slots entre threads
 try:
     # Método alternativo para registrar QVector<int>
@@ -120,27 +115,86 @@ except Exception as e:
             pass
     midi_out = DummyMidiOut()
 
-#serialSpeed=31250
 # Velocidade da porta serial
-serialSpeed=115200
+serialSpeed=SERIAL_SPEED
 
-# NOTA: Inicialização do FluidSynth - funcionalidade não foi completamente testada
-if fluidsynth_available:
-    fs = fluidsynth.Synth()
-    fs.start()
-    sfid = fs.sfload("example.sf2")  # Arquivo de exemplo pode não existir
-    fs.program_select(0, sfid, 0, 0)
+# Velocidade do link após conectar: "auto" testa 2M/1M/500k e fica com a mais
+# rápida confirmada pelo firmware; um número (ex.: 1000000) pede só essa
+# velocidade; serialSpeed mantém a velocidade inicial sem negociação. Uma placa
+# que não responde à negociação não é testada de novo até reiniciar o programa
+serialLinkSpeed="auto"
 
+# Reabre automaticamente a mesma placa (pelo número de série USB) se a conexão cair
+serialReconnect=True
 
-class PIN(Structure):
-    _fields_ = [("name", c_char*20),("type", c_int),("note", c_int),("thresold", c_int),("scantime", c_int),("masktime", c_int),("retrigger", c_int),
-                ("gain", c_int),("curve", c_int),("curveform", c_int),("xtalk", c_int),("xtalkgroup", c_int),("channel", c_int)]
+# Modo de leitura da porta serial: "event" (select/epoll, acorda apenas quando
+# chegam bytes) ou "poll" (loop antigo com timeout de 1 ms + sleep)
+serialReaderMode="event"
 
-pinArray=PIN*48
-noteArray="C","C#","D","D#","E","F","F#","G","G#","A","A#","B"
+# Taxa de atualização da aba Monitor (Hz): o custo da interface depende desta
+# taxa e não da quantidade de batidas por segundo
+monitorRefreshHz=60
+
+# Histórico de mensagens exibido na aba Monitor
+monitorHistorySize=20
+
+# Leitura do kit completo: pads com pedidos em andamento e prazo (s) para
+# pedir de novo os parâmetros que não chegaram
+configFetchWindow=4
+configFetchTimeout=0.25
+
+# Dump do kit completo em uma única mensagem: prazo (s) para a resposta do
+# firmware antes de voltar para a leitura/escrita por parâmetro
+bulkDumpTimeout=0.5
+bulkRestoreTimeout=2.0
+bulkRestoreSaveTimeout=10.0
 
-Permutation = [ 0x72, 0x32, 0x25, 0x64, 0x64, 0x4f, 0x1e, 0x26, 0x2a, 0x74, 0x37, 0x09, 0x57, 0x02, 0x28,
-            0x08, 0x14, 0x23, 0x49, 0x10, 0x62, 0x02, 0x1e, 0x7e, 0x5d, 0x1b, 0x27, 0x76, 0x7a, 0x76, 0x05, 0x2e ]
+# Atualização (Hz) da tabela de latência da aba Tool enquanto a medição está ligada
+timingRefreshHz=2
+
+# Saídas MIDI extras, abertas junto com a principal (ex.: gravador, iluminação).
+# Cada rota tem fila e thread próprios; formato "Porta;notes=36-51;channels=10;cc=0"
+midiRoutes=[]
+
+# Aplica no host as curvas de velocidade de cada pad (curve/curveform/gain ou
+# curva desenhada) antes do envio MIDI; deixe a curva do Arduino em Linear
+hostVelocityCurves=False
+
+# Supressão de crosstalk no host (xtalk/xtalkgroup de cada pad): dentro da
+# janela (s), batidas abaixo de xtalk/127 da mais forte do grupo são
+# descartadas ("drop") ou atenuadas ("attenuate")
+hostCrosstalk=False
+
+# Filtro de batidas duplas no host: usa masktime (ms) e retrigger de cada pad,
+# ajustáveis na hora sem escrever no Arduino
+hostDoubleTrigger=False
+
+# Chimbal no host: a posição do pedal (CC dos pads HHC, 127 = fechado) troca
+# cada nota pela variante (aberto, meio-aberto, fechado); fechamentos rápidos
+# geram a nota de chick
+hostHiHat=False
+hihatNotes={46: (46, 46, 42)}
+crosstalkWindow=0.03
+crosstalkMode="drop"
+
+# Atualização (Hz) das estatísticas da janela Filtros do host
+hostFiltersRefreshHz=2
+
+# Sampler interno: pasta com <nota>[_v<vel máx>][_rr<n>].wav, carregada ao
+# selecionar "Sampler interno"; o áudio em tempo real usa o sounddevice
+samplerKitDir="samples"
+samplerVoices=64
+samplerBlockSize=128
+
+# Instrumento SFZ tocado pelo destino "SFZ"; vazio pergunta o arquivo na
+# primeira seleção. As amostras são mapeadas em memória, não lidas inteiras
+sfzFile=""
+
+# Porta criada pelo simulador (edrum_simulator.py); listada quando existir
+simulatorSerialPort="/tmp/ttyEDRUM0"
+
+
+noteArray="C","C#","D","D#","E","F","F#","G","G#","A","A#","B"
 
 
 class MainWindow ( QMainWindow ):
@@ -153,8 +207,9 @@ class MainWindow ( QMainWindow ):
     pbPinArray=[]
 
     # Usar sinais com tipos básicos para evitar problemas de compatibilidade
-    updateMonitor = pyqtSignal(int,int,int)  # cmd, note, velocity
     logMessage = pyqtSignal(str)
+    # Executa uma função no thread da interface (callbacks da fila serial)
+    guiCall = pyqtSignal(object)
     
     # Desabilitar mensagens de aviso do Qt
     @staticmethod
@@ -184,26 +239,55 @@ class MainWindow ( QMainWindow ):
         self.ui = Ui_MainWindow()
         self.ui.setupUi( self )
         
+        # Último estado conhecido do kit no Arduino e campos alterados desde então
+        self.kit_state = KitState()
+        
         # Adiciona o botão para desabilitar todos os pinos
         self.addDisableAllButton()
         
+        # Adiciona o botão para enviar apenas os parâmetros alterados
+        self.addSyncChangedButton()
+        
+        # Adiciona os botões de leitura/envio do kit completo
+        self.addKitButtons()
+        
         # Adiciona o botão para resetar o monitor
         self.addResetMonitorButton()
         
         # Adiciona informações sobre funcionalidades não testadas
-        self.ui.rbFluidsynth.setText("To FluidSynth (não testado)")
-        self.ui.rbSFZ.setText("To SFZ (não testado)")
-        self.ui.rbSFZ.setEnabled(False)  # Desabilita a opção SFZ que não foi implementada
+        self.ui.rbSampler.setText("Sampler interno")
+        self.ui.rbSFZ.setText("SFZ")
         
         # Corrigir o botão de atualizar MIDI
         self.ui.tbReloadmidi.setText("↻")
         
-        # Inicializar a variável thread_running
-        self.thread_running = False
+        # Thread de leitura serial: sinalizado por reader_stop e aguardado com join
+        self.reader_thread = None
+        self.reader_stop = threading.Event()
+        self.serial_reader = None
         
         # Flag para controlar se já carregou configurações do Arduino
         self.configs_loaded_from_arduino = False
         
+        # Fila de transmissão: único dono das escritas na porta serial enquanto conectado
+        self.tx_queue = None
+        self.guiCall.connect(self.handle_guiCall)
+        
+        # Reconexão automática em andamento (SerialReconnector) ou None
+        self.reconnector = None
+        self.serial_identity = None
+        self.link_baud = serialSpeed
+        
+        # Suporte do firmware ao dump do kit completo (None = ainda não testado)
+        self.bulk_dump_supported = None
+        self.bulk_dump_pending = False
+        self.bulk_restore_pending = False
+        
+        # Leitura do kit completo em pipeline, acionada por um timer curto
+        self.kit_fetcher = None
+        self.fetchTimer = QTimer(self)
+        self.fetchTimer.timeout.connect(self.pollKitFetch)
+        
         # Adicionar tooltips aos botões principais
         self.ui.pbUploadAll.setToolTip("GET ALL (↑): Recebe todas as configurações do Arduino para a interface")
         self.ui.pbDownloadAll.setToolTip("SET ALL (↓): Envia todas as configurações da interface para o Arduino")
@@ -253,15 +337,28 @@ class MainWindow ( QMainWindow ):
         
         # Configurar o log na aba Tool
         self.ui.logOutput = QtWidgets.QTextEdit(self.ui.tab_2)
-        self.ui.logOutput.setGeometry(10, 10, 760, 410)
+        self.ui.logOutput.setGeometry(10, 10, 470, 410)
         self.ui.logOutput.setReadOnly(True)
         self.ui.logOutput.setLineWrapMode(QtWidgets.QTextEdit.NoWrap)
         self.ui.logOutput.setStyleSheet("font-family: Menlo, Monaco, Courier, monospace;")
         self.logMessage.connect(self.handle_logMessage)
         
+        # Medição de latência por batida, ao lado do log
+        self.hit_timing = HitTiming()
+        self.setupTimingPanel()
+        
         # Configurar a aba About
         self.setup_about_tab()
         
+        # Curvas de velocidade do host; as tabelas acompanham o índice de notas
+        self.velocity_curves = VelocityCurves(self.pins, load_custom_curves())
+        self.crosstalk = CrosstalkSuppressor(self.pins, crosstalkWindow, crosstalkMode)
+        self.double_trigger = DoubleTriggerFilter(self.pins)
+        self.hihat = HiHatRemapper(self.pins, hihatNotes)
+        
+        # Índice nota -> pads usado pela aba Monitor (reconstruído quando tipo/nota mudam)
+        self.rebuildNoteIndex()
+        
         # Carregar configurações do arquivo pins.ini como fallback
         self.load_pins_from_file()
     
@@ -270,7 +367,27 @@ class MainWindow ( QMainWindow ):
         for note in range(100):
             self.ui.cbNote.addItem(self.getNoteString(note))
 
-        self.updateMonitor.connect(self.handle_updateMonitor)
+        # O thread de leitura coloca as batidas no buffer circular e a aba
+        # Monitor o esvazia em uma taxa fixa, agrupando os picos por pad
+        self.hit_ring = HitRing(1024)
+        self.monitorTimer = QTimer(self)
+        self.monitorTimer.timeout.connect(self.drainMonitor)
+        self.monitorTimer.start(int(1000 / monitorRefreshHz))
+        
+        # Roteador das batidas: o destino é definido pelos radio buttons no
+        # thread da interface, nunca consultado pelo thread de leitura
+        self.sampler = None
+        self.sfz = None
+        self.audio_out = None
+        self.router = MidiRouter(midi_out)
+        # Radio button do destino em uso; volta a ele se o novo destino falhar
+        self.outputButton = None
+        for rb in (self.ui.rbMIDI, self.ui.rbSampler, self.ui.rbSFZ):
+            rb.toggled.connect(self.selectOutputTarget)
+        self.selectOutputTarget()
+        self.openMidiRoutes()
+        self.setupCurveEditor()
+        self.setupHostFilters()
             
         #MIDI OUT
         for port_name in midi_out.ports:
@@ -280,6 +397,8 @@ class MainWindow ( QMainWindow ):
         serialports=serial.tools.list_ports.comports()
         for port in serialports:
             self.ui.cbSerial.addItem(port[0])
+        if os.path.exists(simulatorSerialPort):
+            self.ui.cbSerial.addItem(simulatorSerialPort)
 
         self.ui.tPinList.setCurrentCell(0,0)
         
@@ -287,15 +406,17 @@ class MainWindow ( QMainWindow ):
         self.log("Mega Arduino eDrum inicializado")
         
     def __del__ ( self ):
-        # Sinaliza para o thread parar
-        if hasattr(self, 'thread_running'):
-            self.thread_running = False
-            time.sleep(1.0)  # Dá mais tempo para o thread terminar
+        # Para o thread de leitura antes de fechar a porta
+        if hasattr(self, 'reader_thread'):
+            self.stopReader()
+        
+        if hasattr(self, 'tx_queue'):
+            self.stopTxQueue()
         
         # Fecha a porta serial se estiver aberta
         if hasattr(self, 'ser') and hasattr(self.ser, 'isOpen') and self.ser.isOpen():
             try:
-                self.ser.close()
+                self.closeSerial()
                 print("Porta serial fechada durante destruição do objeto")
             except Exception as e:
                 print(f"Erro ao fechar porta serial: {e}")
@@ -303,24 +424,26 @@ class MainWindow ( QMainWindow ):
         # Limpa recursos
         if hasattr(self, 'ui'):
             self.ui = None
-        if fluidsynth_available:    
-            fs.delete()
         
     def closeEvent(self, event):
-        # Sinaliza para o thread parar
-        self.thread_running = False
-        
-        # Espera o thread terminar
-        time.sleep(1.0)
+        # Para a reconexão e o thread de leitura antes de fechar a porta
+        self.stopReconnect()
+        self.stopReader()
         
         # Salva as configurações
         self.save_pins_to_file()
+        
+        self.stopTxQueue()
+        self.closeMidiRoutes()
+        self.stopSampler()
             
         # Fecha a porta serial se estiver aberta
         if hasattr(self, 'ser') and self.ser.isOpen():
             try:
-                self.ser.close()
-                self.log("Porta serial fechada durante encerramento")
+                if self.closeSerial():
+                    self.log("Porta serial fechada durante encerramento")
+                else:
+                    print("Porta serial será fechada quando o thread de leitura terminar")
             except Exception as e:
                 print(f"Erro ao fechar porta serial: {e}")
             
@@ -331,86 +454,58 @@ class MainWindow ( QMainWindow ):
     def load_pins_from_file(self):
         """Carrega as configurações do arquivo pins.ini"""
         try:
-            f = open("pins.ini", "r")
-            try:
-                i=0
-                for line in f:
-                    data=line.rstrip().split(';')
-                    self.pins[i].name=data[0].encode()
-                    self.pins[i].type=int(data[1])
-                    self.pins[i].note=int(data[2])
-                    self.pins[i].thresold=int(data[3])
-                    self.pins[i].scantime=int(data[4])
-                    self.pins[i].masktime=int(data[5])
-                    self.pins[i].retrigger=int(data[6])
-                    self.pins[i].gain=int(data[7])
-                    self.pins[i].curve=int(data[8])
-                    self.pins[i].curveform=int(data[9])
-                    self.pins[i].xtalk=int(data[10])
-                    self.pins[i].xtalkgroup=int(data[11])
-                    self.pins[i].channel=int(data[12])
-                    i=i+1
-                self.log("Configurações carregadas do arquivo pins.ini")
-                # Atualiza a interface com as configurações carregadas
-                self.updateList()
-                # Seleciona o primeiro item da lista para mostrar os detalhes
-                self.ui.tPinList.setCurrentCell(0, 0)
-                self.selectPin()
-            finally:
-                f.close()
+            load_pins(self.pins, "pins.ini")
+            self.log("Configurações carregadas do arquivo pins.ini")
+            self.rebuildNoteIndex()
+            self.rebuildHostFilters()
+            # Atualiza a interface com as configurações carregadas
+            self.updateList()
+            # Seleciona o primeiro item da lista para mostrar os detalhes
+            self.ui.tPinList.setCurrentCell(0, 0)
+            self.selectPin()
         except IOError:
             self.log("Arquivo pins.ini não encontrado. Usando configurações padrão.")
     
     def save_pins_to_file(self):
         """Salva as configurações atuais no arquivo pins.ini"""
         try:
-            f = open("pins.ini", "w")
-            try:
-                for pin in self.pins:
-                    f.write(pin.name.decode()+';'+str(pin.type)+';'+str(pin.note)+';'+str(pin.thresold)+';'+str(pin.scantime)+';'+str(pin.masktime)+';'+str(pin.retrigger)+';'+str(pin.gain)+';'+str(pin.curve)+';'+str(pin.curveform)+';'+str(pin.xtalk)+';'+str(pin.xtalkgroup)+';'+str(pin.channel)+'\n')
-                self.log("Configurações salvas no arquivo pins.ini")
-            finally:
-                f.close()
+            save_pins(self.pins, "pins.ini")
+            self.log("Configurações salvas no arquivo pins.ini")
         except Exception as e:
             self.log(f"Erro ao salvar configurações: {e}")
     def enableSerial(self, bool):
         """Habilita ou desabilita a conexão serial com o Arduino"""
         # Primeiro, garantir que o thread seja parado se estiver desabilitando
         if not bool:
-            # Desativa o thread antes de qualquer operação
-            self.thread_running = False
-            time.sleep(1.0)  # Dá mais tempo para o thread terminar completamente
+            # Para o thread antes de qualquer operação: a porta só é fechada
+            # depois que ele terminou, então nenhuma leitura ocorre com ela fechada
+            self.stopReconnect()
+            self.stopReader()
         
         if bool:
             port=str(self.ui.cbSerial.currentText())
             try:
-                # Configura a porta serial com parâmetros otimizados para baixa latência
-                self.ser = serial.Serial(
-                    port=port,
-                    baudrate=serialSpeed,
-                    bytesize=8,
-                    parity="N",
-                    stopbits=1,
-                    timeout=0.001,  # Timeout baixo para leitura responsiva
-                    write_timeout=0.1,  # Timeout de escrita para evitar bloqueios
-                    inter_byte_timeout=None,  # Sem timeout entre bytes para leitura contínua
-                    exclusive=True  # Acesso exclusivo à porta para melhor performance
-                )
+                self.ser = self.openSerialPort(port)
+                # Identidade USB usada para reencontrar a placa se a conexão cair
+                self.serial_identity = port_identity(port)
+                
+                # Aguarda estabilização da conexão (o Mega reinicia ao abrir a porta)
+                time.sleep(1.0)
                 
-                # Configura o tamanho do buffer se disponível
-                if hasattr(self.ser, 'set_buffer_size'):
-                    try:
-                        self.ser.set_buffer_size(rx_size=4096, tx_size=4096)
-                    except:
-                        pass
+                # Negocia uma velocidade maior antes de iniciar a leitura
+                self.negotiateLinkSpeed()
+                self.link_stats = LinkStats(self.ser.baudrate)
+                self.serial_parser = None  # recriado por startReader() nesta sessão
+                self.linkTimer.start(1000)
                 
-                # Inicia o thread somente após abrir a porta serial
-                self.thread_running = True
-                thread.start_new_thread(self.read_midi, ("MIDI_Thread", 0.001, ))  # Reduz o delay do thread
-                self.log(f"Porta serial {port} aberta com sucesso")
+                # Todas as escritas passam pela fila de transmissão
+                self.tx_queue = SerialWriteQueue(self.ser, on_error=lambda e: self.log(f"Erro ao enviar pela porta serial: {e}"))
+                self.tx_queue.start()
                 
-                # Aguarda estabilização da conexão
-                time.sleep(1.0)
+                # Inicia o thread somente após abrir a porta serial
+                self.startReader()
+                self.link_baud = self.ser.baudrate
+                self.log(f"Porta serial {port} aberta com sucesso ({self.ser.baudrate} baud)")
                 
                 # Mostra mensagem informando que está carregando configurações
                 self.log("Carregando configurações do Arduino...")
@@ -426,6 +521,13 @@ class MainWindow ( QMainWindow ):
                 self.setWindowTitle(f"Mega Arduino eDrum - Conectado a {port}")
             except Exception as e:
                 self.log(f"Erro ao abrir porta serial {port}: {e}")
+                self.linkTimer.stop()
+                self.link_stats = None
+                # Desfaz o que chegou a ser iniciado, na mesma ordem do desligamento
+                self.stopReader()
+                self.stopTxQueue()
+                if hasattr(self, 'ser') and self.ser.isOpen():
+                    self.closeSerial()
                 # Desabilita os botões em caso de erro
                 self.update_button_states(False)
                 # Desmarca o checkbox sem chamar este método novamente
@@ -434,16 +536,187 @@ class MainWindow ( QMainWindow ):
                 self.ui.ckSerialEnable.blockSignals(False)
                 self.setWindowTitle("Mega Arduino eDrum - Desconectado")
         else:
-            # A porta já foi fechada no início do método
+            # O thread de leitura já terminou no início do método
+            self.logLinkSummary()
+            self.stopTxQueue()
             if hasattr(self, 'ser') and self.ser.isOpen():
                 try:
-                    self.ser.close()
-                    self.log("Porta serial fechada")
+                    if self.closeSerial():
+                        self.log("Porta serial fechada")
+                    else:
+                        self.log("Porta serial será fechada quando o thread de leitura terminar")
                 except Exception as e:
                     self.log(f"Erro ao fechar porta serial: {e}")
             # Desabilita os botões quando a porta é fechada
             self.update_button_states(False)
             self.setWindowTitle("Mega Arduino eDrum - Desconectado")
+    def openSerialPort(self, port):
+        """Abre a porta com os parâmetros de baixa latência (também usado na reconexão)"""
+        ser = serial.Serial(
+            port=port,
+            baudrate=serialSpeed,
+            bytesize=8,
+            parity="N",
+            stopbits=1,
+            timeout=0.001,  # Timeout baixo para leitura responsiva
+            write_timeout=0.1,  # Timeout de escrita para evitar bloqueios
+            inter_byte_timeout=None,  # Sem timeout entre bytes para leitura contínua
+            exclusive=True  # Acesso exclusivo à porta para melhor performance
+        )
+        
+        # Configura o tamanho do buffer se disponível
+        if hasattr(ser, 'set_buffer_size'):
+            try:
+                ser.set_buffer_size(rx_size=4096, tx_size=4096)
+            except:
+                pass
+        return ser
+    def serialLost(self):
+        """Chamado quando o thread de leitura perde a porta: fecha tudo e reconecta"""
+        if not self.ui.ckSerialEnable.isChecked() or self.reconnector is not None:
+            return
+        self.log("Conexão serial perdida; tentando reconectar...")
+        self.stopReader()
+        self.logLinkSummary()
+        self.stopTxQueue()
+        try:
+            self.closeSerial()
+        except Exception:
+            pass
+        self.update_button_states(False)
+        self.setWindowTitle("Mega Arduino eDrum - Reconectando...")
+        self.reconnector = SerialReconnector(
+            self.serial_identity, self.openSerialPort, baud=self.link_baud,
+            on_connected=lambda ser, port, elapsed: self.guiCall.emit(lambda: self.serialReconnected(ser, port, elapsed)))
+        self.reconnector.start()
+    def serialReconnected(self, ser, port, elapsed):
+        """Retoma a sessão na porta reaberta, mantendo o kit já carregado"""
+        reconnector, self.reconnector = self.reconnector, None
+        if reconnector is None or reconnector.stopped or not self.ui.ckSerialEnable.isChecked():
+            ser.close()
+            return
+        self.ser = ser
+        self.link_stats = LinkStats(ser.baudrate)
+        self.serial_parser = None
+        self.hihat.forget_pedal()
+        self.linkTimer.start(1000)
+        self.tx_queue = SerialWriteQueue(self.ser, on_error=lambda e: self.log(f"Erro ao enviar pela porta serial: {e}"))
+        self.tx_queue.start()
+        self.startReader()
+        # O kit em memória é mantido: nada é lido de novo do Arduino
+        self.log(f"Reconectado a {port} em {int(elapsed * 1000)} ms ({ser.baudrate} baud, "
+                 f"{reconnector.attempts} tentativas); kit mantido")
+        self.update_button_states(True)
+        self.setWindowTitle(f"Mega Arduino eDrum - Conectado a {port}")
+    def stopReconnect(self):
+        if self.reconnector is not None:
+            self.reconnector.stop()
+            self.reconnector = None
+    def negotiateLinkSpeed(self):
+        """Pede ao firmware a velocidade configurada em serialLinkSpeed"""
+        if serialLinkSpeed == serialSpeed:
+            return
+        try:
+            # Placas sem CMD_BAUD ficam registradas: as próximas conexões não esperam o prazo
+            candidates = LINK_PROBE_ORDER if serialLinkSpeed == "auto" else (serialLinkSpeed,)
+            baud = probe(self.ser, candidates, identity=self.serial_identity)
+        except (serial.SerialException, OSError, ValueError) as e:
+            self.log(f"Erro ao negociar a velocidade do link: {e}")
+            return
+        if baud != serialSpeed:
+            self.log(f"Velocidade do link negociada: {baud} baud")
+        else:
+            self.log(f"Firmware não confirmou velocidade maior; mantendo {baud} baud")
+    def linkBytes(self):
+        """Bytes recebidos e enviados na sessão atual"""
+        parser = getattr(self, 'serial_parser', None)
+        rx = parser.bytes_received if parser is not None else 0
+        tx = self.tx_queue.bytes_written if self.tx_queue is not None else 0
+        return rx, tx
+    def refreshLinkStats(self):
+        """Mostra o uso do link no último segundo (chamado pelo timer enquanto conectado)"""
+        if self.link_stats is None:
+            return
+        rx, tx = self.link_stats.sample(*self.linkBytes())
+        self.ui.lLinkStats.setText(f"Link {self.link_stats.baud} baud: RX {rx:.1%} (pico {self.link_stats.rx_peak:.1%}), "
+                                   f"TX {tx:.1%}")
+    def logLinkSummary(self):
+        self.linkTimer.stop()
+        if self.link_stats is not None:
+            self.log("Uso do link na sessão: " + self.link_stats.summary(*self.linkBytes()))
+            self.link_stats = None
+    def startReader(self):
+        """Inicia o thread de leitura da porta atual"""
+        # Parser e leitor criados aqui para que stopReader() sempre acorde o leitor certo
+        parser = SerialFrameParser()
+        reader = SerialReader(self.ser, parser, serialReaderMode)
+        self.serial_parser = parser
+        self.serial_reader = reader
+        self.reader_stop = threading.Event()
+        self.reader_thread = threading.Thread(target=self.read_midi, args=(self.reader_stop, reader, 0.001),
+                                              name="SerialReader", daemon=True)
+        self.reader_thread.start()
+    def stopReader(self, timeout=1.0):
+        """Sinaliza o thread de leitura e espera ele terminar
+
+        Retorna False se ele continuar ativo depois de cancelar a leitura: o
+        thread e o leitor são mantidos e a porta só pode ser fechada por
+        closeSerial(), que espera a saída dele.
+        """
+        self.reader_stop.set()
+        if self.serial_reader is not None:
+            self.serial_reader.wakeup()  # Acorda o thread bloqueado em select/epoll
+        reader_thread = self.reader_thread
+        if reader_thread is not None and reader_thread is not threading.current_thread():
+            reader_thread.join(timeout)
+            if reader_thread.is_alive():
+                # Preso dentro de uma leitura da porta: cancela e espera de novo
+                try:
+                    self.ser.cancel_read()
+                except Exception:
+                    pass
+                reader_thread.join(timeout)
+            if reader_thread.is_alive():
+                print("Aviso: thread de leitura não terminou no prazo")
+                return False
+        self.reader_thread = None
+        # Fecha o epoll e o pipe de wakeup só depois que o thread saiu
+        if self.serial_reader is not None:
+            self.serial_reader.close()
+            self.serial_reader = None
+        return True
+    def closeSerial(self):
+        """Fecha a porta; com o thread de leitura ainda ativo, só depois que ele sair
+
+        Retorna False quando o fechamento foi adiado para um thread auxiliar.
+        """
+        ser = self.ser
+        reader_thread, serial_reader = self.reader_thread, self.serial_reader
+        if reader_thread is None or not reader_thread.is_alive() or reader_thread is threading.current_thread():
+            if ser.isOpen():
+                ser.close()
+            return True
+        self.reader_thread = self.serial_reader = None
+        def close_later():
+            reader_thread.join()
+            if serial_reader is not None:
+                serial_reader.close()
+            ser.close()
+        threading.Thread(target=close_later, name="SerialClose", daemon=True).start()
+        return False
+    def sendSerial(self, txData):
+        """Envia bytes pela fila de transmissão (ou diretamente, se ela não existir)"""
+        if self.tx_queue is not None:
+            self.tx_queue.write(txData)
+        else:
+            self.ser.write(txData)
+    def stopTxQueue(self):
+        """Para a fila de transmissão antes de fechar a porta"""
+        if self.tx_queue is not None:
+            self.tx_queue.stop()
+            self.tx_queue = None
+    def handle_guiCall(self, fn):
+        fn()
     def request_all_arduino_configs(self):
         """Solicita todas as configurações do Arduino"""
         if not hasattr(self, 'ser') or not self.ser.isOpen():
@@ -455,28 +728,144 @@ class MainWindow ( QMainWindow ):
         # Limpa o flag de configurações carregadas
         self.configs_loaded_from_arduino = False
         
-        # Solicita configurações para cada pin (0-47)
-        for pin_num in range(48):
-            data = 0xF0,0x77,0x02,pin_num,0x7F,0x00,0xF7
-            txData = struct.pack("B"*len(data), *data)
-            self.ser.write(txData)
-            time.sleep(0.1)  # Pequeno delay entre solicitações
-            
-            # Processa eventos para manter a interface responsiva
-            QtWidgets.QApplication.processEvents()
+        # Tenta primeiro o dump do kit completo em uma única mensagem; firmwares
+        # que não o suportam não respondem e a leitura passa a ser por parâmetro
+        if self.bulk_dump_supported is not False:
+            self.bulk_dump_started = time.monotonic()
+            self.bulk_dump_pending = True
+            self.sendSerial(dump_request())
+            QTimer.singleShot(int(bulkDumpTimeout * 1000), self.bulkDumpTimedOut)
+            return True
+        return self.startKitFetch()
+    def startKitFetch(self):
+        """Leitura do kit parâmetro por parâmetro"""
+        if self.tx_queue is None:
+            return False
+        
+        # Mantém alguns pads com pedidos em andamento e pede de novo o que faltar;
+        # a interface continua livre enquanto as respostas chegam
+        if self.kit_fetcher is not None:
+            self.kit_fetcher.cancel()
+        self.kit_fetcher = KitFetcher(self.sendSerial, window=configFetchWindow, timeout=configFetchTimeout,
+                                      on_finished=self.kitFetchFinished)
+        self.kit_fetcher.start()
+        self.fetchTimer.start(10)
             
         self.log("Solicitação de configurações enviada. Aguardando resposta...")
         return True
-    def read_midi(self, threadName, delay):
-        # Thread_running já é inicializado no __init__
-            
+    def pollKitFetch(self):
+        """Chamado pelo timer enquanto a leitura do kit está em andamento"""
+        fetcher = self.kit_fetcher
+        if fetcher is None or not fetcher.active:
+            self.fetchTimer.stop()
+            return
+        try:
+            fetcher.poll()
+        except (serial.SerialException, OSError) as e:
+            self.log(f"Erro ao solicitar configurações: {e}")
+            fetcher.cancel()
+            self.fetchTimer.stop()
+            # Parâmetros que já chegaram foram aplicados sem reconstruir nada
+            self.rebuildNoteIndex()
+            self.rebuildHostFilters()
+    def paramReceived(self, pin):
+        """Atualiza a lista e, se o pad recebido está selecionado, os controles"""
+        self.updateList()
+        if self.ui.tPinList.currentRow() == pin:
+            self.selectPin()
+    def kitFetchFinished(self, received, total, failed):
+        """Fim da leitura do kit: atualiza a interface uma única vez"""
+        self.fetchTimer.stop()
+        elapsed_ms = int(self.kit_fetcher.elapsed * 1000)
+        if failed:
+            self.log(f"Configurações do Arduino incompletas: {received}/{total} parâmetros em {elapsed_ms} ms")
+            for pin, params in sorted(failed.items()):
+                self.log(f"  PIN {pin}: sem resposta para os parâmetros {', '.join(hex(p) for p in params)}")
+        else:
+            self.configs_loaded_from_arduino = True
+            self.log(f"Configurações carregadas do Arduino com sucesso ({received}/{total} parâmetros em {elapsed_ms} ms)")
+        if received:
+            self.refreshAfterKitLoad()
+    def refreshAfterKitLoad(self):
+        """Atualiza a interface uma única vez após receber o kit do Arduino"""
+        # Salva as configurações no arquivo pins.ini
+        self.save_pins_to_file()
+        self.updateList()
+        self.rebuildNoteIndex()
+        self.rebuildHostFilters()
+        # Seleciona o primeiro item da lista para mostrar os detalhes
+        self.ui.tPinList.setCurrentCell(0, 0)
+        self.selectPin()
+    def bulkDumpReceived(self, count):
+        """Dump do kit completo recebido e aplicado pelo thread de leitura"""
+        self.bulk_dump_supported = True
+        self.configs_loaded_from_arduino = True
+        elapsed_ms = int((time.monotonic() - self.bulk_dump_started) * 1000)
+        self.log(f"Configurações carregadas do Arduino com sucesso (dump de {count} pads em {elapsed_ms} ms)")
+        self.refreshAfterKitLoad()
+    def bulkDumpTimedOut(self, unsupported=True):
+        """Sem dump válido no prazo: volta para a leitura por parâmetro"""
+        if not self.bulk_dump_pending:
+            return
+        self.bulk_dump_pending = False
+        if unsupported:
+            self.bulk_dump_supported = False
+            self.log("Firmware sem suporte a dump do kit; lendo parâmetro por parâmetro")
+        self.startKitFetch()
+    def restoreKit(self):
+        """Envia o kit completo da interface para o Arduino"""
+        if self.tx_queue is None:
+            self.log("Erro: Porta serial não está aberta")
+            return
+        save = self.ui.ckSave.isChecked()
+        self.restore_started = time.monotonic()
+        if self.bulk_dump_supported:
+            # Uma única mensagem; a confirmação chega como CMD_DUMP_WRITE
+            self.bulk_restore_pending = True
+            self.log("Enviando o kit completo para o Arduino (dump)...")
+            self.sendSerial(encode_dump(self.pins, save=save))
+            timeout = bulkRestoreSaveTimeout if save else bulkRestoreTimeout
+            QTimer.singleShot(int(timeout * 1000), self.bulkRestoreTimedOut)
+        else:
+            self.restoreKitByParam()
+    def restoreKitByParam(self):
+        """Envia todos os parâmetros de todos os pads pela fila de transmissão"""
+        if self.tx_queue is None:
+            return
+        self.log("Enviando o kit completo para o Arduino parâmetro por parâmetro...")
+        params = [(i, param, getattr(self.pins[i], field)) for i in range(len(self.pins))
+                  for param, field in PARAM_FIELDS.items()]
+        self.tx_queue.set_params(params, save=self.ui.ckSave.isChecked(),
+                                 callback=lambda batch: self.guiCall.emit(lambda: self.restoreKitFinished(batch)))
+    def restoreKitFinished(self, batch):
+        elapsed_ms = int((time.monotonic() - self.restore_started) * 1000)
+        if batch.failed:
+            self.log(f"Kit enviado: {batch.ok}/{batch.total} parâmetros confirmados em {elapsed_ms} ms")
+        else:
+            self.log(f"Kit enviado com sucesso: {batch.ok} parâmetros confirmados em {elapsed_ms} ms")
+    def bulkRestoreAcked(self, status):
+        if not self.bulk_restore_pending:
+            return
+        self.bulk_restore_pending = False
+        elapsed_ms = int((time.monotonic() - self.restore_started) * 1000)
+        if status == DUMP_WRITE_OK:
+            self.kit_state.set_device_pins(self.pins, len(self.pins), self.pins)
+            self.log(f"Kit enviado com sucesso (dump em {elapsed_ms} ms)")
+        else:
+            self.log(f"Arduino rejeitou o dump do kit (status {status}); enviando parâmetro por parâmetro")
+            self.restoreKitByParam()
+    def bulkRestoreTimedOut(self):
+        if not self.bulk_restore_pending:
+            return
+        self.bulk_restore_pending = False
+        self.log("Sem confirmação do dump do kit; enviando parâmetro por parâmetro")
+        self.restoreKitByParam()
+    def read_midi(self, stop, reader, delay):
+        """Loop do thread de leitura; termina quando ``stop`` é sinalizado"""
         self.log(f"Thread MIDI iniciado")
         
-        # Variável local para controle do loop
-        local_thread_running = True
-        
-        # Contador para verificar se recebemos configurações do Arduino
-        params_received = 0
+        # Parser incremental: drena a porta em blocos e separa os frames completos
+        parser = reader.parser
         
         # Aumenta a prioridade do thread para reduzir latência
         try:
@@ -493,192 +882,122 @@ class MainWindow ( QMainWindow ):
         except Exception:
             pass  # Ignora erros ao tentar ajustar a prioridade
             
-        # Configura o timeout da porta serial para ser mais responsivo
-        if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.timeout = 0.001  # Timeout muito baixo para leitura mais frequente
+        # Leitor orientado a eventos (select/epoll) quando suportado; o timeout
+        # da porta já foi configurado ao criar o leitor, fora do loop de leitura
+        self.log(f"Leitura serial no modo '{reader.mode}'")
             
         # Registrar QVector<int> neste thread também
         MainWindow.registerTypes()
             
-        while local_thread_running:
+        # A porta só é fechada depois do join deste thread: o teste do evento
+        # antes de cada leitura basta para nunca ler uma porta fechada
+        while not stop.is_set():
             try:
-                # Verifica se o thread deve continuar rodando
-                local_thread_running = self.thread_running
-                
-                # Se o thread não deve mais rodar, sai do loop
-                if not local_thread_running:
-                    break
-                    
-                if hasattr(self, 'ser') and self.ser.isOpen():
-                    try:
-                        # Usa timeout muito baixo para reduzir latência
-                        self.ser.timeout = 0.001  # Timeout menor para leitura mais responsiva
-                        rxData = self.ser.read(1)
-                        if len(rxData) <= 0:
-                            # Reduz o tempo de espera para melhorar a responsividade
-                            time.sleep(0.001)
-                            continue
-                    except (serial.SerialException, OSError):
-                        # Se ocorrer erro na leitura, verifica se a porta ainda está aberta
-                        if not self.thread_running or not hasattr(self, 'ser') or not self.ser.isOpen():
-                            break
-                        time.sleep(delay)
-                        continue
-                        
-                    try:
-                        cmd=rxData[0]
-                        if cmd==0xF0:  # Em Python 3, bytes são números, não caracteres
-                            try:
-                                # Usa timeout muito baixo para reduzir latência
-                                self.ser.timeout = 0.001  # Timeout menor para leitura mais responsiva
-                                rxData = self.ser.read(6)
-                                if len(rxData) < 6:
-                                    continue
-                                    
-                                # Usar list() para evitar problemas com QVector<int>
-                                data = list(struct.unpack("B"*len(rxData), rxData))
-                                if data[1]==0x02: #ASKPARAM
-                                    param_name = ""
-                                    if data[3]==0x0D: #TYPE
-                                        self.pins[data[2]].type=data[4]
-                                        param_name = "TYPE"
-                                    if data[3]==0x00: #NOTE
-                                        self.pins[data[2]].note=data[4]
-                                        param_name = "NOTE"
-                                    if data[3]==0x01: #THRESOLD
-                                        self.pins[data[2]].thresold=data[4]
-                                        param_name = "THRESOLD"
-                                    if data[3]==0x02: #SCANTIME
-                                        self.pins[data[2]].scantime=data[4]
-                                        param_name = "SCANTIME"
-                                    if data[3]==0x03: #MASKTIME
-                                        self.pins[data[2]].masktime=data[4]
-                                        param_name = "MASKTIME"
-                                    if data[3]==0x04: #RETRIGGER
-                                        self.pins[data[2]].retrigger=data[4]
-                                        param_name = "RETRIGGER"
-                                    if data[3]==0x05: #CURVE
-                                        self.pins[data[2]].curve=data[4]
-                                        param_name = "CURVE"
-                                    if data[3]==0x06: #XTALK
-                                        self.pins[data[2]].xtalk=data[4]
-                                        param_name = "XTALK"
-                                    if data[3]==0x07: #XTALKGROUP
-                                        self.pins[data[2]].xtalkgroup=data[4]
-                                        param_name = "XTALKGROUP"
-                                    if data[3]==0x08: #CURVEFORM
-                                        self.pins[data[2]].curveform=data[4]
-                                        param_name = "CURVEFORM"
-                                    if data[3]==0x09: #GAIN
-                                        self.pins[data[2]].gain=data[4]
-                                        param_name = "GAIN"
-                                    if data[3]==0x0E: #CHANNEL
-                                        self.pins[data[2]].channel=data[4]
-                                        param_name = "CHANNEL"
-                                    
-                                    # Incrementa o contador de parâmetros recebidos
-                                    params_received += 1
-                                    
-                                    # Se recebemos muitos parâmetros, consideramos que as configurações foram carregadas
-                                    if params_received >= 10 and not self.configs_loaded_from_arduino:
-                                        self.configs_loaded_from_arduino = True
-                                        self.log("Configurações carregadas do Arduino com sucesso")
-                                        # Salva as configurações no arquivo pins.ini
-                                        self.save_pins_to_file()
-                                        # Seleciona o primeiro item da lista para mostrar os detalhes
-                                        self.ui.tPinList.setCurrentCell(0, 0)
-                                        self.selectPin()
-                                    
-                                    self.log(f"Parâmetro recebido: PIN {data[2]}, {param_name}={data[4]}")
-                                    
-                                    # Atualiza a lista de pins na interface
-                                    self.updateList()
-                                    
-                                    # Se o pin atual é o que está sendo exibido, atualiza os controles da interface
-                                    current_pin = self.ui.tPinList.currentRow()
-                                    if current_pin == data[2]:
-                                        self.selectPin()
-                                        
-                                    # Força a atualização visual da interface
-                                    QtWidgets.QApplication.processEvents()
-                                if data[1]==0x60:#License
-                                    # Usar list() para evitar problemas com QVector<int>
-                                    hash_value = self.getPearsonHash(list(data[2:4]))
-                                    self.log(f"Solicitação de licença recebida: {data[2]},{data[3]} -> hash={hash_value}")
-                                    dataSend = 0xF0,0x77,0x60,data[2],data[3],hash_value,0xF7
-                                    txData = struct.pack("B"*len(dataSend), *dataSend)
-                                    if hasattr(self, 'ser') and self.ser.isOpen():
-                                        self.ser.write(txData)
-                                        self.log("Resposta de licença enviada")
-                            except Exception as e:
-                                # Verifica se a porta ainda está aberta antes de logar o erro
-                                if self.thread_running and hasattr(self, 'ser') and self.ser.isOpen():
-                                    print(f"Erro ao processar comando SysEx: {e}")
-                                continue
-                        else:
-                            try:
-                                self.ser.timeout = 0.5  # Define um timeout para evitar bloqueio
-                                rxData = self.ser.read(2)
-                                if len(rxData) < 2:
-                                    continue
-                                    
-                                # Em Python 3, bytes já são números, não precisamos de ord()
-                                note = rxData[0]
-                                vel = rxData[1]
-                                # Prioriza o processamento de mensagens MIDI para reduzir latência
-                                if self.ui.rbMIDI.isChecked():
-                                    # Envia a mensagem MIDI imediatamente com alta prioridade
-                                    try:
-                                        # Envia a mensagem MIDI antes de qualquer outro processamento
-                                        midi_out.send_message([cmd, note, vel]) # Note on
-                                        
-                                        # Força o processamento imediato (pode ajudar em alguns sistemas)
-                                        if hasattr(midi_out, '_midi_out') and hasattr(midi_out._midi_out, '_rt_midi'):
-                                            if hasattr(midi_out._midi_out._rt_midi, 'flush'):
-                                                midi_out._midi_out._rt_midi.flush()
-                                    except Exception as e:
-                                        print(f"Erro ao enviar mensagem MIDI: {e}")
-                                elif fluidsynth_available & self.ui.rbFluidsynth.isChecked():
-                                    # NOTA: Funcionalidade FluidSynth não foi completamente testada
-                                    fs.noteon(0, 60, 30)
-                                elif self.ui.rbSFZ.isChecked():
-                                    # NOTA: Funcionalidade SFZ não foi implementada/testada
-                                    pass
-                                
-                                                # Emite o sinal para atualizar o monitor após o envio MIDI
-                                # para não atrasar o processamento MIDI com atualizações de UI
-                                QtWidgets.QApplication.processEvents()  # Processa eventos pendentes
-                                
-                                # Usar lista Python em vez de QVector<int>
-                                cmd_val = int(cmd)
-                                note_val = int(note)
-                                vel_val = int(vel)
-                                self.updateMonitor.emit(cmd_val, note_val, vel_val)
-                            except Exception as e:
-                                # Verifica se a porta ainda está aberta antes de logar o erro
-                                if self.thread_running and hasattr(self, 'ser') and self.ser.isOpen():
-                                    print(f"Erro ao processar mensagem MIDI: {e}")
-                                continue
-                    except (serial.SerialException, OSError):
-                        # Se ocorrer erro durante o processamento, verifica se a porta ainda está aberta
-                        if not self.thread_running or not hasattr(self, 'ser') or not self.ser.isOpen():
-                            break
-                        time.sleep(delay)
+                try:
+                    # Espera por dados e lê de uma vez tudo o que estiver disponível
+                    if reader.fill() <= 0:
                         continue
-                else:
-                    time.sleep(delay)
+                except (serial.SerialException, OSError):
+                    if stop.is_set():
+                        break
+                    if serialReconnect:
+                        # Dispositivo sumiu: a interface fecha a porta e reconecta
+                        self.guiCall.emit(self.serialLost)
+                        break
+                    parser.reset()
+                    stop.wait(delay)
+                    continue
+                    
+                # Instante da chegada, usado pelos filtros do host; a medição de
+                # latência custa um teste de flag por leitura quando desligada
+                t_available = time.perf_counter()
+                timing = self.hit_timing.enabled
+                for kind, frame in parser.frames():
+                    if kind == FRAME_SYSEX:
+                        # Mesmos índices da leitura antiga: bytes após o F0
+                        self.process_sysex(frame[1:])
+                    elif timing:
+                        self.process_midi(frame[0], frame[1], frame[2] if len(frame) > 2 else 0,
+                                          t_available, time.perf_counter())
+                    else:
+                        self.process_midi(frame[0], frame[1], frame[2] if len(frame) > 2 else 0, t_available)
             except Exception as e:
-                # Verifica se o thread ainda deve estar rodando
-                if not self.thread_running:
+                if stop.is_set():
                     break
-                time.sleep(delay)
-        
-        # Thread encerrado silenciosamente
+                print(f"Erro no thread de leitura: {e}")
+                stop.wait(delay)
+        
+        # Thread encerrado; registra apenas se houve erros de framing
+        if any(parser.errors.values()):
+            self.log(f"Thread MIDI encerrado - erros de framing: {parser.errors}")
+    def process_sysex(self, data):
+        """Processa um frame SysEx recebido (data são os bytes após o F0)"""
+        try:
+            if data[1]==CMD_ASKPARAM:
+                param_name = apply_param(self.pins, data[2], data[3], data[4])
+                self.kit_state.set_device(data[2], data[3], data[4], self.pins)
+                
+                tx_queue = self.tx_queue
+                if tx_queue is not None and tx_queue.on_reply(data[2], data[3], data[4]):
+                    # Confirmação de um parâmetro enviado pela fila de transmissão
+                    self.rebuildForParam(param_name)
+                    return
+                
+                fetcher = self.kit_fetcher
+                if fetcher is not None and fetcher.on_reply(data[2], data[3]):
+                    # Leitura do kit completo em andamento: índice, filtros e
+                    # interface são atualizados uma única vez, em kitFetchFinished
+                    return
+                
+                self.rebuildForParam(param_name)
+                self.log(f"Parâmetro recebido: PIN {data[2]}, {param_name}={data[4]}")
+                # Widgets só podem ser tocados no thread da interface
+                self.guiCall.emit(lambda pin=data[2]: self.paramReceived(pin))
+            if data[1]==CMD_DUMP and self.bulk_dump_pending:
+                try:
+                    count = decode_dump(b'\xF0' + bytes(data), self.pins)
+                except KitDumpError as e:
+                    self.log(f"Dump do kit inválido: {e}")
+                    self.guiCall.emit(lambda: self.bulkDumpTimedOut(unsupported=False))
+                    return
+                self.bulk_dump_pending = False
+                self.kit_state.set_device_pins(self.pins, count, self.pins)
+                self.guiCall.emit(lambda: self.bulkDumpReceived(count))
+                return
+            if data[1]==CMD_DUMP_WRITE:
+                status = data[2]
+                self.guiCall.emit(lambda: self.bulkRestoreAcked(status))
+                return
+            if data[1]==CMD_LICENSE:
+                txData = license_reply(data)
+                self.log(f"Solicitação de licença recebida: {data[2]},{data[3]} -> hash={txData[5]}")
+                if hasattr(self, 'ser') and self.ser.isOpen():
+                    self.sendSerial(txData)
+                    self.log("Resposta de licença enviada")
+        except Exception as e:
+            # Verifica se a porta ainda está aberta antes de logar o erro
+            if not self.reader_stop.is_set():
+                print(f"Erro ao processar comando SysEx: {e}")
+    def process_midi(self, cmd, note, vel, t_available=0.0, t_parsed=0.0):
+        """Encaminha uma mensagem de nota/CC recebida e atualiza o monitor"""
+        # Envia a mensagem antes de qualquer outro processamento; o roteador
+        # não acessa widgets, então nada aqui depende do thread da interface
+        self.router.forward(cmd, note, vel, t_available)
+        
+        # Registra a batida para o monitor após o envio MIDI; a interface a
+        # consome no próximo quadro, sem sinais enfileirados por batida
+        if t_parsed:
+            t_sent = time.perf_counter()
+            self.hit_timing.hit(t_available, t_parsed, t_sent)
+            self.hit_ring.push(cmd, note, vel, t_sent)
+        else:
+            self.hit_ring.push(cmd, note, vel)
     def update_button_states(self, enabled=False):
         """Atualiza o estado dos botões de envio de parâmetros com base na disponibilidade da porta serial"""
         # Lista de todos os botões que enviam comandos para o Arduino
         buttons = [
-            self.ui.pbUploadAll, self.ui.pbDownloadAll,
+            self.ui.pbUploadAll, self.ui.pbDownloadAll, self.ui.btnSyncChanged,
+            self.ui.btnReadKit, self.ui.btnRestoreKit,
             self.ui.pbUploadType, self.ui.pbDownloadType,
             self.ui.pbUploadNote, self.ui.pbDownloadNote,
             self.ui.pbUploadThresold, self.ui.pbDownloadThresold,
@@ -782,6 +1101,89 @@ class MainWindow ( QMainWindow ):
         # Botões principais
         self.ui.pbUploadAll.setToolTip("GET ALL (↑): Recebe todas as configurações do Arduino para a interface")
         self.ui.pbDownloadAll.setToolTip("SET ALL (↓): Envia todas as configurações da interface para o Arduino")
+    def setupTimingPanel(self):
+        """Painel de latência por batida na aba Tool"""
+        self.ui.ckTiming = QtWidgets.QCheckBox(self.ui.tab_2)
+        self.ui.ckTiming.setGeometry(490, 10, 280, 20)
+        self.ui.ckTiming.setText("Medir latência por batida")
+        self.ui.ckTiming.setToolTip("Registra o tempo de cada etapa das batidas recebidas (serial, MIDI, monitor)")
+        self.ui.ckTiming.toggled.connect(self.enableTiming)
+        
+        self.ui.tTiming = QtWidgets.QTableWidget(len(STAGES), 4, self.ui.tab_2)
+        self.ui.tTiming.setGeometry(490, 35, 280, 150)
+        self.ui.tTiming.setHorizontalHeaderLabels(["n", "p50 µs", "p99 µs", "máx µs"])
+        self.ui.tTiming.setVerticalHeaderLabels([STAGE_NAMES[stage] for stage in STAGES])
+        self.ui.tTiming.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.ui.tTiming.horizontalHeader().setDefaultSectionSize(45)
+        
+        # Distribuição da latência serial -> MIDI
+        self.ui.teTimingHist = QtWidgets.QPlainTextEdit(self.ui.tab_2)
+        self.ui.teTimingHist.setGeometry(490, 190, 280, 172)
+        self.ui.teTimingHist.setReadOnly(True)
+        self.ui.teTimingHist.setStyleSheet("font-family: Menlo, Monaco, Courier, monospace;")
+        
+        self.ui.btnTimingReset = QtWidgets.QPushButton(self.ui.tab_2)
+        self.ui.btnTimingReset.setGeometry(490, 392, 90, 25)
+        self.ui.btnTimingReset.setText("Zerar")
+        self.ui.btnTimingReset.clicked.connect(self.resetTiming)
+        
+        self.ui.btnTimingCSV = QtWidgets.QPushButton(self.ui.tab_2)
+        self.ui.btnTimingCSV.setGeometry(585, 392, 90, 25)
+        self.ui.btnTimingCSV.setText("Exportar CSV")
+        self.ui.btnTimingCSV.clicked.connect(lambda: self.exportTiming("csv"))
+        
+        self.ui.btnTimingJSON = QtWidgets.QPushButton(self.ui.tab_2)
+        self.ui.btnTimingJSON.setGeometry(680, 392, 90, 25)
+        self.ui.btnTimingJSON.setText("Exportar JSON")
+        self.ui.btnTimingJSON.clicked.connect(lambda: self.exportTiming("json"))
+        
+        # Uso do link serial (atualizado a cada segundo enquanto conectado)
+        self.ui.lLinkStats = QtWidgets.QLabel(self.ui.tab_2)
+        self.ui.lLinkStats.setGeometry(490, 366, 280, 22)
+        self.ui.lLinkStats.setText("Link: desconectado")
+        self.link_stats = None
+        self.linkTimer = QTimer(self)
+        self.linkTimer.timeout.connect(self.refreshLinkStats)
+        
+        self.timingTimer = QTimer(self)
+        self.timingTimer.timeout.connect(self.refreshTiming)
+        self.refreshTiming()
+    def enableTiming(self, enabled):
+        self.hit_timing.enabled = enabled
+        if enabled:
+            self.timingTimer.start(int(1000 / timingRefreshHz))
+        else:
+            self.timingTimer.stop()
+            self.refreshTiming()
+    def resetTiming(self):
+        self.hit_timing.reset()
+        self.refreshTiming()
+    def refreshTiming(self):
+        """Mostra o resumo de cada etapa e o histograma serial -> MIDI"""
+        for row, stage in enumerate(STAGES):
+            h = self.hit_timing.histograms[stage]
+            values = (h.count, h.percentile(0.5), h.percentile(0.99), round(h.max) if h.count else None)
+            for col, value in enumerate(values):
+                self.ui.tTiming.setItem(row, col, QtWidgets.QTableWidgetItem("-" if value is None else str(value)))
+        h = self.hit_timing.histograms[STAGE_SERIAL_MIDI]
+        peak = max(h.counts) or 1
+        lines = [f"{STAGE_NAMES[STAGE_SERIAL_MIDI]} (µs)"]
+        for label, n in zip(h.labels(), h.counts):
+            lines.append(f"{label:>11} {'#' * (n * 12 // peak):<12} {n}")
+        self.ui.teTimingHist.setPlainText("\n".join(lines))
+    def exportTiming(self, fmt):
+        """Exporta os histogramas de latência em CSV ou JSON"""
+        default = datetime.datetime.now().strftime(f"latencia_%Y%m%d_%H%M%S.{fmt}")
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Exportar latência", default,
+                                                        "CSV (*.csv)" if fmt == "csv" else "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                f.write(self.hit_timing.to_csv() if fmt == "csv" else self.hit_timing.to_json())
+            self.log(f"Latência exportada para {path}")
+        except IOError as e:
+            self.log(f"Erro ao exportar latência: {e}")
     def setup_about_tab(self):
         """Configura a aba About com informações sobre o software"""
         # Remover qualquer layout existente
@@ -979,11 +1381,7 @@ Cada parâmetro tem dois botões associados:
             self.ui.tPinList.blockSignals(False)
             
     def getPearsonHash(self, input):
-        h=0
-        for i in input:
-            index=i ^ h
-            h=Permutation[index % len(Permutation)]
-        return h
+        return pearson_hash(input)
     def getNoteString(self, note):
         return noteArray[note%12]+str(int(note/12)-2)+' ('+str(note)+')'
     def selectPin(self):
@@ -1059,6 +1457,7 @@ Cada parâmetro tem dois botões associados:
             self.ui.hsGain.blockSignals(False)
             self.ui.spXtalkgroup.blockSignals(False)
             self.ui.spChannel.blockSignals(False)
+        self.refreshCurveView()
     def changeMode(self, int):
         mode_name = ""
         if int==0:
@@ -1084,9 +1483,119 @@ Cada parâmetro tem dois botões associados:
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
             try:
-                self.ser.write(txData)
+                self.sendSerial(txData)
             except Exception as e:
                 print(f"Erro ao enviar comando de modo: {e}")
+    def selectOutputTarget(self, checked=True):
+        """Atualiza o destino do roteador conforme o radio button selecionado"""
+        if not checked:
+            # O botão desmarcado também emite toggled; só o marcado decide
+            return
+        if self.ui.rbMIDI.isChecked():
+            button, target = self.ui.rbMIDI, TARGET_MIDI
+        elif self.ui.rbSampler.isChecked():
+            button, target = self.ui.rbSampler, TARGET_SAMPLER if self.startSampler() else None
+        elif self.ui.rbSFZ.isChecked():
+            button, target = self.ui.rbSFZ, TARGET_SFZ if self.startSfz() else None
+        else:
+            button, target = None, TARGET_NONE
+        if target is None:
+            # Não carregou: volta ao destino anterior em vez de descartar as batidas
+            previous = self.outputButton
+            if previous is not None and previous is not button:
+                previous.setChecked(True)
+            else:
+                self.router.set_target(TARGET_NONE)
+            return
+        self.outputButton = button
+        self.router.set_target(target)
+    def startSampler(self):
+        """Carrega o kit de samplerKitDir na primeira seleção e o liga à saída de áudio"""
+        if self.sampler is None:
+            try:
+                sampler = Sampler(voices=samplerVoices, block=samplerBlockSize)
+                count = load_kit_dir(sampler, samplerKitDir)
+            except Exception as e:
+                self.log(f"Erro ao carregar o sampler interno: {e}")
+                return False
+            self.sampler = sampler
+            self.router.set_sampler(sampler)
+            self.log(f"Sampler interno: {count} amostras de '{samplerKitDir}', "
+                     f"{sampler.bank.nbytes // 1024} KB, {samplerVoices} vozes")
+        return self.playAudio(self.sampler)
+    def startSfz(self):
+        """Carrega o sfzFile (ou o escolhido) na primeira seleção e o liga à saída de áudio"""
+        global sfzFile
+        if self.sfz is None:
+            if not sfzFile:
+                sfzFile, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Instrumento SFZ", "",
+                                                                   "SFZ (*.sfz);;Todos (*)")
+                if not sfzFile:
+                    return False
+            sfz = SfzSampler(voices=samplerVoices, block=samplerBlockSize)
+            try:
+                start = time.perf_counter()
+                count = sfz.load(sfzFile)
+            except Exception as e:
+                sfz.close()
+                self.log(f"Erro ao carregar '{sfzFile}': {e}")
+                sfzFile = ""
+                return False
+            for missing in sfz.missing:
+                self.log(f"SFZ: amostra ignorada {missing}")
+            self.sfz = sfz
+            self.router.set_sfz(sfz)
+            self.log(f"SFZ '{os.path.basename(sfzFile)}': {count} regiões, {len(sfz.sources)} amostras "
+                     f"mapeadas ({sfz.mapped_bytes // 1048576} MB) em {time.perf_counter() - start:.2f} s")
+        return self.playAudio(self.sfz)
+    def playAudio(self, instrument):
+        """Abre a saída de áudio na primeira vez; depois só troca o instrumento tocado"""
+        if self.audio_out is None:
+            try:
+                audio_out = AudioOutput(instrument)
+                audio_out.start()
+            except ImportError:
+                self.log("Sampler interno e SFZ requerem o sounddevice (pip install sounddevice)")
+                return False
+            except Exception as e:
+                self.log(f"Erro ao abrir a saída de áudio: {e}")
+                return False
+            self.audio_out = audio_out
+        self.audio_out.sampler = instrument
+        return True
+    def stopSampler(self):
+        if self.audio_out is not None:
+            self.audio_out.stop()
+            self.audio_out = None
+        if self.sfz is not None:
+            self.router.set_sfz(None)
+            self.sfz.close()
+            self.sfz = None
+    def openMidiRoutes(self):
+        """Abre as saídas extras de midiRoutes; uma porta ausente não impede as outras"""
+        try:
+            from midi_wrapper import open_output
+        except ImportError:
+            return
+        for spec in midiRoutes:
+            try:
+                options = parse_route_spec(spec)
+                port = options.pop('port')
+                self.router.add_route(MidiRoute(port, open_output(port), **options))
+                self.log(f"Rota MIDI extra '{port}' aberta")
+            except Exception as e:
+                self.log(f"Erro ao abrir rota MIDI '{spec}': {e}")
+    def closeMidiRoutes(self):
+        routes = self.router.routes
+        self.router.close_routes()
+        for route in routes:
+            stats = route.stats()
+            self.log(f"Rota {route.name}: {stats['sent']} enviadas, {stats['dropped']} descartadas, "
+                     f"{stats['expired']} atrasadas")
+            try:
+                route.midi_out.close_port()
+            except Exception as e:
+                print(f"Erro ao fechar rota MIDI: {e}")
     def selectMIDI(self, port):
         if port>=0:
             try:
@@ -1135,6 +1644,8 @@ Cada parâmetro tem dois botões associados:
     def editedName(self):
         self.pins[self.ui.tPinList.currentRow()].name=str(self.ui.lName.text()).encode()
         self.updateList()
+        # O nome aparece no formato da barra do Monitor
+        self.rebuildNoteIndex()
         
     def editedType(self, int):
         if int==3:
@@ -1142,50 +1653,73 @@ Cada parâmetro tem dois botões associados:
         else:
             self.pins[self.ui.tPinList.currentRow()].type=int
         self.updateList()
+        self.rebuildNoteIndex()
+        self.rebuildHostFilters()
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "type")
 
     def editedThresold(self, int):
         self.pins[self.ui.tPinList.currentRow()].thresold=int
         self.ui.lThresold.setText(str(int))
         self.updateList()
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "thresold")
 
     def editedScantime(self, int):
         self.pins[self.ui.tPinList.currentRow()].scantime=int
         self.ui.lScantime.setText(str(int))
         self.updateList()
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "scantime")
 
     def editedMasktime(self, int):
         self.pins[self.ui.tPinList.currentRow()].masktime=int
         self.ui.lMasktime.setText(str(int))
         self.updateList()
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "masktime")
+        self.double_trigger.rebuild()
 
     def editedRetrigger(self, int):
         self.pins[self.ui.tPinList.currentRow()].retrigger=int
         self.ui.lRetrigger.setText(str(int))
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "retrigger")
+        self.double_trigger.rebuild()
         
     def editedNote(self, int):
         self.pins[self.ui.tPinList.currentRow()].note=int
         self.updateList()
+        self.rebuildNoteIndex()
+        self.rebuildHostFilters()
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "note")
 
     def editedCurve(self, int):
         self.pins[self.ui.tPinList.currentRow()].curve=int
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "curve")
+        self.curveChanged()
 
     def editedCurveform(self, int):
         self.pins[self.ui.tPinList.currentRow()].curveform=int
         self.ui.lCurveform.setText(str(int))
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "curveform")
+        self.curveChanged()
 
     def editedXtalk(self, int):
         self.pins[self.ui.tPinList.currentRow()].xtalk=int
         self.ui.lXtalk.setText(str(int))
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "xtalk")
+        self.crosstalk.rebuild()
 
     def editedXtalkgroup(self, int):
         self.pins[self.ui.tPinList.currentRow()].xtalkgroup=int
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "xtalkgroup")
+        self.crosstalk.rebuild()
 
     def editedChannel(self, int):
         self.pins[self.ui.tPinList.currentRow()].channel=int
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "channel")
 
     def editedGain(self, int):
         self.pins[self.ui.tPinList.currentRow()].gain=int
         self.ui.lGain.setText(str(int))
+        self.kit_state.mark(self.ui.tPinList.currentRow(), "gain")
+        self.curveChanged()
     def uploadAll(self):
         """Solicita todos os parâmetros do pin atual do Arduino (Get All)"""
         pin_num = self.ui.tPinList.currentRow()
@@ -1195,7 +1729,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
             self.log(f"Comando Get All enviado para o pin {pin_num}")
             
             # Mostrar caixa informativa
@@ -1231,33 +1765,32 @@ Cada parâmetro tem dois botões associados:
             )
             return
         
-        # Envia os parâmetros um por um
-        self.downloadType()
-        time.sleep(0.2)
-        self.downloadNote()
-        time.sleep(0.2)
-        self.downloadThresold()
-        time.sleep(0.2)
-        self.downloadScantime()
-        time.sleep(0.2)
-        self.downloadMasktime()
-        time.sleep(0.2)
-        self.downloadRetrigger()
-        time.sleep(0.2)
-        self.downloadCurve()
-        time.sleep(0.2)
-        self.downloadCurveform()
-        time.sleep(0.2)
-        self.downloadXtalk()
-        time.sleep(0.2)
-        self.downloadXtalkgroup()
-        time.sleep(0.2)
-        self.downloadGain()
+        # Envia os parâmetros pela fila de transmissão: cada um é confirmado pela
+        # leitura de volta e o resultado chega em downloadAllFinished
+        pin = self.pins[pin_num]
+        fields = ("type", "note", "thresold", "scantime", "masktime", "retrigger",
+                  "curve", "curveform", "xtalk", "xtalkgroup", "gain")
+        params = [(pin_num, FIELD_PARAMS[field], getattr(pin, field)) for field in fields]
+        self.tx_queue.set_params(params, save=self.ui.ckSave.isChecked(),
+                                 callback=lambda batch: self.guiCall.emit(lambda: self.downloadAllFinished(pin_num, batch)))
         
         # Salva as configurações no arquivo pins.ini após enviar todos os parâmetros
         self.save_pins_to_file()
+    def downloadAllFinished(self, pin_num, batch):
+        """Resultado do SET ALL, chamado quando a fila confirma todos os parâmetros"""
+        pin_name = self.pins[pin_num].name.decode()
+        elapsed_ms = int(batch.elapsed * 1000)
+        if batch.failed:
+            self.log(f"SET ALL do pin {pin_num}: {len(batch.failed)} parâmetro(s) sem confirmação do Arduino ({elapsed_ms} ms)")
+            QtWidgets.QMessageBox.warning(
+                self, 
+                'SET ALL - Falha',
+                f'{len(batch.failed)} de {batch.total} configurações do pad "{pin_name}" não foram confirmadas pelo Arduino.',
+                QtWidgets.QMessageBox.Ok
+            )
+            return
         
-        self.log(f"Todos os parâmetros do pin {pin_num} foram enviados com sucesso")
+        self.log(f"Todos os parâmetros do pin {pin_num} foram enviados com sucesso ({elapsed_ms} ms)")
         
         # Mostrar caixa informativa
         QtWidgets.QMessageBox.information(
@@ -1277,7 +1810,7 @@ Cada parâmetro tem dois botões associados:
         data = 0xF0,0x77,0x02,pin_num,0x0D,0x00,0xF7
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
         else:
             self.log("Erro: Porta serial não está aberta")
             
@@ -1295,7 +1828,7 @@ Cada parâmetro tem dois botões associados:
         
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
             # Salva as configurações no arquivo pins.ini após enviar para o Arduino
             self.save_pins_to_file()
         else:
@@ -1308,7 +1841,7 @@ Cada parâmetro tem dois botões associados:
         data = 0xF0,0x77,0x02,pin_num,0x00,0x00,0xF7
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
         else:
             self.log("Erro: Porta serial não está aberta")
             
@@ -1317,42 +1850,42 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadCurveform(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x08,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadXtalk(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x06,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadXtalkgroup(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x07,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadChannel(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x0E,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadGain(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x09,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
              
     def downloadCurve(self):
         code=0x03
@@ -1362,7 +1895,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadCurveform(self):
         code=0x03
@@ -1372,7 +1905,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadXtalk(self):
         code=0x03
@@ -1382,7 +1915,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadXtalkgroup(self):
         code=0x03
@@ -1392,7 +1925,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadChannel(self):
         code=0x03
@@ -1402,7 +1935,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadGain(self):
         code=0x03
@@ -1412,7 +1945,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
     
     def downloadNote(self):
         code=0x03
@@ -1428,7 +1961,7 @@ Cada parâmetro tem dois botões associados:
         
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
         else:
             self.log("Erro: Porta serial não está aberta")
 
@@ -1437,7 +1970,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def downloadThresold(self):
         code=0x03
@@ -1452,7 +1985,7 @@ Cada parâmetro tem dois botões associados:
         
         txData = struct.pack("B"*len(data), *data)
         if hasattr(self, 'ser') and self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
         else:
             self.log("Erro: Porta serial não está aberta")
 
@@ -1461,7 +1994,7 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
             
     def downloadScantime(self):
         code=0x03
@@ -1471,14 +2004,14 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadMasktime(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x03,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
             
     def downloadMasktime(self):
         code=0x03
@@ -1488,14 +2021,14 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
 
     def uploadRetrigger(self):
         data = 0xF0,0x77,0x02,self.ui.tPinList.currentRow(),0x04,0x00,0xF7
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
+            self.sendSerial(txData)
             
     def downloadRetrigger(self):
         code=0x03
@@ -1505,30 +2038,94 @@ Cada parâmetro tem dois botões associados:
         print(data)
         txData = struct.pack("B"*len(data), *data)
         if self.ser.isOpen():
-            self.ser.write(txData)
-    def handle_updateMonitor(self, data1, data2, data3):
-        # Atualiza apenas o pad que corresponde à nota MIDI recebida
-        # e apenas se o tipo do pad não for Disabled
-        for i in range(0, len(self.pbPinArray)):
-            if self.pins[i].note==data2 and self.pins[i].type != 15 and self.pins[i].type != 127:
+            self.sendSerial(txData)
+    def rebuildNoteIndex(self):
+        """Reconstrói o índice nota -> pads habilitados e o conjunto de pads desabilitados"""
+        noteIndex = {}
+        disabledPads = set()
+        for i in range(min(len(self.pins), len(self.pbPinArray))):
+            if self.pins[i].type in DISABLED_TYPES:
+                disabledPads.add(i)
+            else:
+                noteIndex.setdefault(self.pins[i].note, []).append(i)
+        # Troca as referências de uma vez: pode ser chamado pelo thread de leitura (ASKPARAM)
+        self.noteIndex = {note: tuple(pads) for note, pads in noteIndex.items()}
+        self.disabledPads = disabledPads
+        # Formatos e barras zeradas são aplicados no próximo quadro, no thread da interface
+        self.monitorLayoutDirty = True
+    def rebuildHostFilters(self):
+        """Reconstrói todos os filtros do host (dependem de tipo e nota dos pads)"""
+        self.velocity_curves.rebuild()
+        self.crosstalk.rebuild()
+        self.double_trigger.rebuild()
+        self.hihat.rebuild()
+    def rebuildForParam(self, param_name):
+        """Reconstrói apenas o que depende do parâmetro alterado"""
+        if param_name in ("TYPE", "NOTE"):
+            self.rebuildNoteIndex()
+            self.rebuildHostFilters()
+        elif param_name in ("CURVE", "CURVEFORM", "GAIN"):
+            self.velocity_curves.rebuild()
+            self.guiCall.emit(self.refreshCurveView)
+        elif param_name in ("XTALK", "XTALKGROUP"):
+            self.crosstalk.rebuild()
+        elif param_name in ("MASKTIME", "RETRIGGER"):
+            self.double_trigger.rebuild()
+    def applyMonitorLayout(self):
+        """Aplica o índice às barras: nomes dos pads habilitados e zero nos desabilitados"""
+        self.monitorLayoutDirty = False
+        for pads in self.noteIndex.values():
+            for i in pads:
                 self.pbPinArray[i].setFormat("    "+self.pins[i].name.decode()+" %v    ")
-                self.pbPinArray[i].setValue(data3)
+        for i in self.disabledPads:
+            self.pbPinArray[i].setValue(0)
+    def drainMonitor(self):
+        """Esvazia o buffer de batidas e atualiza a aba Monitor uma vez por quadro"""
+        if self.monitorLayoutDirty:
+            self.applyMonitorLayout()
+        peaks = {}
+        history = []
+        stamps = []
+        for data1, data2, data3, stamp in self.hit_ring.drain():
+            if stamp:
+                stamps.append(stamp)
+            if (data1&0xF0)==0xB0:
+                # CC (pedal do chimbal): vale a última posição
+                peaks[data2] = data3
+                if self.router.hihat is not None and self.hihat.is_pedal(data2):
+                    history.append("CC ("+str(data2)+","+str(data3)+") "+ZONE_NAMES[self.hihat.zone_of(data3)])
+                else:
+                    history.append("CC ("+str(data2)+","+str(data3)+")")
             else:
-                # Garante que os pads desabilitados tenham valor zero
-                if self.pins[i].type == 15 or self.pins[i].type == 127:
-                    self.pbPinArray[i].setValue(0)
+                # Notas: mostra o pico do quadro
+                if data3 >= peaks.get(data2, 0):
+                    peaks[data2] = data3
+                if (data1&0xF0)==0x90:
+                    history.append("NOTE ON ("+str(data2)+","+str(data3)+")")
+        if not peaks:
+            return
+            
+        for note, vel in peaks.items():
+            self.handle_updateMonitor(note, vel)
+        
+        if stamps:
+            # Tempo entre o envio MIDI e o desenho das barras neste quadro
+            rendered = time.perf_counter()
+            for stamp in stamps:
+                self.hit_timing.record(STAGE_MONITOR, stamp, rendered)
             
-        if (data1&0xF0)==0x90:
-            message = "NOTE ON ("+str(data2)+","+str(data3)+")"
-            self.ui.lMIDIHistory.addItem(message)
-            self.log(f"MIDI: {message}")
-        elif (data1&0xF0)==0xB0:
-            message = "CC ("+str(data2)+","+str(data3)+")"
-            self.ui.lMIDIHistory.addItem(message)
-            self.log(f"MIDI: {message}")
-        if self.ui.lMIDIHistory.count() > 20:
-            self.ui.lMIDIHistory.takeItem(0)
-        self.ui.lMIDIHistory.setCurrentRow(self.ui.lMIDIHistory.count()-1)
+        if history:
+            # Apenas as últimas mensagens cabem no histórico
+            for message in history[-monitorHistorySize:]:
+                self.ui.lMIDIHistory.addItem(message)
+            while self.ui.lMIDIHistory.count() > monitorHistorySize:
+                self.ui.lMIDIHistory.takeItem(0)
+            self.ui.lMIDIHistory.setCurrentRow(self.ui.lMIDIHistory.count()-1)
+            self.log("MIDI: " + ", ".join(history))
+    def handle_updateMonitor(self, data2, data3):
+        # Atualiza apenas os pads habilitados que correspondem à nota MIDI recebida
+        for i in self.noteIndex.get(data2, ()):
+            self.pbPinArray[i].setValue(data3)
     def disableAllPins(self):
         """Desabilita todos os pinos configurando-os como 'Disabled'"""
         # Exibe mensagem de confirmação
@@ -1546,25 +2143,15 @@ Cada parâmetro tem dois botões associados:
             # Define todos os pinos como 'Disabled' (tipo 127)
             for i in range(len(self.pins)):
                 self.pins[i].type = 127
-                
-                # Envia o comando para o Arduino se estiver conectado
-                if hasattr(self, 'ser') and self.ser.isOpen():
-                    code = 0x03
-                    if self.ui.ckSave.isChecked():
-                        code = 0x04
-                    data = 0xF0, 0x77, code, i, 0x0D, 127, 0xF7
-                    txData = struct.pack("B"*len(data), *data)
-                    self.ser.write(txData)
-                    time.sleep(0.05)  # Pequeno delay entre comandos
-                    
-                    # Processa eventos para manter a interface responsiva
-                    QtWidgets.QApplication.processEvents()
+            self.kit_state.mark_all("type", range(len(self.pins)))
             
             # Salva as configurações no arquivo pins.ini
             self.save_pins_to_file()
             
             # Atualiza a interface
             self.updateList()
+            self.rebuildNoteIndex()
+            self.rebuildHostFilters()
             
             # Seleciona o primeiro item da lista para mostrar os detalhes
             self.ui.tPinList.setCurrentCell(0, 0)
@@ -1574,13 +2161,34 @@ Cada parâmetro tem dois botões associados:
             for i in range(len(self.pbPinArray)):
                 self.pbPinArray[i].setValue(0)
             
-            self.log("Todos os pinos foram desabilitados com sucesso")
-            QtWidgets.QMessageBox.information(
+            # Envia os comandos para o Arduino se estiver conectado, sem bloquear a interface
+            if self.tx_queue is not None:
+                params = [(i, FIELD_PARAMS["type"], 127) for i in range(len(self.pins))]
+                self.tx_queue.set_params(params, save=self.ui.ckSave.isChecked(),
+                                         callback=lambda batch: self.guiCall.emit(lambda: self.disableAllFinished(batch)))
+            else:
+                self.disableAllFinished()
+    def disableAllFinished(self, batch=None):
+        """Conclusão do Desabilitar Todos (batch é o resultado da fila, se conectado)"""
+        if batch is not None and batch.failed:
+            self.log(f"{len(batch.failed)} pino(s) não confirmaram o tipo Disabled ({int(batch.elapsed * 1000)} ms)")
+            QtWidgets.QMessageBox.warning(
                 self, 
-                'Operação concluída',
-                'Todos os pinos foram desabilitados com sucesso.\nAs barras de progresso no Monitor também foram resetadas.',
+                'Operação incompleta',
+                f'{len(batch.failed)} de {batch.total} pinos não confirmaram a alteração no Arduino.',
                 QtWidgets.QMessageBox.Ok
             )
+            return
+        if batch is not None:
+            self.log(f"Todos os pinos foram desabilitados com sucesso ({int(batch.elapsed * 1000)} ms)")
+        else:
+            self.log("Todos os pinos foram desabilitados com sucesso")
+        QtWidgets.QMessageBox.information(
+            self, 
+            'Operação concluída',
+            'Todos os pinos foram desabilitados com sucesso.\nAs barras de progresso no Monitor também foram resetadas.',
+            QtWidgets.QMessageBox.Ok
+        )
     def addDisableAllButton(self):
         """Adiciona o botão para desabilitar todos os pinos na aba de configuração"""
         # Cria o botão no widget central
@@ -1592,6 +2200,230 @@ Cada parâmetro tem dois botões associados:
         # Conecta o botão à função disableAllPins
         self.ui.btnDisableAll.clicked.connect(self.disableAllPins)
         
+    def addSyncChangedButton(self):
+        """Adiciona o botão que envia ao Arduino apenas os parâmetros alterados"""
+        self.ui.btnSyncChanged = QtWidgets.QPushButton(self.ui.centralwidget)
+        self.ui.btnSyncChanged.setGeometry(445, 10, 130, 22)
+        self.ui.btnSyncChanged.setText("Enviar Alterações")
+        self.ui.btnSyncChanged.setToolTip("Envia para o Arduino apenas os parâmetros alterados em todos os pads desde a última leitura/envio")
+        
+        # Conecta o botão à função syncChanged
+        self.ui.btnSyncChanged.clicked.connect(self.syncChanged)
+        
+    def syncChanged(self):
+        """Envia apenas os campos alterados de todos os pads"""
+        if self.tx_queue is None:
+            self.log("Erro: Porta serial não está aberta")
+            return
+        params = self.kit_state.dirty_params(self.pins)
+        if not params:
+            self.log("Nenhuma alteração pendente para enviar ao Arduino")
+            return
+        self.log(f"Enviando {len(params)} parâmetro(s) alterado(s) para o Arduino...")
+        self.tx_queue.set_params(params, save=self.ui.ckSave.isChecked(),
+                                 callback=lambda batch: self.guiCall.emit(lambda: self.syncChangedFinished(batch)))
+        self.save_pins_to_file()
+    def syncChangedFinished(self, batch):
+        elapsed_ms = int(batch.elapsed * 1000)
+        if batch.failed:
+            self.log(f"Alterações enviadas: {batch.ok}/{batch.total} confirmadas em {elapsed_ms} ms")
+            for pin, param, value in batch.failed:
+                self.log(f"  PIN {pin}: parâmetro {hex(param)}={value} sem confirmação")
+        else:
+            self.log(f"Alterações enviadas: {batch.ok} parâmetro(s) confirmado(s) em {elapsed_ms} ms")
+    def addKitButtons(self):
+        """Adiciona os botões de leitura/envio do kit completo na aba de configuração"""
+        self.ui.btnReadKit = QtWidgets.QPushButton(self.ui.groupBox)
+        self.ui.btnReadKit.setGeometry(10, 15, 130, 25)
+        self.ui.btnReadKit.setText("Ler Kit (↑)")
+        self.ui.btnReadKit.setToolTip("Recebe todas as configurações de todos os pads do Arduino (backup)")
+        self.ui.btnReadKit.clicked.connect(self.request_all_arduino_configs)
+        
+        self.ui.btnRestoreKit = QtWidgets.QPushButton(self.ui.groupBox)
+        self.ui.btnRestoreKit.setGeometry(150, 15, 130, 25)
+        self.ui.btnRestoreKit.setText("Enviar Kit (↓)")
+        self.ui.btnRestoreKit.setToolTip("Envia todas as configurações de todos os pads para o Arduino (restauração)")
+        self.ui.btnRestoreKit.clicked.connect(self.restoreKit)
+        
+    def setupCurveEditor(self):
+        """Janela com o gráfico da curva do pad selecionado, aberta ao lado da curva"""
+        self.ui.cbCurve.setGeometry(90, 220, 75, 22)
+        self.ui.btnCurveEditor = QtWidgets.QPushButton(self.ui.cbCurve.parentWidget())
+        self.ui.btnCurveEditor.setGeometry(168, 220, 38, 22)
+        self.ui.btnCurveEditor.setText("Ver")
+        self.ui.btnCurveEditor.setToolTip("Mostra e permite desenhar a curva de velocidade do pad")
+        
+        self.curveDialog = QtWidgets.QDialog(self)
+        self.curveDialog.setWindowTitle("Curva de velocidade")
+        layout = QtWidgets.QVBoxLayout(self.curveDialog)
+        self.ui.lCurvePad = QtWidgets.QLabel(self.curveDialog)
+        layout.addWidget(self.ui.lCurvePad)
+        self.ui.curveView = CurveView(self.curveDialog)
+        self.ui.curveView.setMinimumSize(256, 256)
+        self.ui.curveView.curveDrawn.connect(self.curveDrawn)
+        layout.addWidget(self.ui.curveView)
+        self.ui.ckHostCurves = QtWidgets.QCheckBox("Aplicar curvas no host", self.curveDialog)
+        self.ui.ckHostCurves.setToolTip("Aplica a curva de cada pad antes do envio MIDI (deixe a curva do Arduino em Linear)")
+        self.ui.ckHostCurves.toggled.connect(self.enableHostCurves)
+        layout.addWidget(self.ui.ckHostCurves)
+        self.ui.btnClearCurve = QtWidgets.QPushButton("Limpar curva desenhada", self.curveDialog)
+        self.ui.btnClearCurve.clicked.connect(self.clearDrawnCurve)
+        layout.addWidget(self.ui.btnClearCurve)
+        
+        self.ui.btnCurveEditor.clicked.connect(self.showCurveEditor)
+        self.ui.ckHostCurves.setChecked(hostVelocityCurves)
+        
+    def showCurveEditor(self):
+        self.refreshCurveView()
+        self.curveDialog.show()
+        self.curveDialog.raise_()
+        
+    def enableHostCurves(self, enabled):
+        self.router.set_velocity_curves(self.velocity_curves if enabled else None)
+        self.log("Curvas de velocidade no host " + ("ligadas" if enabled else "desligadas"))
+        
+    def curveChanged(self):
+        """Recalcula a LUT do pad editado (só combinações novas) e redesenha o gráfico"""
+        self.velocity_curves.rebuild()
+        self.refreshCurveView()
+        
+    def refreshCurveView(self):
+        row = self.ui.tPinList.currentRow()
+        if row < 0 or not hasattr(self.ui, 'curveView'):
+            return
+        custom = row in self.velocity_curves.custom
+        pin = self.pins[row]
+        self.ui.lCurvePad.setText(f"{pin.name.decode()}: " + ("curva desenhada" if custom else self.ui.cbCurve.currentText()))
+        self.ui.curveView.setLut(self.velocity_curves.luts[row], custom)
+        self.ui.btnClearCurve.setEnabled(custom)
+        
+    def curveDrawn(self, points):
+        row = self.ui.tPinList.currentRow()
+        if row < 0:
+            return
+        self.velocity_curves.set_custom(row, points)
+        self.saveDrawnCurves()
+        self.refreshCurveView()
+        
+    def clearDrawnCurve(self):
+        row = self.ui.tPinList.currentRow()
+        if row < 0:
+            return
+        self.velocity_curves.clear_custom(row)
+        self.saveDrawnCurves()
+        self.refreshCurveView()
+        
+    def saveDrawnCurves(self):
+        try:
+            save_custom_curves(self.velocity_curves.custom)
+        except IOError as e:
+            self.log(f"Erro ao salvar curvas desenhadas: {e}")
+        
+    def setupHostFilters(self):
+        """Janela dos filtros aplicados no host antes do envio MIDI"""
+        self.ui.btnHostFilters = QtWidgets.QPushButton(self.ui.groupBox)
+        self.ui.btnHostFilters.setGeometry(290, 15, 130, 25)
+        self.ui.btnHostFilters.setText("Filtros do host")
+        self.ui.btnHostFilters.setToolTip("Filtros aplicados pelo computador às batidas recebidas, sem escrever no Arduino")
+        self.ui.btnHostFilters.clicked.connect(self.showHostFilters)
+        
+        self.hostFiltersDialog = QtWidgets.QDialog(self)
+        self.hostFiltersDialog.setWindowTitle("Filtros do host")
+        layout = QtWidgets.QVBoxLayout(self.hostFiltersDialog)
+        
+        box = QtWidgets.QGroupBox("Crosstalk (xtalk / xtalkgroup)", self.hostFiltersDialog)
+        form = QtWidgets.QFormLayout(box)
+        self.ui.ckHostCrosstalk = QtWidgets.QCheckBox("Suprimir crosstalk", box)
+        self.ui.ckHostCrosstalk.setToolTip("Descarta batidas mais fracas que xtalk/127 da batida mais forte do mesmo grupo dentro da janela")
+        self.ui.ckHostCrosstalk.toggled.connect(self.enableHostCrosstalk)
+        form.addRow(self.ui.ckHostCrosstalk)
+        self.ui.spCrosstalkWindow = QtWidgets.QSpinBox(box)
+        self.ui.spCrosstalkWindow.setRange(1, 200)
+        self.ui.spCrosstalkWindow.setSuffix(" ms")
+        self.ui.spCrosstalkWindow.setValue(int(round(crosstalkWindow * 1000)))
+        self.ui.spCrosstalkWindow.valueChanged.connect(lambda ms: setattr(self.crosstalk, 'window', ms / 1000.0))
+        form.addRow("Janela", self.ui.spCrosstalkWindow)
+        self.ui.cbCrosstalkMode = QtWidgets.QComboBox(box)
+        self.ui.cbCrosstalkMode.addItem("Descartar", XTALK_DROP)
+        self.ui.cbCrosstalkMode.addItem("Atenuar", XTALK_ATTENUATE)
+        self.ui.cbCrosstalkMode.setCurrentIndex(1 if crosstalkMode == XTALK_ATTENUATE else 0)
+        self.ui.cbCrosstalkMode.currentIndexChanged.connect(
+            lambda i: setattr(self.crosstalk, 'mode', self.ui.cbCrosstalkMode.itemData(i)))
+        form.addRow("Modo", self.ui.cbCrosstalkMode)
+        layout.addWidget(box)
+        
+        box = QtWidgets.QGroupBox("Batidas duplas (masktime / retrigger)", self.hostFiltersDialog)
+        form = QtWidgets.QFormLayout(box)
+        self.ui.ckHostDoubleTrigger = QtWidgets.QCheckBox("Descartar batidas duplas", box)
+        self.ui.ckHostDoubleTrigger.setToolTip("Descarta repetições do mesmo pad dentro do masktime e, logo depois, "
+                                               "as abaixo de retrigger/127 da batida anterior")
+        self.ui.ckHostDoubleTrigger.toggled.connect(self.enableHostDoubleTrigger)
+        form.addRow(self.ui.ckHostDoubleTrigger)
+        layout.addWidget(box)
+        
+        box = QtWidgets.QGroupBox("Chimbal (pedal HHC)", self.hostFiltersDialog)
+        form = QtWidgets.QFormLayout(box)
+        self.ui.ckHostHiHat = QtWidgets.QCheckBox("Trocar notas pela posição do pedal", box)
+        self.ui.ckHostHiHat.setToolTip("Envia a variante aberta, meio-aberta ou fechada de cada nota do chimbal "
+                                       "e gera a nota de chick em fechamentos rápidos")
+        self.ui.ckHostHiHat.toggled.connect(self.enableHostHiHat)
+        form.addRow(self.ui.ckHostHiHat)
+        self.ui.lHiHatPedal = QtWidgets.QLabel(box)
+        form.addRow("Pedal", self.ui.lHiHatPedal)
+        layout.addWidget(box)
+        
+        self.ui.teHostFilters = QtWidgets.QPlainTextEdit(self.hostFiltersDialog)
+        self.ui.teHostFilters.setReadOnly(True)
+        self.ui.teHostFilters.setMinimumSize(300, 160)
+        self.ui.teHostFilters.setStyleSheet("font-family: Menlo, Monaco, Courier, monospace;")
+        layout.addWidget(self.ui.teHostFilters)
+        self.ui.btnHostFiltersReset = QtWidgets.QPushButton("Zerar contadores", self.hostFiltersDialog)
+        self.ui.btnHostFiltersReset.clicked.connect(self.resetHostFilters)
+        layout.addWidget(self.ui.btnHostFiltersReset)
+        
+        self.hostFiltersTimer = QTimer(self)
+        self.hostFiltersTimer.timeout.connect(self.refreshHostFilters)
+        self.hostFiltersDialog.finished.connect(lambda result: self.hostFiltersTimer.stop())
+        self.ui.ckHostCrosstalk.setChecked(hostCrosstalk)
+        self.ui.ckHostDoubleTrigger.setChecked(hostDoubleTrigger)
+        self.ui.ckHostHiHat.setChecked(hostHiHat)
+        
+    def showHostFilters(self):
+        self.refreshHostFilters()
+        self.hostFiltersTimer.start(int(1000 / hostFiltersRefreshHz))
+        self.hostFiltersDialog.show()
+        self.hostFiltersDialog.raise_()
+        
+    def enableHostCrosstalk(self, enabled):
+        self.router.set_crosstalk(self.crosstalk if enabled else None)
+        self.log("Supressão de crosstalk no host " + ("ligada" if enabled else "desligada"))
+        
+    def enableHostDoubleTrigger(self, enabled):
+        self.router.set_double_trigger(self.double_trigger if enabled else None)
+        self.log("Filtro de batidas duplas no host " + ("ligado" if enabled else "desligado"))
+        
+    def enableHostHiHat(self, enabled):
+        self.router.set_hihat(self.hihat if enabled else None)
+        self.log("Chimbal pelo pedal no host " + ("ligado" if enabled else "desligado"))
+        
+    def resetHostFilters(self):
+        self.crosstalk.reset()
+        self.double_trigger.reset()
+        self.hihat.reset()
+        self.refreshHostFilters()
+        
+    def refreshHostFilters(self):
+        """Batidas suprimidas por pad e estado do pedal do chimbal"""
+        position = self.hihat.position if self.hihat.position >= 0 else "?"
+        self.ui.lHiHatPedal.setText(f"{position} ({ZONE_NAMES[self.hihat.zone]}), "
+                                    f"{self.hihat.remapped} notas trocadas, {self.hihat.chicks} chicks")
+        lines = []
+        for pad, (masked, retriggered) in self.double_trigger.counts().items():
+            lines.append(f"{self.pins[pad].name.decode():<20} máscara {masked:>6} retrigger {retriggered:>6}")
+        for pad, count in self.crosstalk.counts().items():
+            lines.append(f"{self.pins[pad].name.decode():<20} crosstalk {count:>6}")
+        self.ui.teHostFilters.setPlainText("\n".join(lines) or "Nenhuma batida suprimida")
+        
     def addResetMonitorButton(self):
         """Adiciona o botão para resetar as barras de progresso na aba Monitor"""
         # Cria o botão na aba Monitor
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Roteamento das batidas recebidas pela serial para a saída escolhida.
+
+O MidiRouter não depende do Qt: o thread de leitura chama forward() para cada
+mensagem e o destino (MIDI, sampler interno, SFZ ou nenhum) é trocado pela
+interface com set_target(). A troca é uma única atribuição de atributo, que é
+atômica no CPython, então o caminho de cada batida não precisa de locks nem de
+consultar widgets.
+
+Além do destino principal, enviado no próprio thread de leitura, o roteador
+pode ter rotas extras (MidiRoute): outras portas MIDI, cada uma com filtro de
+notas e canais, fila própria (HitRing) e thread de envio próprio. O thread de
+leitura só filtra e enfileira; uma porta lenta ou travada enche a sua fila e
+perde batidas nela, sem atrasar o destino principal nem as outras rotas.
+"""
+
+import threading
+import time
+
+from hit_ring import HitRing
+
+TARGET_NONE = 'none'
+TARGET_MIDI = 'midi'
+TARGET_SAMPLER = 'sampler'
+TARGET_SFZ = 'sfz'
+
+# Fila de cada rota extra (batidas) e idade máxima (s) de uma batida na fila:
+# batidas mais velhas são descartadas em vez de enviadas atrasadas
+ROUTE_QUEUE_SIZE = 256
+ROUTE_MAX_DELAY = 0.05
+
+
+def _mask(values, size):
+    """bytearray de ``size`` posições com 1 nos valores aceitos (None aceita todos)"""
+    if values is None:
+        return bytearray(b'\x01' * size)
+    mask = bytearray(size)
+    for value in values:
+        if not 0 <= value < size:
+            raise ValueError(f"valor fora da faixa: {value}")
+        mask[value] = 1
+    return mask
+
+
+def parse_range_list(text, minimum=0, maximum=127):
+    """'36-51,53' -> [36, ..., 51, 53]; valores fora de minimum-maximum são erro"""
+    values = []
+    for part in text.split(','):
+        lo, _, hi = part.partition('-')
+        lo, hi = int(lo), int(hi or lo)
+        if not minimum <= lo <= hi <= maximum:
+            raise ValueError(f"faixa inválida '{part}' (esperado {minimum}-{maximum}, início <= fim)")
+        values.extend(range(lo, hi + 1))
+    return values
+
+
+def parse_route_spec(spec):
+    """'Porta;notes=36-51;channels=10;cc=0' -> argumentos de MidiRoute (sem a saída)"""
+    port, *options = spec.split(';')
+    route = {'port': port, 'notes': None, 'channels': None, 'cc': True}
+    for option in options:
+        key, _, value = option.partition('=')
+        try:
+            if key == 'notes':
+                route[key] = parse_range_list(value, 0, 127)
+            elif key == 'channels':
+                route[key] = parse_range_list(value, 1, 16)
+            elif key == 'cc':
+                route['cc'] = value not in ('0', 'no', 'false')
+            else:
+                raise ValueError(f"opção de rota desconhecida: {key}")
+        except ValueError as e:
+            raise ValueError(f"rota '{spec}': {e}") from None
+    return route
+
+
+class MidiRouter:
+    """Encaminha mensagens [cmd, note, vel] para o destino selecionado"""
+
+    def __init__(self, midi_out=None, sampler=None, sfz=None):
+        self.midi_out = midi_out
+        # Sampler interno (sampler.Sampler) e instrumento SFZ (sfz.SfzSampler):
+        # só recebem note_on, o áudio é de outro thread
+        self.sampler = sampler
+        self.sfz = sfz
+        self.target = TARGET_NONE
+        self._send = self._send_none
+        self.sent = 0
+        self.errors = 0
+        self._flush = self._find_flush(midi_out)
+        # Rotas extras; a tupla é trocada inteira, nunca alterada no lugar
+        self.routes = ()
+        # Curvas de velocidade do host (VelocityCurves); None envia a velocidade recebida
+        self.curves = None
+        # Filtro de batidas duplas do host (DoubleTriggerFilter); None desliga
+        self.double_trigger = None
+        # Supressão de crosstalk do host (CrosstalkSuppressor); None desliga
+        self.xtalk = None
+        # Troca das notas do chimbal pelo pedal (HiHatRemapper); None desliga
+        self.hihat = None
+        self.suppressed = 0
+
+    @staticmethod
+    def _find_flush(midi_out):
+        # Alguns backends expõem flush(); resolvido uma vez, não a cada batida
+        rt_midi = getattr(getattr(midi_out, '_midi_out', None), '_rt_midi', None)
+        return getattr(rt_midi, 'flush', None)
+
+    def set_midi_out(self, midi_out):
+        self.midi_out = midi_out
+        self._flush = self._find_flush(midi_out)
+        self.set_target(self.target)
+
+    def set_sampler(self, sampler):
+        self.sampler = sampler
+        self.set_target(self.target)
+
+    def set_sfz(self, sfz):
+        self.sfz = sfz
+        self.set_target(self.target)
+
+    def set_target(self, target):
+        """Troca o destino das próximas mensagens"""
+        if target == TARGET_MIDI and self.midi_out is not None:
+            send = self._send_midi
+        elif target == TARGET_SAMPLER and self.sampler is not None:
+            send = self._send_sampler
+        elif target == TARGET_SFZ and self.sfz is not None:
+            send = self._send_sfz
+        else:
+            send = self._send_none
+        self.target = target
+        self._send = send
+
+    def set_velocity_curves(self, curves):
+        """Liga (VelocityCurves) ou desliga (None) as curvas de velocidade do host"""
+        self.curves = curves
+
+    def set_double_trigger(self, double_trigger):
+        """Liga (DoubleTriggerFilter) ou desliga (None) o filtro de batidas duplas do host"""
+        self.double_trigger = double_trigger
+
+    def set_crosstalk(self, suppressor):
+        """Liga (CrosstalkSuppressor) ou desliga (None) a supressão de crosstalk do host"""
+        self.xtalk = suppressor
+
+    def set_hihat(self, hihat):
+        """Liga (HiHatRemapper) ou desliga (None) a troca de notas do chimbal"""
+        self.hihat = hihat
+
+    def rebuild_filters(self):
+        """Refaz as tabelas dos filtros ligados após mudança no kit"""
+        for stage in (self.double_trigger, self.xtalk, self.curves, self.hihat):
+            if stage is not None:
+                stage.rebuild()
+
+    def add_route(self, route):
+        """Inicia e adiciona uma rota extra"""
+        route.start()
+        self.routes = self.routes + (route,)
+        return route
+
+    def remove_route(self, route):
+        self.routes = tuple(r for r in self.routes if r is not route)
+        route.stop()
+
+    def close_routes(self):
+        routes, self.routes = self.routes, ()
+        for route in routes:
+            route.stop()
+
+    def forward(self, cmd, note, vel, stamp=0.0):
+        """Envia uma mensagem; chamado pelo thread de leitura para cada batida
+
+        ``stamp`` é o instante (perf_counter) em que os bytes chegaram; sem ele
+        os filtros usam o instante da chamada.
+        """
+        kind = cmd & 0xF0
+        if kind == 0x90 and vel:
+            # Batidas duplas antes do crosstalk: uma repetição descartada não
+            # vira a referência do grupo
+            double_trigger = self.double_trigger
+            xtalk = self.xtalk
+            if double_trigger is not None or xtalk is not None:
+                now = stamp or time.perf_counter()
+                if double_trigger is not None:
+                    vel = double_trigger.filter(note, vel, now)
+                if vel and xtalk is not None:
+                    vel = xtalk.filter(note, vel, now)
+                if not vel:
+                    self.suppressed += 1
+                    return
+            curves = self.curves
+            if curves is not None:
+                vel = curves.by_note[note][vel]
+            # A curva usa a nota do pad; a troca do chimbal vem por último
+            hihat = self.hihat
+            if hihat is not None:
+                note = hihat.remap(note, vel)
+        elif kind == 0x80 or kind == 0x90:
+            # Note off (ou note on com velocidade 0) na nota trocada pelo chimbal
+            hihat = self.hihat
+            if hihat is not None:
+                note = hihat.release(note)
+        elif kind == 0xB0:
+            hihat = self.hihat
+            if hihat is not None and hihat.is_pedal(note):
+                chick = hihat.pedal(vel, stamp or time.perf_counter())
+                self._deliver(cmd, note, vel)
+                if chick:
+                    # Nota curta: note off logo em seguida, como a batida de um pad
+                    self._deliver(0x90 | (cmd & 0x0F), hihat.chick_note, chick)
+                    self._deliver(0x80 | (cmd & 0x0F), hihat.chick_note, 0)
+                return
+        self._deliver(cmd, note, vel)
+
+    def forget_pedal(self):
+        """Após reconectar, a posição do pedal do chimbal volta a ser desconhecida"""
+        hihat = self.hihat
+        if hihat is not None:
+            hihat.forget_pedal()
+
+    def _deliver(self, cmd, note, vel):
+        try:
+            self._send(cmd, note, vel)
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Erro ao enviar mensagem MIDI: {e}")
+        # Rotas extras depois do destino principal: só filtro e fila
+        for route in self.routes:
+            route.offer(cmd, note, vel)
+
+    def _send_midi(self, cmd, note, vel):
+        self.midi_out.send_message([cmd, note, vel])
+        if self._flush is not None:
+            self._flush()
+
+    def _send_sampler(self, cmd, note, vel):
+        # Só notas: CC e note off não mudam as amostras em andamento
+        if cmd & 0xF0 == 0x90 and vel:
+            self.sampler.note_on(note, vel)
+
+    def _send_sfz(self, cmd, note, vel):
+        if cmd & 0xF0 == 0x90 and vel:
+            self.sfz.note_on(note, vel)
+
+    def _send_none(self, cmd, note, vel):
+        pass
+
+
+class MidiRoute:
+    """Saída MIDI extra com filtro e thread de envio próprios"""
+
+    def __init__(self, name, midi_out, notes=None, channels=None, cc=True,
+                 queue_size=ROUTE_QUEUE_SIZE, max_delay=ROUTE_MAX_DELAY):
+        self.name = name
+        self.midi_out = midi_out
+        # Filtros em tabelas indexadas: notas 0-127 e canais 1-16 (índice 0-15)
+        self._notes = _mask(notes, 128)
+        self._channels = _mask(None if channels is None else [c - 1 for c in channels], 16)
+        self.cc = cc
+        self.max_delay = max_delay
+        self.ring = HitRing(queue_size)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.filtered = 0
+        self.sent = 0
+        self.expired = 0
+        self.errors = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"MidiRoute {self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Para o thread de envio; uma porta travada não segura o chamador além de ``timeout``"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def offer(self, cmd, note, vel):
+        """Filtra e enfileira; chamado pelo thread de leitura, nunca bloqueia"""
+        kind = cmd & 0xF0
+        if not self._channels[cmd & 0x0F]:
+            self.filtered += 1
+            return
+        if kind == 0xB0:
+            if not self.cc:
+                self.filtered += 1
+                return
+        elif not self._notes[note]:
+            self.filtered += 1
+            return
+        # Fila cheia: a batida é descartada e contada em ring.dropped
+        if self.ring.push(cmd, note, vel, time.perf_counter()):
+            self._wake.set()
+
+    def _run(self):
+        ring = self.ring
+        wake = self._wake
+        send = self.midi_out.send_message
+        while not self._stop.is_set():
+            wake.wait(0.5)
+            # Limpa antes de esvaziar: uma batida que chegar agora acorda de novo
+            wake.clear()
+            for cmd, note, vel, stamp in ring.drain():
+                if time.perf_counter() - stamp > self.max_delay:
+                    self.expired += 1
+                    continue
+                try:
+                    send([cmd, note, vel])
+                    self.sent += 1
+                except Exception:
+                    self.errors += 1
+
+    def stats(self):
+        return {
+            'route': self.name,
+            'sent': self.sent,
+            'filtered': self.filtered,
+            'dropped': self.ring.dropped,
+            'expired': self.expired,
+            'errors': self.errors,
+            'queued': len(self.ring),
+        }
@@ -33,4 +33,28 @@ class MidiOutWrapper:
         self._midi_out.open_port(port)
     
     def close_port(self):
-        self._midi_out.close_port()
\ No newline at end of file
+        self._midi_out.close_port()
+    
+    def open_virtual_port(self, name):
+        self._midi_out.open_virtual_port(name)
+    
+    def find_port(self, name):
+        """Retorna o índice da porta pelo índice numérico ou por parte do nome (-1 se não existir)"""
+        self.ports = self._get_ports_list()
+        if str(name).isdigit():
+            index = int(name)
+            return index if index < len(self.ports) else -1
+        for i, port_name in enumerate(self.ports):
+            if str(name).lower() in port_name.lower():
+                return i
+        return -1
+
+
+def open_output(name):
+    """Nova saída aberta na porta ``name`` (índice ou parte do nome), para rotas extras"""
+    midi_out = MidiOutWrapper()
+    index = midi_out.find_port(name)
+    if index < 0:
+        raise IOError(f"porta MIDI '{name}' não encontrada")
+    midi_out.open_port(index)
+    return midi_out
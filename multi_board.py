@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Várias placas Arduino agregadas em um único kit e uma única saída MIDI.
+
+Cada placa tem seu próprio thread de leitura (BoardReader), parser, buffer
+circular de batidas e faixa de pads no kit combinado: a placa i ocupa os pads
+i*NUM_PINS até (i+1)*NUM_PINS-1. Os threads de leitura nunca chamam a saída
+MIDI; apenas colocam a batida no HitRing da placa, sem locks, e avisam o
+HitMerger. O HitMerger é o único thread que chama o roteador e atende as
+placas em rodízio, no máximo ``quantum`` batidas de cada uma por vez: uma
+placa lenta ou com ruído não atrasa a leitura nem o envio das outras.
+
+Os filtros do host só são usados pelo HitMerger: quando chega um parâmetro
+ou a placa reconecta, o BoardReader apenas marca um pedido e o HitMerger
+refaz as tabelas (ou esquece a posição do pedal) entre duas batidas, no
+próprio thread. Um frame inválido é registrado e descartado sem derrubar o
+thread da placa.
+
+Só a ponte headless agrega placas (bridge.py --serial PORTA1 PORTA2 ...); a
+interface gráfica abre e configura uma placa por vez. Não depende do Qt.
+"""
+
+import threading
+import time
+
+import serial
+
+from hit_ring import HitRing
+from hit_timing import LatencyHistogram
+from kit import NUM_PINS
+from protocol import CMD_ASKPARAM, CMD_LICENSE, CMD_MODE, MODE_MIDI, apply_param, license_reply, sysex
+from serial_parser import SerialFrameParser, FRAME_SYSEX
+from serial_reader import SerialReader, READER_MODE_EVENT
+
+# Batidas enviadas de cada placa antes de passar para a próxima
+MERGE_QUANTUM = 8
+
+
+class BoardReader:
+    """Leitura de uma placa em thread próprio; as batidas vão para o seu HitRing"""
+
+    def __init__(self, index, ser, pins, wake, reader_mode=READER_MODE_EVENT, reconnector=None, log=print):
+        self.index = index
+        self.offset = index * NUM_PINS
+        self.ser = ser
+        self.pins = pins
+        self.wake = wake
+        self.reconnector = reconnector
+        self.log = log
+        # Pedidos ao HitMerger: refazer os filtros do host / esquecer o pedal
+        self.params_changed = False
+        self.reconnected = False
+        self.parser = SerialFrameParser()
+        self.reader = SerialReader(ser, self.parser, reader_mode)
+        self.ring = HitRing()
+        self._stop = threading.Event()
+        self._thread = None
+        # Estatísticas da placa (o HitMerger preenche forwarded e latency)
+        self.hits = 0
+        self.forwarded = 0
+        self.reconnects = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def name(self):
+        return f"placa {self.index} ({self.ser.port})"
+
+    def start(self):
+        # Coloca o firmware no modo MIDI, como a aba Monitor da interface
+        self.ser.write(sysex(CMD_MODE, MODE_MIDI, 0x00))
+        self._thread = threading.Thread(target=self._run, name=f"Board{self.index}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.reader.wakeup()
+        if self.reconnector is not None:
+            self.reconnector.stop(timeout=0)
+
+    def join(self, timeout=1.0):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.reader.close()
+
+    def process_sysex(self, data):
+        """Parâmetros vão para a faixa de pads da placa; a licença é respondida na própria porta"""
+        if len(data) < 2:
+            return
+        if data[1] == CMD_ASKPARAM:
+            if len(data) >= 5 and data[2] < NUM_PINS:
+                apply_param(self.pins, self.offset + data[2], data[3], data[4])
+                self.params_changed = True
+                self.wake.set()
+        elif data[1] == CMD_LICENSE:
+            self.ser.write(license_reply(data))
+
+    def _run(self):
+        ring = self.ring
+        wake = self.wake
+        while not self._stop.is_set():
+            try:
+                if self.reader.fill() <= 0:
+                    continue
+            except (serial.SerialException, OSError) as e:
+                if self._stop.is_set() or not self._reattach(e):
+                    break
+                continue
+            pushed = False
+            for kind, frame in self.parser.frames():
+                try:
+                    if kind == FRAME_SYSEX:
+                        self.process_sysex(frame[1:])
+                    else:
+                        self.hits += 1
+                        ring.push(frame[0], frame[1], frame[2] if len(frame) > 2 else 0, time.perf_counter())
+                        pushed = True
+                except Exception as e:
+                    self.log(f"Erro na {self.name} ao processar frame {bytes(frame).hex(' ')}: {e}")
+            if pushed:
+                wake.set()
+
+    def _reattach(self, error):
+        """Reabre só esta placa; as outras continuam tocando"""
+        self.log(f"Erro na {self.name}: {error}")
+        if self.reconnector is None:
+            return False
+        self.reader.close()
+        try:
+            self.ser.close()
+        except Exception:
+            pass
+        result = self.reconnector.connect()
+        if result is None:
+            return False
+        self.ser, port, elapsed = result
+        self.parser.reset()
+        self.reader = SerialReader(self.ser, self.parser, self.reader.mode)
+        self.reconnected = True
+        self.wake.set()
+        self.ser.write(sysex(CMD_MODE, MODE_MIDI, 0x00))
+        self.reconnects += 1
+        self.log(f"Placa {self.index} reconectada a {port} em {int(elapsed * 1000)} ms")
+        return True
+
+    def stats(self):
+        return {
+            'board': self.index,
+            'port': self.ser.port,
+            'pads': f"{self.offset}-{self.offset + NUM_PINS - 1}",
+            'hits': self.hits,
+            'forwarded': self.forwarded,
+            'dropped': self.ring.dropped,
+            'framing_errors': dict(self.parser.errors),
+            'bytes_received': self.parser.bytes_received,
+            'reconnects': self.reconnects,
+            'queue_p50_us': self.latency.percentile(0.5),
+            'queue_p99_us': self.latency.percentile(0.99),
+        }
+
+
+class HitMerger:
+    """Thread único que envia ao roteador as batidas de todas as placas, em rodízio"""
+
+    def __init__(self, router, boards, wake, quantum=MERGE_QUANTUM, on_hit=None):
+        self.router = router
+        self.boards = boards
+        self.wake = wake
+        self.quantum = quantum
+        self.on_hit = on_hit
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="HitMerger", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self.wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _apply_board_requests(self):
+        """Pedidos das placas aplicados neste thread, o único que usa os filtros"""
+        rebuild = forget = False
+        for board in self.boards:
+            if board.params_changed:
+                board.params_changed = False
+                rebuild = True
+            if board.reconnected:
+                board.reconnected = False
+                forget = True
+        if rebuild:
+            self.router.rebuild_filters()
+        if forget:
+            self.router.forget_pedal()
+
+    def _run(self):
+        forward = self.router.forward
+        on_hit = self.on_hit
+        quantum = self.quantum
+        while not self._stop.is_set():
+            self.wake.wait(0.5)
+            # Limpa antes de esvaziar: uma batida que chegar agora acorda de novo
+            self.wake.clear()
+            self._apply_board_requests()
+            busy = True
+            while busy:
+                busy = False
+                for board in self.boards:
+                    if not len(board.ring):
+                        continue
+                    latency = board.latency
+                    n = 0
+                    for cmd, note, vel, stamp in board.ring.drain(quantum):
+                        forward(cmd, note, vel, stamp)
+                        latency.add((time.perf_counter() - stamp) * 1e6)
+                        if on_hit is not None:
+                            on_hit(board, cmd, note, vel)
+                        n += 1
+                    board.forwarded += n
+                    if len(board.ring):
+                        busy = True
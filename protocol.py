@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Constantes e utilitários do protocolo serial do firmware microDRUM/Mega eDrum.
+
+As mensagens de configuração trafegam como SysEx de tamanho fixo:
+F0 77 cmd pin param value F7. Este módulo não depende do Qt para poder ser
+usado também pela ponte headless (bridge.py).
+"""
+
+import struct
+
+# Velocidade padrão da porta serial
+#SERIAL_SPEED=31250
+SERIAL_SPEED = 115200
+
+SYSEX_START = 0xF0
+SYSEX_END = 0xF7
+SYSEX_ID = 0x77
+
+# Comandos
+CMD_MODE = 0x01
+CMD_ASKPARAM = 0x02
+CMD_SET = 0x03
+CMD_SAVE = 0x04  # SET + gravação na EEPROM
+CMD_LICENSE = 0x60
+CMD_DUMP = 0x10        # dump do kit completo (pedido do host / resposta do firmware)
+CMD_DUMP_WRITE = 0x11  # gravação do kit completo (frame do host / confirmação do firmware)
+CMD_BAUD = 0x12        # troca da velocidade da porta (link_speed.py)
+
+# Modos do firmware (argumento "pin" do comando CMD_MODE)
+MODE_SETUP = 0x01
+MODE_MIDI = 0x02
+MODE_LOG = 0x03
+
+# Parâmetros
+PARAM_NOTE = 0x00
+PARAM_THRESOLD = 0x01
+PARAM_SCANTIME = 0x02
+PARAM_MASKTIME = 0x03
+PARAM_RETRIGGER = 0x04
+PARAM_CURVE = 0x05
+PARAM_XTALK = 0x06
+PARAM_XTALKGROUP = 0x07
+PARAM_CURVEFORM = 0x08
+PARAM_GAIN = 0x09
+PARAM_TYPE = 0x0D
+PARAM_CHANNEL = 0x0E
+PARAM_ALL = 0x7F
+
+# Código do parâmetro -> campo da estrutura PIN
+PARAM_FIELDS = {
+    PARAM_TYPE: 'type',
+    PARAM_NOTE: 'note',
+    PARAM_THRESOLD: 'thresold',
+    PARAM_SCANTIME: 'scantime',
+    PARAM_MASKTIME: 'masktime',
+    PARAM_RETRIGGER: 'retrigger',
+    PARAM_CURVE: 'curve',
+    PARAM_XTALK: 'xtalk',
+    PARAM_XTALKGROUP: 'xtalkgroup',
+    PARAM_CURVEFORM: 'curveform',
+    PARAM_GAIN: 'gain',
+    PARAM_CHANNEL: 'channel',
+}
+FIELD_PARAMS = {field: param for param, field in PARAM_FIELDS.items()}
+
+Permutation = [ 0x72, 0x32, 0x25, 0x64, 0x64, 0x4f, 0x1e, 0x26, 0x2a, 0x74, 0x37, 0x09, 0x57, 0x02, 0x28,
+            0x08, 0x14, 0x23, 0x49, 0x10, 0x62, 0x02, 0x1e, 0x7e, 0x5d, 0x1b, 0x27, 0x76, 0x7a, 0x76, 0x05, 0x2e ]
+
+
+def pearson_hash(input):
+    """Hash usado na resposta ao desafio de licença (0x60) do firmware"""
+    h=0
+    for i in input:
+        index=i ^ h
+        h=Permutation[index % len(Permutation)]
+    return h
+
+
+def sysex(cmd, pin, param, value=0x00):
+    """Monta um frame SysEx de configuração"""
+    data = SYSEX_START,SYSEX_ID,cmd,pin,param,value,SYSEX_END
+    return struct.pack("B"*len(data), *data)
+
+
+def license_reply(data):
+    """Resposta ao desafio de licença; data são os bytes após o F0"""
+    return sysex(CMD_LICENSE, data[2], data[3], pearson_hash(list(data[2:4])))
+
+
+def apply_param(pins, pin, param, value):
+    """Aplica um parâmetro recebido (ASKPARAM) ao kit; retorna o nome do parâmetro"""
+    field = PARAM_FIELDS.get(param)
+    if field is None:
+        return ""
+    setattr(pins[pin], field, value)
+    return field.upper()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Sampler de bateria interno, sem sintetizador externo.
+
+As amostras WAV são carregadas uma vez em um único buffer NumPy contíguo
+(frames x 2 canais, float32), cada uma seguida de um bloco de silêncio: a
+leitura de um bloco inteiro nunca passa do fim da amostra e a mixagem não
+precisa de máscaras. Cada nota tem camadas de velocidade e cada camada
+alterna entre as suas amostras (round-robin).
+
+As vozes ficam em arrays de tamanho fixo. Quando todas estão ocupadas, a
+voz mais antiga é roubada. A mixagem de um bloco é vetorizada: um único
+gather lê o trecho de todas as vozes ativas e um produto com os ganhos soma
+as vozes.
+
+O thread de leitura só chama note_on(), que coloca a batida em um HitRing;
+o thread de áudio esvazia a fila no início de cada bloco. A saída de áudio
+usa o sounddevice, se instalado; o modo offline (render_events, --render)
+grava um WAV sem nenhum hardware de áudio.
+
+Uso: python3 sampler.py --kit samples --render demo.wav [--seconds 8] [--bpm 120]
+     python3 sampler.py --synthetic --render demo.wav
+"""
+
+import argparse
+import os
+import re
+import sys
+import wave
+
+import numpy as np
+
+from hit_ring import HitRing
+
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 128
+MAX_VOICES = 64
+
+# Pasta das amostras: <nota>[_v<vel máx>][_rr<n>][_nome].wav, ex.: 38_v64_rr1.wav
+SAMPLER_KIT_DIR = "samples"
+KIT_FILE_PATTERN = re.compile(r'^(\d+)(?:_v(\d+))?(?:_rr(\d+))?.*\.wav$', re.IGNORECASE)
+
+# Ganho de cada voz: (vel/127) ** VELOCITY_EXPONENT; ganho geral da mixagem
+VELOCITY_EXPONENT = 1.5
+MASTER_GAIN = 0.5
+
+
+def read_wav(path, sample_rate=SAMPLE_RATE):
+    """WAV PCM (8/16/24/32 bits) -> float32 (frames, 2), reamostrado para ``sample_rate``"""
+    with wave.open(path, 'rb') as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        audio = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 8388608.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"{path}: {width * 8} bits por amostra não suportado")
+    audio = audio.reshape(-1, channels)
+    audio = np.repeat(audio, 2, axis=1) if channels == 1 else audio[:, :2]
+    if rate != sample_rate and len(audio):
+        n = int(round(len(audio) * sample_rate / rate))
+        t = np.arange(n) * (rate / sample_rate)
+        src = np.arange(len(audio))
+        audio = np.stack([np.interp(t, src, audio[:, c]) for c in range(2)], axis=1)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def write_wav(path, audio, sample_rate=SAMPLE_RATE):
+    """float (frames, 2) -> WAV de 16 bits"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+class SampleBank:
+    """Todas as amostras em um buffer contíguo, cada uma seguida de ``pad`` frames de silêncio"""
+
+    def __init__(self, pad=BLOCK_SIZE):
+        self.pad = pad
+        self.names = []
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros((pad, 2), dtype=np.float32)
+        self._parts = []
+
+    def add(self, audio, name=""):
+        """Adiciona uma amostra (frames, 2); retorna o índice dela"""
+        self._parts.append(np.asarray(audio, dtype=np.float32))
+        self.names.append(name)
+        return len(self.names) - 1
+
+    def freeze(self):
+        """Monta o buffer contíguo; chamado depois de adicionar as amostras"""
+        silence = np.zeros((self.pad, 2), dtype=np.float32)
+        lengths = np.array([len(p) for p in self._parts], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths + self.pad)[:-1])).astype(np.int64)
+        chunks = []
+        for part in self._parts:
+            chunks.append(part)
+            chunks.append(silence)
+        self.data = np.ascontiguousarray(np.concatenate(chunks) if chunks else silence)
+        self.offsets, self.lengths = offsets, lengths
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+class Sampler:
+    """Camadas de velocidade, round-robin, vozes fixas com roubo e mixagem por blocos"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, voices=MAX_VOICES, block=BLOCK_SIZE):
+        self.sample_rate = sample_rate
+        self.block = block
+        self.bank = SampleBank(block)
+        # (nota, velocidade) -> camada; cada camada tem suas amostras e o próximo round-robin
+        self._layer = np.full((128, 128), -1, dtype=np.int32)
+        self._layer_samples = []
+        self._layer_next = []
+        # Vozes: início absoluto no buffer, posição, tamanho, ganho e ordem de início (-1 = livre)
+        self._v_start = np.zeros(voices, dtype=np.int64)
+        self._v_pos = np.zeros(voices, dtype=np.int64)
+        self._v_len = np.zeros(voices, dtype=np.int64)
+        self._v_gain = np.zeros(voices, dtype=np.float32)
+        self._v_age = np.full(voices, -1, dtype=np.int64)
+        self._ramp = np.arange(block, dtype=np.int64)
+        self._silence = np.zeros((block, 2), dtype=np.float32)
+        self._events = HitRing(1024)
+        self._clock = 0
+        self.master_gain = MASTER_GAIN
+        self.played = 0
+        self.stolen = 0
+
+    @property
+    def voices(self):
+        return len(self._v_age)
+
+    @property
+    def active_voices(self):
+        return int(np.count_nonzero(self._v_age >= 0))
+
+    @property
+    def dropped(self):
+        return self._events.dropped
+
+    def add_layer(self, note, lovel, hivel, sample_ids):
+        """Camada de velocidade lovel-hivel da nota, alternando entre ``sample_ids``"""
+        self._layer_samples.append(tuple(sample_ids))
+        self._layer_next.append(0)
+        self._layer[note, lovel:hivel + 1] = len(self._layer_samples) - 1
+
+    def notes(self):
+        return [n for n in range(128) if (self._layer[n] >= 0).any()]
+
+    def note_on(self, note, vel):
+        """Agenda uma batida para o próximo bloco; chamado pelo thread de leitura"""
+        self._events.push(0x90, note, vel)
+
+    def _start_voice(self, note, vel):
+        layer = self._layer[note, vel]
+        if layer < 0:
+            return
+        samples = self._layer_samples[layer]
+        i = self._layer_next[layer]
+        self._layer_next[layer] = (i + 1) % len(samples)
+        sample = samples[i]
+        v = self._alloc_voice()
+        self._v_start[v] = self.bank.offsets[sample]
+        self._v_pos[v] = 0
+        self._v_len[v] = self.bank.lengths[sample]
+        self._v_gain[v] = (vel / 127.0) ** VELOCITY_EXPONENT
+        self.played += 1
+
+    def _alloc_voice(self):
+        """Voz livre (-1) ou, com todas ocupadas, a mais antiga; já marcada como a mais nova"""
+        v = int(np.argmin(self._v_age))
+        if self._v_age[v] >= 0:
+            self.stolen += 1
+        self._v_age[v] = self._clock
+        self._clock += 1
+        return v
+
+    def render_block(self):
+        """Próximo bloco (block, 2) em float32"""
+        for _, note, vel, _ in self._events.drain():
+            if vel:
+                self._start_voice(note, vel)
+        active = np.flatnonzero(self._v_age >= 0)
+        if not len(active):
+            return self._silence
+        pos = self._v_pos[active]
+        # Trecho de todas as vozes de uma vez: (vozes, block, 2)
+        index = (self._v_start[active] + pos)[:, None] + self._ramp
+        mixed = np.tensordot(self._v_gain[active] * self.master_gain, self.bank.data[index], axes=1)
+        pos += self.block
+        self._v_pos[active] = pos
+        self._v_age[active[pos >= self._v_len[active]]] = -1
+        np.clip(mixed, -1.0, 1.0, out=mixed)
+        return mixed
+
+    def render(self, frames):
+        """``frames`` frames (arredondado para blocos inteiros) na sequência"""
+        blocks = -(-frames // self.block)
+        return np.concatenate([self.render_block() for _ in range(blocks)])[:frames]
+
+    def render_events(self, events, seconds):
+        """Renderização offline: events = [(segundos, nota, vel)], alinhados ao bloco"""
+        events = sorted(events)
+        total = int(seconds * self.sample_rate)
+        out = np.zeros((-(-total // self.block) * self.block, 2), dtype=np.float32)
+        i = 0
+        for start in range(0, len(out), self.block):
+            block_end = (start + self.block) / self.sample_rate
+            while i < len(events) and events[i][0] < block_end:
+                self.note_on(events[i][1], events[i][2])
+                i += 1
+            out[start:start + self.block] = self.render_block()
+        return out[:total]
+
+
+def load_kit_dir(sampler, path=SAMPLER_KIT_DIR):
+    """Carrega <nota>[_v<vel máx>][_rr<n>].wav da pasta; retorna o número de amostras"""
+    layers = {}
+    for name in sorted(os.listdir(path)):
+        match = KIT_FILE_PATTERN.match(name)
+        if not match:
+            continue
+        note = int(match.group(1))
+        hivel = int(match.group(2) or 127)
+        if note > 127 or not 1 <= hivel <= 127:
+            continue
+        sample = sampler.bank.add(read_wav(os.path.join(path, name), sampler.sample_rate), name)
+        layers.setdefault(note, {}).setdefault(hivel, []).append(sample)
+    sampler.bank.freeze()
+    for note, by_vel in layers.items():
+        lovel = 1
+        for hivel in sorted(by_vel):
+            sampler.add_layer(note, lovel, hivel, by_vel[hivel])
+            lovel = hivel + 1
+    return len(sampler.bank.names)
+
+
+def synthetic_kit(sampler, seconds=1.0, round_robin=2, seed=1):
+    """Bumbo (36), caixa (38) e chimbal (42/46) sintéticos, para testes e benchmark"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sampler.sample_rate)
+    t = np.arange(n) / sampler.sample_rate
+
+    def stereo(mono):
+        return np.stack([mono, mono], axis=1).astype(np.float32)
+
+    voices = {
+        36: lambda: np.sin(2 * np.pi * (50 + 80 * np.exp(-t * 30)) * t) * np.exp(-t * 6),
+        38: lambda: (0.6 * rng.standard_normal(n) + 0.4 * np.sin(2 * np.pi * 190 * t)) * np.exp(-t * 14),
+        42: lambda: np.diff(rng.standard_normal(n + 1)) * 0.4 * np.exp(-t * 40),
+        46: lambda: np.diff(rng.standard_normal(n + 1)) * 0.4 * np.exp(-t * 5),
+    }
+    layers = {}
+    for note, make in voices.items():
+        for hivel, level in ((80, 0.6), (127, 1.0)):
+            layers[(note, hivel)] = [sampler.bank.add(stereo(make() * level), f"{note}_v{hivel}_rr{k}")
+                                     for k in range(round_robin)]
+    sampler.bank.freeze()
+    for note in voices:
+        sampler.add_layer(note, 1, 80, layers[(note, 80)])
+        sampler.add_layer(note, 81, 127, layers[(note, 127)])
+    return len(sampler.bank.names)
+
+
+class AudioOutput:
+    """Saída de áudio em tempo real pelo sounddevice (opcional)"""
+
+    def __init__(self, sampler):
+        # Importado aqui: o sampler e o modo offline não dependem do sounddevice
+        import sounddevice
+        self.sampler = sampler
+        self.underruns = 0
+        self.stream = sounddevice.OutputStream(samplerate=sampler.sample_rate, blocksize=sampler.block,
+                                               channels=2, dtype='float32', latency='low',
+                                               callback=self._callback)
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.underruns += 1
+        outdata[:] = self.sampler.render_block()
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+        self.stream.close()
+
+
+def rock_pattern(bpm, seconds):
+    """Bumbo nos tempos 1 e 3, caixa em 2 e 4, chimbal em colcheias"""
+    beat = 60.0 / bpm
+    events = []
+    t = 0.0
+    step = 0
+    while t < seconds:
+        events.append((t, 42, 70 if step % 2 else 100))
+        if step % 4 == 0:
+            events.append((t, 36, 120))
+        elif step % 4 == 2:
+            events.append((t, 38, 110))
+        t += beat / 2
+        step += 1
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kit', default=SAMPLER_KIT_DIR, help='pasta das amostras')
+    parser.add_argument('--synthetic', action='store_true', help='usa um kit sintético em vez da pasta')
+    parser.add_argument('--render', metavar='ARQUIVO', required=True, help='grava o resultado neste WAV')
+    parser.add_argument('--seconds', type=float, default=8.0)
+    parser.add_argument('--bpm', type=float, default=120.0)
+    parser.add_argument('--voices', type=int, default=MAX_VOICES)
+    args = parser.parse_args()
+
+    sampler = Sampler(voices=args.voices)
+    count = synthetic_kit(sampler) if args.synthetic else load_kit_dir(sampler, args.kit)
+    if not count:
+        print(f"Nenhuma amostra em {args.kit}")
+        return 1
+    print(f"{count} amostras, {sampler.bank.nbytes / 1e6:.1f} MB, notas {sampler.notes()}")
+    audio = sampler.render_events(rock_pattern(args.bpm, args.seconds), args.seconds)
+    write_wav(args.render, audio, sampler.sample_rate)
+    print(f"{args.render}: {args.seconds:.1f} s, {sampler.played} batidas, {sampler.stolen} vozes roubadas")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
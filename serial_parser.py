@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Parser incremental para o fluxo serial enviado pelo Arduino Mega.
+
+O Arduino envia mensagens MIDI de canal (nota, CC) e mensagens SysEx de
+configuração no formato F0 77 cmd pin param value F7. Em vez de ler byte a
+byte, o parser drena tudo o que está disponível na porta para um buffer
+reutilizável e entrega os frames completos como fatias (memoryview) desse
+buffer, sem cópias.
+
+Aceita também o fluxo MIDI padrão: running status (bytes de dados sem repetir
+o status, um terço a menos de bytes por batida em sequências densas) e bytes
+de tempo real (F8-FF) intercalados em qualquer ponto, que são contados e
+ignorados. Nesses casos o frame é montado com o status em um buffer de
+rascunho reutilizável, também entregue como memoryview.
+"""
+
+# Tipos de frame entregues pelo parser
+FRAME_NOTE = 'note'
+FRAME_CC = 'cc'
+FRAME_SYSEX = 'sysex'
+FRAME_OTHER = 'other'
+
+# Bytes de tempo real (clock, start, stop, active sensing...): contados, não entregues
+FRAME_REALTIME = 'realtime'
+REALTIME_MIN = 0xF8
+
+# Tamanho dos frames SysEx de configuração: F0 77 cmd pin param value F7
+SYSEX_LEN = 7
+
+# Tamanho máximo aceito para um SysEx (o dump do kit completo tem ~1,8 KB)
+MAX_SYSEX_LEN = 2048
+
+
+def channel_message_length(status):
+    """Retorna o tamanho total (status + dados) de uma mensagem de canal"""
+    if (status & 0xF0) in (0xC0, 0xD0):
+        return 2
+    return 3
+
+
+def frame_kind(status):
+    """Classifica um frame pelo seu byte de status"""
+    if status == 0xF0:
+        return FRAME_SYSEX
+    high = status & 0xF0
+    if high in (0x80, 0x90, 0xA0):
+        return FRAME_NOTE
+    if high == 0xB0:
+        return FRAME_CC
+    return FRAME_OTHER
+
+
+class SerialFrameParser:
+    """Máquina de estados que separa o fluxo serial em frames completos.
+
+    Os frames são entregues como memoryview do buffer interno (ou do buffer
+    de rascunho, com running status) e só são válidos até o próximo frame.
+    Bytes corrompidos são descartados até o próximo byte de status, e os
+    erros são contados por tipo de frame em ``errors`` (``sync`` conta bytes
+    de dados órfãos).
+    """
+
+    def __init__(self, buffer_size=4096):
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.errors = {FRAME_NOTE: 0, FRAME_CC: 0, FRAME_SYSEX: 0, FRAME_OTHER: 0, 'sync': 0}
+        self.counts = {FRAME_NOTE: 0, FRAME_CC: 0, FRAME_SYSEX: 0, FRAME_OTHER: 0, FRAME_REALTIME: 0,
+                       'running_status': 0}
+        self.bytes_received = 0
+        # Último status de canal recebido (0 = nenhum): vale para os dados seguintes
+        self._running = 0
+        # Rascunho para frames montados (running status ou tempo real intercalado)
+        self._scratch = bytearray(3)
+        self._scratch_view = memoryview(self._scratch)
+
+    def reset(self):
+        """Descarta qualquer frame parcial pendente"""
+        self._start = 0
+        self._end = 0
+        self._running = 0
+
+    def pending(self):
+        """Número de bytes ainda não consumidos no buffer"""
+        return self._end - self._start
+
+    def _compact(self):
+        # Move o frame parcial (no máximo MAX_SYSEX_LEN-1 bytes) para o início do buffer
+        if self._start == 0:
+            return
+        remaining = self._end - self._start
+        if remaining:
+            self._buf[0:remaining] = self._buf[self._start:self._end]
+        self._start = 0
+        self._end = remaining
+
+    def read_from(self, ser):
+        """Lê de uma vez todos os bytes disponíveis na porta serial.
+
+        Se nada estiver disponível, faz uma leitura de 1 byte que respeita o
+        timeout da porta. Retorna o número de bytes lidos.
+        """
+        self._compact()
+        space = len(self._buf) - self._end
+        n = min(max(ser.in_waiting, 1), space)
+        got = ser.readinto(self._view[self._end:self._end + n]) or 0
+        self._end += got
+        self.bytes_received += got
+        return got
+
+    def feed(self, data):
+        """Adiciona bytes já lidos ao buffer (usado quando a leitura é externa)"""
+        self._compact()
+        n = len(data)
+        if self._end + n > len(self._buf):
+            # Buffer cheio: descarta o que não couber e contabiliza como erro de sincronismo
+            n = len(self._buf) - self._end
+            self.errors['sync'] += len(data) - n
+        self._buf[self._end:self._end + n] = data[:n]
+        self._end += n
+        self.bytes_received += n
+        return n
+
+    def _next_status(self, i, end):
+        # Avança até o próximo byte de status (>= 0x80) a partir de i
+        buf = self._buf
+        while i < end and buf[i] < 0x80:
+            i += 1
+        return i
+
+    def _gather(self, i, need, end, out):
+        """Copia ``need`` bytes de dados a partir de i para out[1:], pulando tempo real.
+
+        Retorna (próximo índice, bytes copiados, bytes de tempo real pulados);
+        para no primeiro status que não seja de tempo real.
+        """
+        buf = self._buf
+        got = 0
+        realtime = 0
+        while i < end and got < need:
+            b = buf[i]
+            if b >= REALTIME_MIN:
+                realtime += 1
+            elif b >= 0x80:
+                break
+            else:
+                got += 1
+                out[got] = b
+            i += 1
+        return i, got, realtime
+
+    def frames(self):
+        """Gera tuplas (tipo, frame) para cada frame completo no buffer"""
+        buf = self._buf
+        view = self._view
+        scratch = self._scratch
+        scratch_view = self._scratch_view
+        errors = self.errors
+        counts = self.counts
+        i = self._start
+        end = self._end
+        while i < end:
+            status = buf[i]
+            if status >= REALTIME_MIN:
+                # Tempo real: pode aparecer em qualquer ponto e não altera o running status
+                counts[FRAME_REALTIME] += 1
+                i += 1
+                continue
+
+            if status == 0xF0:
+                # SysEx de tamanho variável: termina no F7
+                self._running = 0
+                j = self._next_status(i + 1, end)
+                realtime = 0
+                while j < end and buf[j] >= REALTIME_MIN:
+                    realtime += 1
+                    j = self._next_status(j + 1, end)
+                if j >= end:
+                    if end - i >= MAX_SYSEX_LEN:
+                        # Grande demais: descarta para não travar o buffer
+                        errors[FRAME_SYSEX] += 1
+                        i = end
+                        continue
+                    break
+                if buf[j] != 0xF7:
+                    # Outro status interrompeu o SysEx
+                    errors[FRAME_SYSEX] += 1
+                    i = j
+                    continue
+                counts[FRAME_SYSEX] += 1
+                self._start = j + 1
+                if realtime:
+                    # Remove os bytes de tempo real do meio do SysEx
+                    counts[FRAME_REALTIME] += realtime
+                    frame = bytes(b for b in buf[i:j + 1] if b < REALTIME_MIN or b == 0xF7)
+                    yield FRAME_SYSEX, memoryview(frame)
+                else:
+                    yield FRAME_SYSEX, view[i:j + 1]
+                i = self._start
+                continue
+
+            if status > 0xF0:
+                # Status de sistema não usado pelo protocolo; cancela o running status
+                self._running = 0
+                errors['sync'] += 1
+                i += 1
+                continue
+
+            if status < 0x80:
+                if not self._running:
+                    # Byte de dados sem status: fluxo dessincronizado
+                    j = self._next_status(i, end)
+                    errors['sync'] += j - i
+                    i = j
+                    continue
+                # Running status: dados de uma nova mensagem com o último status
+                status = self._running
+                data = i
+            else:
+                self._running = status
+                data = i + 1
+
+            length = channel_message_length(status)
+            kind = frame_kind(status)
+            last = data + length - 1  # fim (exclusivo) dos dados
+            if last <= end and self._next_status(data, last) == last:
+                # Caminho rápido: dados contíguos, sem tempo real no meio
+                counts[kind] += 1
+                self._start = last
+                if data == i + 1:
+                    yield kind, view[i:last]
+                else:
+                    counts['running_status'] += 1
+                    scratch[0] = status
+                    scratch[1:length] = buf[data:last]
+                    yield kind, scratch_view[:length]
+                i = self._start
+                continue
+
+            j, got, realtime = self._gather(data, length - 1, end, scratch)
+            if got == length - 1:
+                counts[kind] += 1
+                counts[FRAME_REALTIME] += realtime
+                if data == i:
+                    counts['running_status'] += 1
+                scratch[0] = status
+                self._start = j
+                yield kind, scratch_view[:length]
+                i = self._start
+                continue
+            if j >= end:
+                # Frame parcial: espera pelos próximos bytes
+                break
+            # Status inesperado no meio do frame
+            errors[kind] += 1
+            i = j
+        self._start = i
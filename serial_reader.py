@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Leitura da porta serial orientada a eventos.
+
+No modo "event" o thread de leitura bloqueia em select/epoll sobre o descritor
+de arquivo do pyserial e só acorda quando há bytes para ler (ou quando é
+acordado explicitamente com wakeup()). Em sistemas sem descritor de arquivo
+(Windows) ou no modo "poll", mantém o loop antigo de leitura com timeout de
+1 ms seguido de sleep.
+"""
+
+import os
+import select
+import time
+
+READER_MODE_EVENT = 'event'
+READER_MODE_POLL = 'poll'
+
+# Intervalo máximo que o thread fica bloqueado sem dados antes de reavaliar o
+# estado (thread_running etc.). wakeup() interrompe a espera imediatamente.
+IDLE_TIMEOUT = 0.5
+
+
+def readiness_supported(ser):
+    """Indica se a porta expõe um descritor de arquivo utilizável em select/epoll"""
+    if os.name != 'posix':
+        return False
+    try:
+        ser.fileno()
+        return True
+    except Exception:
+        return False
+
+
+class SerialReadiness:
+    """Espera por dados no descritor da porta serial usando epoll (ou poll)"""
+
+    def __init__(self, ser):
+        self._fd = ser.fileno()
+        # Pipe interno usado para acordar o thread bloqueado (ex.: ao desconectar)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        if hasattr(select, 'epoll'):
+            self._poller = select.epoll()
+            self._poller.register(self._fd, select.EPOLLIN)
+            self._poller.register(self._wake_r, select.EPOLLIN)
+            self._scale = 1.0  # epoll usa segundos
+        else:
+            self._poller = select.poll()
+            self._poller.register(self._fd, select.POLLIN)
+            self._poller.register(self._wake_r, select.POLLIN)
+            self._scale = 1000.0  # poll usa milissegundos
+
+    def wait(self, timeout=IDLE_TIMEOUT):
+        """Bloqueia até haver dados na porta; retorna False em timeout ou wakeup()"""
+        ready = False
+        for fd, _ in self._poller.poll(timeout * self._scale):
+            if fd == self._fd:
+                ready = True
+            else:
+                try:
+                    os.read(self._wake_r, 64)
+                except BlockingIOError:
+                    pass
+        return ready
+
+    def wakeup(self):
+        """Acorda um thread bloqueado em wait()"""
+        try:
+            os.write(self._wake_w, b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        try:
+            self._poller.close()
+        except AttributeError:
+            pass  # select.poll não tem close()
+
+
+class SerialReader:
+    """Preenche um SerialFrameParser a partir da porta no modo configurado"""
+
+    def __init__(self, ser, parser, mode=READER_MODE_EVENT):
+        self.ser = ser
+        self.parser = parser
+        self.readiness = None
+        if mode == READER_MODE_EVENT and readiness_supported(ser):
+            self.readiness = SerialReadiness(ser)
+            # Leitura não bloqueante: a espera fica a cargo do select/epoll
+            ser.timeout = 0
+            self.mode = READER_MODE_EVENT
+        else:
+            ser.timeout = 0.001  # Timeout muito baixo para leitura mais frequente
+            self.mode = READER_MODE_POLL
+
+    def fill(self, idle_timeout=IDLE_TIMEOUT):
+        """Espera por dados e os transfere para o parser. Retorna os bytes lidos."""
+        if self.readiness is not None:
+            if not self.readiness.wait(idle_timeout):
+                return 0
+            return self.parser.read_from(self.ser)
+        got = self.parser.read_from(self.ser)
+        if got <= 0:
+            # Reduz o tempo de espera para melhorar a responsividade
+            time.sleep(0.001)
+        return got
+
+    def wakeup(self):
+        if self.readiness is not None:
+            self.readiness.wakeup()
+
+    def close(self):
+        if self.readiness is not None:
+            self.readiness.close()
+            self.readiness = None
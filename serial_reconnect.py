@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Reconexão automática quando o Arduino some da USB.
+
+A porta é identificada pelo número de série USB (ou VID/PID + localização,
+ou o próprio caminho, nessa ordem) e não pelo nome /dev/ttyACM*, que pode
+mudar quando o dispositivo reaparece. O SerialReconnector procura o
+dispositivo com intervalos crescentes (backoff) até reabri-lo ou ser parado.
+
+Ao reabrir, se a sessão anterior usava uma velocidade negociada, espera o
+firmware responder e negocia de novo: abrir a porta reinicia o Mega, que
+volta para 115200.
+"""
+
+import os
+import threading
+import time
+
+import serial.tools.list_ports
+
+from link_speed import negotiate, wait_ready
+
+# Intervalos entre tentativas (s): dobra a cada falha até o máximo
+RECONNECT_BACKOFF_MIN = 0.05
+RECONNECT_BACKOFF_MAX = 1.0
+
+# Prazo para o firmware responder após reabrir, antes de renegociar a velocidade
+RECONNECT_READY_TIMEOUT = 3.0
+
+
+def port_identity(device):
+    """Identidade estável da porta: número de série USB quando disponível"""
+    path = os.path.realpath(device)
+    for port in serial.tools.list_ports.comports():
+        if os.path.realpath(port.device) != path:
+            continue
+        if port.serial_number:
+            return {'serial_number': port.serial_number, 'device': device}
+        if port.vid is not None:
+            return {'vid': port.vid, 'pid': port.pid, 'location': port.location, 'device': device}
+        break
+    return {'device': device}
+
+
+def find_port(identity):
+    """Caminho atual da porta com essa identidade, ou None se não estiver presente"""
+    if 'serial_number' in identity or 'vid' in identity:
+        for port in serial.tools.list_ports.comports():
+            if 'serial_number' in identity:
+                if port.serial_number == identity['serial_number']:
+                    return port.device
+            elif (port.vid, port.pid, port.location) == (identity['vid'], identity['pid'], identity['location']):
+                return port.device
+        return None
+    # Sem dados USB (ex.: simulador em pty): só o caminho
+    return identity['device'] if os.path.exists(identity['device']) else None
+
+
+class SerialReconnector:
+    """Procura e reabre a porta em um thread próprio (ou no chamador, com connect())"""
+
+    def __init__(self, identity, open_port, baud=None, on_connected=None):
+        self.identity = identity
+        self.open_port = open_port
+        self.baud = baud
+        self.on_connected = on_connected
+        self.attempts = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="SerialReconnect", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _run(self):
+        result = self.connect()
+        if result is not None and self.on_connected is not None:
+            self.on_connected(*result)
+
+    def connect(self):
+        """Bloqueia até reabrir a porta; retorna (ser, device, segundos) ou None se parado"""
+        started = time.monotonic()
+        backoff = RECONNECT_BACKOFF_MIN
+        while not self._stop.is_set():
+            self.attempts += 1
+            device = find_port(self.identity)
+            ser = None
+            if device is not None:
+                try:
+                    ser = self.open_port(device)
+                except Exception:
+                    ser = None
+            if ser is not None:
+                self._restore_speed(ser)
+                if self._stop.is_set():
+                    ser.close()
+                    return None
+                return ser, device, time.monotonic() - started
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        return None
+
+    def _restore_speed(self, ser):
+        if not self.baud or self.baud == ser.baudrate:
+            return
+        try:
+            if wait_ready(ser, RECONNECT_READY_TIMEOUT, self._stop):
+                negotiate(ser, self.baud)
+        except Exception:
+            # Segue na velocidade inicial
+            pass
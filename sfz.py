@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Instrumentos SFZ no sampler interno, com amostras mapeadas em memória.
+
+O arquivo .sfz é lido uma vez: os opcodes de <global>, <master> e <group>
+valem para as <region> seguintes. Cada região vira uma entrada de uma tabela
+(nota x velocidade) -> conjunto de regiões, com os passos do round-robin
+(seq_length/seq_position) já resolvidos; no note_on a escolha das regiões é
+uma consulta indexada.
+
+As amostras não são lidas para a RAM: do WAV só se lê o cabeçalho e o bloco
+de dados é mapeado com mmap. O sistema traz do disco apenas as páginas
+tocadas, e o começo de cada região é pedido de antemão (MADV_WILLNEED) para
+o ataque não esperar pelo disco. Bibliotecas de vários GB carregam no tempo
+de ler os cabeçalhos.
+
+Opcodes usados: sample, default_path, key, lokey, hikey, lovel, hivel,
+pitch_keycenter, pitch_keytrack, seq_length, seq_position, volume,
+amplitude, offset, end e trigger (só regiões de ataque tocam); os demais
+são ignorados. Sem pitch_keycenter (nem key) a região toca sem transposição.
+
+Uso: python3 sfz.py kit.sfz [--render demo.wav] [--seconds 8] [--bpm 120]
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import sys
+
+import numpy as np
+
+from sampler import BLOCK_SIZE, MAX_VOICES, SAMPLE_RATE, VELOCITY_EXPONENT, Sampler, rock_pattern, write_wav
+
+# Frames do começo de cada região pedidos ao sistema no carregamento
+SFZ_PRELOAD_FRAMES = 8192
+
+NOTE_NAMES = {'c': 0, 'd': 2, 'e': 4, 'f': 5, 'g': 7, 'a': 9, 'b': 11}
+NOTE_PATTERN = re.compile(r'^([a-g])([#b]?)(-?\d+)$', re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r'<(\w+)>|(\w+)=')
+DEFINE_PATTERN = re.compile(r'^#define\s+(\$\w+)\s+(.*)$')
+INCLUDE_PATTERN = re.compile(r'^#include\s+"([^"]+)"')
+
+# Valores de cada região quando o opcode não aparece
+REGION_DEFAULTS = {
+    'lokey': 0, 'hikey': 127, 'lovel': 1, 'hivel': 127,
+    'seq_length': 1, 'seq_position': 1, 'volume': 0.0, 'amplitude': 100.0,
+    'offset': 0, 'end': -1, 'pitch_keycenter': None, 'pitch_keytrack': 100.0,
+    'trigger': 'attack',
+}
+KEY_OPCODES = ('key', 'lokey', 'hikey', 'pitch_keycenter')
+INT_OPCODES = ('lovel', 'hivel', 'seq_length', 'seq_position', 'offset', 'end')
+FLOAT_OPCODES = ('volume', 'amplitude', 'pitch_keytrack')
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_key(value):
+    """'36', 'c4' ou 'f#2' -> nota MIDI (c4 = 60)"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    match = NOTE_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"nota inválida: {value}")
+    name, accidental, octave = match.groups()
+    note = NOTE_NAMES[name.lower()] + (int(octave) + 1) * 12
+    return note + {'#': 1, 'b': -1}.get(accidental, 0)
+
+
+def _read_lines(path, root, defines):
+    """Linhas do arquivo sem comentários, com #include expandido e $variáveis trocadas"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    text = re.sub(r'/\*.*?\*/', ' ', text, flags=re.DOTALL)
+    for line in text.splitlines():
+        line = line.split('//', 1)[0].strip()
+        for name in sorted(defines, key=len, reverse=True):
+            line = line.replace(name, defines[name])
+        match = DEFINE_PATTERN.match(line)
+        if match:
+            defines[match.group(1)] = match.group(2).strip()
+            continue
+        match = INCLUDE_PATTERN.match(line)
+        if match:
+            yield from _read_lines(os.path.join(root, match.group(1).replace('\\', '/')), root, defines)
+            continue
+        if line:
+            yield line
+
+
+def _tokens(line):
+    """('header', nome) ou (opcode, valor); o valor vai até o próximo opcode ou cabeçalho"""
+    matches = list(TOKEN_PATTERN.finditer(line))
+    for i, match in enumerate(matches):
+        if match.group(1):
+            yield 'header', match.group(1).lower()
+        else:
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(line)
+            yield match.group(2).lower(), line[match.end():end].strip()
+
+
+def _region(opcodes, root):
+    """Opcodes acumulados -> região com os tipos e valores padrão resolvidos"""
+    region = dict(REGION_DEFAULTS)
+    for name, value in opcodes.items():
+        if name in KEY_OPCODES:
+            value = parse_key(value)
+        elif name in INT_OPCODES:
+            value = int(value)
+        elif name in FLOAT_OPCODES:
+            value = float(value)
+        region[name] = value
+    if 'key' in opcodes:
+        region['lokey'] = region['hikey'] = region['key']
+        if 'pitch_keycenter' not in opcodes:
+            region['pitch_keycenter'] = region['key']
+    sample = (opcodes.get('default_path', '') + opcodes['sample']).replace('\\', '/')
+    region['sample'] = os.path.normpath(os.path.join(root, sample))
+    return region
+
+
+def parse_sfz(path):
+    """Lista de regiões (dict) do arquivo, já com os opcodes de global/master/group aplicados"""
+    root = os.path.dirname(os.path.abspath(path))
+    # Escopos herdados, do mais externo ao mais interno
+    scopes = {'control': {}, 'global': {}, 'master': {}, 'group': {}}
+    order = ('control', 'global', 'master', 'group')
+    regions = []
+    scope = 'global'
+    current = None
+
+    def close_region():
+        if current is not None and 'sample' in current:
+            regions.append(_region(current, root))
+
+    for line in _read_lines(path, root, {}):
+        for name, value in _tokens(line):
+            if name != 'header':
+                target = current if current is not None else scopes[scope]
+                target[name] = value
+                continue
+            close_region()
+            current = None
+            if value == 'region':
+                current = {}
+                for s in order:
+                    current.update(scopes[s])
+                continue
+            scope = value if value in scopes else 'group'
+            # Um novo escopo apaga os internos a ele
+            for s in order[order.index(scope):]:
+                scopes[s] = {}
+    close_region()
+    return regions
+
+
+class MappedWav:
+    """Bloco de dados de um WAV mapeado em memória, (frames, canais), sem cópia"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+                raise ValueError(f"{path}: não é um WAV")
+            fmt = None
+            data_offset = data_size = None
+            while data_offset is None:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    raise ValueError(f"{path}: WAV sem bloco de dados")
+                chunk_id, size = struct.unpack('<4sI', chunk)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(size)
+                    f.seek(size & 1, os.SEEK_CUR)
+                elif chunk_id == b'data':
+                    data_offset, data_size = f.tell(), size
+                else:
+                    f.seek(size + (size & 1), os.SEEK_CUR)
+            if fmt is None:
+                raise ValueError(f"{path}: WAV sem bloco fmt")
+            tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                tag = struct.unpack('<H', fmt[24:26])[0]
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rate = rate
+        self.channels = channels
+        self.width = bits // 8
+        self.data_offset = data_offset
+        frame_bytes = self.width * channels
+        # Alguns gravadores deixam o tamanho errado: vale o que existe no arquivo
+        self.frames = min(data_size, len(self.mmap) - data_offset) // frame_bytes
+        count = self.frames * channels
+        if tag == WAVE_FORMAT_FLOAT and self.width == 4:
+            data, self.scale = np.frombuffer(self.mmap, '<f4', count, data_offset), 1.0
+        elif tag != WAVE_FORMAT_PCM:
+            raise ValueError(f"{path}: formato {tag} não suportado")
+        elif self.width == 1:
+            data, self.scale = np.frombuffer(self.mmap, np.uint8, count, data_offset), 1.0 / 128.0
+        elif self.width == 2:
+            data, self.scale = np.frombuffer(self.mmap, '<i2', count, data_offset), 1.0 / 32768.0
+        elif self.width == 3:
+            data = np.frombuffer(self.mmap, np.uint8, count * 3, data_offset).reshape(-1, 3)
+            self.scale = 1.0 / 8388608.0
+        elif self.width == 4:
+            data, self.scale = np.frombuffer(self.mmap, '<i4', count, data_offset), 1.0 / 2147483648.0
+        else:
+            raise ValueError(f"{path}: {bits} bits por amostra não suportado")
+        # Só os dois primeiros canais; mono fica (frames, 1) e soma nos dois lados
+        self.data = data.reshape(self.frames, channels, *data.shape[1:])[:, :2]
+
+    @property
+    def nbytes(self):
+        return self.frames * self.channels * self.width
+
+    def to_float(self, chunk):
+        """Trecho de ``data`` -> float32 (frames, 1 ou 2)"""
+        if self.width == 3:
+            b = chunk.astype(np.int32)
+            chunk = (b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)) << 8 >> 8
+        elif self.width == 1:
+            chunk = chunk.astype(np.float32) - 128.0
+        return chunk.astype(np.float32) * self.scale
+
+    def prefetch(self, start, frames):
+        """Pede ao sistema as páginas de ``frames`` frames a partir de ``start``"""
+        if not hasattr(self.mmap, 'madvise') or not hasattr(mmap, 'MADV_WILLNEED'):
+            return
+        frame_bytes = self.width * self.channels
+        begin = self.data_offset + start * frame_bytes
+        aligned = begin - begin % mmap.PAGESIZE
+        length = min(begin + frames * frame_bytes, len(self.mmap)) - aligned
+        if length > 0:
+            self.mmap.madvise(mmap.MADV_WILLNEED, aligned, length)
+
+    def close(self):
+        self.data = None
+        self.mmap.close()
+
+
+def _raise_file_limit(files):
+    """Cada amostra mapeada mantém um descritor aberto: sobe o limite do processo se preciso"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = files + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        except (ValueError, OSError):
+            pass
+
+
+class SfzSampler(Sampler):
+    """Sampler com as regiões de um .sfz; cada voz lê direto da amostra mapeada"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, voices=MAX_VOICES, block=BLOCK_SIZE):
+        super().__init__(sample_rate, voices, block)
+        self.regions = []
+        self.sources = []
+        self.missing = []
+        # Por região: amostra, início e fim (frames), ganho, centro do tom e oitavas por nota
+        self._r_source = np.zeros(0, dtype=np.int32)
+        self._r_start = np.zeros(0, dtype=np.int64)
+        self._r_end = np.zeros(0, dtype=np.int64)
+        self._r_gain = np.zeros(0, dtype=np.float32)
+        self._r_center = np.zeros(0, dtype=np.float64)
+        self._r_track = np.zeros(0, dtype=np.float64)
+        self._r_rate = np.zeros(0, dtype=np.float64)
+        # Vozes: amostra, posição e fim (frames da amostra, fracionários) e passo por frame
+        self._v_source = np.zeros(voices, dtype=np.int32)
+        self._v_pos = np.zeros(voices, dtype=np.float64)
+        self._v_end = np.zeros(voices, dtype=np.float64)
+        self._v_step = np.ones(voices, dtype=np.float64)
+
+    @property
+    def mapped_bytes(self):
+        return sum(source.nbytes for source in self.sources)
+
+    def load(self, path):
+        """Lê o .sfz, mapeia as amostras e monta a tabela (nota x velocidade); retorna as regiões"""
+        regions = [r for r in parse_sfz(path) if r['trigger'] == 'attack']
+        paths = sorted({r['sample'] for r in regions})
+        _raise_file_limit(len(paths))
+        index = {}
+        for sample in paths:
+            try:
+                index[sample] = len(self.sources)
+                self.sources.append(MappedWav(sample))
+            except (OSError, ValueError) as e:
+                del index[sample]
+                self.missing.append(f"{sample}: {e}")
+        self.regions = [r for r in regions if r['sample'] in index]
+        self._build_regions(index)
+        self._build_index()
+        return len(self.regions)
+
+    def _build_regions(self, index):
+        n = len(self.regions)
+        self._r_source = np.zeros(n, dtype=np.int32)
+        self._r_start = np.zeros(n, dtype=np.int64)
+        self._r_end = np.zeros(n, dtype=np.int64)
+        self._r_gain = np.zeros(n, dtype=np.float32)
+        self._r_center = np.zeros(n, dtype=np.float64)
+        self._r_track = np.zeros(n, dtype=np.float64)
+        self._r_rate = np.zeros(n, dtype=np.float64)
+        for i, r in enumerate(self.regions):
+            source = self.sources[index[r['sample']]]
+            end = source.frames if r['end'] < 0 else min(r['end'] + 1, source.frames)
+            start = min(max(r['offset'], 0), end)
+            self._r_source[i] = index[r['sample']]
+            self._r_start[i] = start
+            self._r_end[i] = end
+            self._r_gain[i] = 10.0 ** (r['volume'] / 20.0) * r['amplitude'] / 100.0
+            if r['pitch_keycenter'] is not None:
+                self._r_center[i] = r['pitch_keycenter']
+                self._r_track[i] = r['pitch_keytrack'] / 1200.0
+            self._r_rate[i] = source.rate / self.sample_rate
+            source.prefetch(start, SFZ_PRELOAD_FRAMES)
+
+    def _build_index(self):
+        """(nota, velocidade) -> conjunto de regiões; conjuntos iguais são compartilhados"""
+        cells = {}
+        for i, r in enumerate(self.regions):
+            for note in range(max(r['lokey'], 0), min(r['hikey'], 127) + 1):
+                for vel in range(max(r['lovel'], 1), min(r['hivel'], 127) + 1):
+                    cells.setdefault((note, vel), []).append(i)
+        layer = np.full((128, 128), -1, dtype=np.int32)
+        sets = {}
+        for (note, vel), ids in cells.items():
+            layer[note, vel] = sets.setdefault(tuple(ids), len(sets))
+        steps = [None] * len(sets)
+        for ids, k in sets.items():
+            # Passo k do round-robin: regiões sem sequência e as de seq_position k+1
+            length = max(self.regions[i]['seq_length'] for i in ids)
+            steps[k] = tuple(tuple(i for i in ids if self.regions[i]['seq_length'] <= 1
+                                   or step % self.regions[i]['seq_length'] + 1 == self.regions[i]['seq_position'])
+                             for step in range(length))
+        self._layer, self._layer_samples, self._layer_next = layer, steps, [0] * len(steps)
+
+    def lookup(self, note, vel):
+        """Regiões da próxima batida (nota, vel), sem avançar o round-robin"""
+        layer = self._layer[note, vel]
+        if layer < 0:
+            return ()
+        steps = self._layer_samples[layer]
+        return steps[self._layer_next[layer] % len(steps)]
+
+    def _start_voice(self, note, vel):
+        layer = self._layer[note, vel]
+        if layer < 0:
+            return
+        steps = self._layer_samples[layer]
+        step = self._layer_next[layer]
+        self._layer_next[layer] = (step + 1) % len(steps)
+        gain = (vel / 127.0) ** VELOCITY_EXPONENT
+        for r in steps[step]:
+            v = self._alloc_voice()
+            ratio = self._r_rate[r] * 2.0 ** ((note - self._r_center[r]) * self._r_track[r])
+            self._v_source[v] = self._r_source[r]
+            self._v_pos[v] = self._r_start[r]
+            self._v_end[v] = self._r_end[r]
+            self._v_step[v] = ratio
+            self._v_gain[v] = gain * self._r_gain[r]
+        self.played += 1
+
+    def render_block(self):
+        """Próximo bloco (block, 2); cada voz lê só o trecho que toca da amostra mapeada"""
+        for _, note, vel, _ in self._events.drain():
+            if vel:
+                self._start_voice(note, vel)
+        active = np.flatnonzero(self._v_age >= 0)
+        if not len(active):
+            return self._silence
+        mixed = np.zeros((self.block, 2), dtype=np.float32)
+        block = self.block
+        for v in active.tolist():
+            source = self.sources[self._v_source[v]]
+            pos = self._v_pos[v]
+            end = self._v_end[v]
+            step = self._v_step[v]
+            if step == 1.0:
+                start = int(pos)
+                chunk = source.data[start:min(start + block, int(end))]
+            else:
+                # Outra taxa ou outro tom: vizinho mais próximo na amostra
+                index = (pos + self._ramp * step).astype(np.int64)
+                chunk = source.data[index[index < end]]
+            mixed[:len(chunk)] += source.to_float(chunk) * self._v_gain[v]
+            pos += block * step
+            if pos >= end:
+                self._v_age[v] = -1
+            else:
+                self._v_pos[v] = pos
+        mixed *= self.master_gain
+        np.clip(mixed, -1.0, 1.0, out=mixed)
+        return mixed
+
+    def close(self):
+        for source in self.sources:
+            source.close()
+        self.sources = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sfz', help='arquivo .sfz')
+    parser.add_argument('--render', metavar='ARQUIVO', help='grava um ritmo de teste neste WAV')
+    parser.add_argument('--seconds', type=float, default=8.0)
+    parser.add_argument('--bpm', type=float, default=120.0)
+    parser.add_argument('--voices', type=int, default=MAX_VOICES)
+    args = parser.parse_args()
+
+    sampler = SfzSampler(voices=args.voices)
+    count = sampler.load(args.sfz)
+    for missing in sampler.missing:
+        print(f"Ignorada: {missing}")
+    print(f"{count} regiões, {len(sampler.sources)} amostras mapeadas "
+          f"({sampler.mapped_bytes / 1e6:.1f} MB), notas {sampler.notes()}")
+    if args.render:
+        audio = sampler.render_events(rock_pattern(args.bpm, args.seconds), args.seconds)
+        write_wav(args.render, audio, sampler.sample_rate)
+        print(f"{args.render}: {args.seconds:.1f} s, {sampler.played} batidas, {sampler.stolen} vozes roubadas")
+    sampler.close()
+    return 0 if count else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Fila de transmissão serial com confirmação por leitura de volta.
+
+Um thread dedicado é o único a escrever na porta. Mensagens avulsas (modo,
+licença, pedidos GET) são enviadas na ordem em que chegam. Parâmetros (SET ou
+SAVE) são enviados seguidos de um pedido ASKPARAM do mesmo (pin, param) e só
+são considerados concluídos quando a resposta traz o valor esperado: é a
+resposta do firmware que controla o ritmo, não pausas fixas. No máximo
+``window`` parâmetros ficam sem confirmação ao mesmo tempo; os que não forem
+confirmados no ``timeout`` são reenviados até ``max_retries`` vezes.
+
+Os callbacks de conclusão rodam no thread da fila.
+"""
+
+import collections
+import threading
+import time
+
+from protocol import CMD_ASKPARAM, CMD_SAVE, CMD_SET, sysex
+
+
+class WriteBatch:
+    """Grupo de parâmetros cujo resultado é informado de uma só vez"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.total = 0
+        self.ok = 0
+        self.failed = []  # (pin, param, value)
+        self.started_at = time.monotonic()
+        self.elapsed = None
+
+    @property
+    def done(self):
+        return self.ok + len(self.failed) >= self.total
+
+
+class _Item:
+    __slots__ = ('pin', 'param', 'value', 'frame', 'batch', 'deadline', 'tries')
+
+    def __init__(self, pin, param, value, frame, batch):
+        self.pin = pin
+        self.param = param
+        self.value = value
+        self.frame = frame
+        self.batch = batch
+        self.deadline = 0.0
+        self.tries = 0
+
+
+class SerialWriteQueue:
+    """Thread dono das escritas em uma porta serial"""
+
+    def __init__(self, ser, window=4, timeout=0.25, max_retries=2, verify=True, on_error=None):
+        self.ser = ser
+        self.window = window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.verify = verify
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._raw = collections.deque()
+        self._queue = collections.deque()
+        self._inflight = {}  # (pin, param) -> _Item
+        self._finished = []  # lotes concluídos, avisados pelo thread da fila
+        self._running = False
+        self._thread = None
+        self.frames_written = 0
+        self.bytes_written = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SerialTx", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Para o thread; parâmetros ainda não enviados são descartados"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def pending(self):
+        with self._cond:
+            return len(self._raw) + len(self._queue) + len(self._inflight)
+
+    def write(self, data):
+        """Enfileira bytes para envio imediato, sem confirmação"""
+        with self._cond:
+            self._raw.append(bytes(data))
+            self._cond.notify()
+
+    def set_params(self, params, save=False, callback=None):
+        """Enfileira uma lista de (pin, param, value); callback(batch) ao concluir todos"""
+        code = CMD_SAVE if save else CMD_SET
+        batch = WriteBatch(callback)
+        with self._cond:
+            for pin, param, value in params:
+                self._queue.append(_Item(pin, param, value, sysex(code, pin, param, value), batch))
+                batch.total += 1
+            if batch.total == 0:
+                self._complete(batch)
+            self._cond.notify()
+        return batch
+
+    def set_param(self, pin, param, value, save=False, callback=None):
+        return self.set_params([(pin, param, value)], save, callback)
+
+    def on_reply(self, pin, param, value):
+        """Resposta ASKPARAM recebida; retorna True se confirmou um parâmetro enviado"""
+        with self._cond:
+            item = self._inflight.get((pin, param))
+            if item is None or item.value != value:
+                return False
+            del self._inflight[(pin, param)]
+            self._resolve(item, True)
+            self._cond.notify()
+            return True
+
+    def _resolve(self, item, ok):
+        # Chamado com o lock adquirido
+        batch = item.batch
+        if ok:
+            batch.ok += 1
+        else:
+            batch.failed.append((item.pin, item.param, item.value))
+        if batch.done:
+            self._complete(batch)
+
+    def _complete(self, batch):
+        batch.elapsed = time.monotonic() - batch.started_at
+        self._finished.append(batch)
+
+    def _next_deadline(self):
+        if not self._inflight:
+            return None
+        return min(item.deadline for item in self._inflight.values())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._raw or self._finished:
+                        break
+                    if self._queue and len(self._inflight) < self.window \
+                            and (self._queue[0].pin, self._queue[0].param) not in self._inflight:
+                        break
+                    deadline = self._next_deadline()
+                    now = time.monotonic()
+                    if deadline is not None and deadline <= now:
+                        break
+                    self._cond.wait(None if deadline is None else deadline - now)
+                if not self._running:
+                    return
+                raw = list(self._raw)
+                self._raw.clear()
+                send = []
+                now = time.monotonic()
+                # Reenvia (ou desiste de) parâmetros sem confirmação no prazo
+                for key, item in list(self._inflight.items()):
+                    if item.deadline > now:
+                        continue
+                    if item.tries > self.max_retries:
+                        del self._inflight[key]
+                        self._resolve(item, False)
+                    else:
+                        send.append(item)
+                # Completa a janela mantendo a ordem da fila
+                while self._queue and len(self._inflight) < self.window:
+                    item = self._queue[0]
+                    key = (item.pin, item.param)
+                    if key in self._inflight:
+                        break
+                    self._queue.popleft()
+                    self._inflight[key] = item
+                    send.append(item)
+                for item in send:
+                    item.tries += 1
+                    item.deadline = now + self.timeout
+                finished = self._finished
+                self._finished = []
+
+            try:
+                for data in raw:
+                    self._write(data)
+                for item in send:
+                    self._write(item.frame)
+                    if self.verify:
+                        self._write(sysex(CMD_ASKPARAM, item.pin, item.param))
+                if send and not self.verify:
+                    # Sem leitura de volta: considera concluído quando a porta escoou os bytes
+                    self.ser.flush()
+                    with self._cond:
+                        for item in send:
+                            if self._inflight.pop((item.pin, item.param), None) is item:
+                                self._resolve(item, True)
+                        finished.extend(self._finished)
+                        self._finished = []
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                with self._cond:
+                    # Porta indisponível: falha tudo o que estava pendente
+                    for item in list(self._inflight.values()) + list(self._queue):
+                        self._resolve(item, False)
+                    self._inflight.clear()
+                    self._queue.clear()
+                    finished.extend(self._finished)
+                    self._finished = []
+
+            for batch in finished:
+                if batch.callback is not None:
+                    try:
+                        batch.callback(batch)
+                    except Exception as e:
+                        print(f"Erro no callback da fila serial: {e}")
+
+    def _write(self, data):
+        self.ser.write(data)
+        self.frames_written += 1
+        self.bytes_written += len(data)
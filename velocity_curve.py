@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Curvas de velocidade calculadas no host.
+
+Cada pad tem uma tabela (LUT) de 128 posições: velocidade recebida ->
+velocidade enviada, gerada com NumPy a partir de curve, curveform e gain do
+PIN ou de uma curva desenhada pelo usuário (pontos interpolados). As tabelas
+são refeitas só quando esses campos mudam; pads com a mesma configuração
+compartilham a mesma tabela.
+
+No envio, a curva é uma consulta em duas tabelas indexadas (nota -> LUT,
+velocidade -> valor), sem cálculo por batida. O firmware também aplica curve
+e gain: ao ligar as curvas no host, deixe a curva do Arduino em Linear com
+ganho 0 para não aplicar a curva duas vezes.
+"""
+
+import json
+
+import numpy as np
+
+from kit import DISABLED_TYPES
+
+CURVE_LINEAR = 0
+CURVE_EXP = 1
+CURVE_LOG = 2
+CURVE_SIGMA = 3
+CURVE_FLAT = 4
+CURVE_NAMES = ("Linear", "Exp", "Log", "Sigma", "Flat")
+
+# Arquivo das curvas desenhadas, ao lado do pins.ini
+CUSTOM_CURVES_FILE = "curves.json"
+
+# Tabela sem alteração, usada para notas sem pad
+IDENTITY_LUT = bytes(range(128))
+
+_X = np.arange(128, dtype=np.float64) / 127.0
+
+
+def _finish(y):
+    """[0,1] -> bytes de 0-127; velocidade 0 continua 0 (note off) e as outras ao menos 1"""
+    lut = np.rint(np.clip(y, 0.0, 1.0) * 127.0).astype(np.uint8)
+    lut[1:] = np.maximum(lut[1:], 1)
+    lut[0] = 0
+    return lut.tobytes()
+
+
+def curve_lut(curve, curveform, gain=0):
+    """LUT de uma curva pré-definida; curveform (0-127) ajusta a forma, gain amplifica a entrada"""
+    f = min(max(curveform, 0), 127) / 127.0
+    x = np.minimum(_X * (1.0 + max(gain, 0) / 64.0), 1.0)
+    if curve == CURVE_EXP:
+        a = 0.5 + 6.0 * f
+        y = np.expm1(a * x) / np.expm1(a)
+    elif curve == CURVE_LOG:
+        a = 1.0 + 60.0 * f
+        y = np.log1p(a * x) / np.log1p(a)
+    elif curve == CURVE_SIGMA:
+        a = 2.0 + 18.0 * f
+        s = 1.0 / (1.0 + np.exp(-a * (x - 0.5)))
+        lo = 1.0 / (1.0 + np.exp(a * 0.5))
+        y = (s - lo) / (1.0 - 2.0 * lo)
+    elif curve == CURVE_FLAT:
+        # Comprime a dinâmica: curveform é a velocidade mínima
+        y = f + (1.0 - f) * x
+    else:
+        y = x
+    return _finish(y)
+
+
+def custom_lut(points):
+    """LUT de uma curva desenhada: pontos (entrada, saída) de 0-127, interpolados"""
+    points = sorted((int(x), int(y)) for x, y in points)
+    if not points:
+        return IDENTITY_LUT
+    xs = np.array([p[0] for p in points], dtype=np.float64)
+    ys = np.array([p[1] for p in points], dtype=np.float64)
+    return _finish(np.interp(_X * 127.0, xs, ys) / 127.0)
+
+
+def load_custom_curves(path=CUSTOM_CURVES_FILE):
+    """{pad: [(entrada, saída), ...]}; vazio se o arquivo não existir"""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    return {int(pad): [tuple(p) for p in points] for pad, points in data.items()}
+
+
+def save_custom_curves(curves, path=CUSTOM_CURVES_FILE):
+    with open(path, "w") as f:
+        json.dump({str(pad): [list(p) for p in points] for pad, points in sorted(curves.items())}, f, indent=1)
+
+
+class VelocityCurves:
+    """LUTs por pad e tabela nota -> LUT consultada no envio de cada batida"""
+
+    def __init__(self, pins, custom=None):
+        self.pins = pins
+        self.custom = dict(custom or {})
+        # Cache (curve, curveform, gain) ou pontos -> LUT: só combinações novas são calculadas
+        self._cache = {}
+        self.luts = [IDENTITY_LUT] * len(pins)
+        self.by_note = (IDENTITY_LUT,) * 128
+        self.rebuild()
+
+    def pad_lut(self, pad):
+        points = self.custom.get(pad)
+        if points:
+            key = tuple(points)
+            lut = self._cache.get(key)
+            if lut is None:
+                lut = self._cache[key] = custom_lut(points)
+            return lut
+        pin = self.pins[pad]
+        key = (pin.curve, pin.curveform, pin.gain)
+        lut = self._cache.get(key)
+        if lut is None:
+            lut = self._cache[key] = curve_lut(*key)
+        return lut
+
+    def rebuild(self):
+        """Recalcula as tabelas após mudança de curve/curveform/gain, nota ou tipo"""
+        luts = [self.pad_lut(i) for i in range(len(self.pins))]
+        by_note = [IDENTITY_LUT] * 128
+        # O primeiro pad habilitado de cada nota define a curva da nota, como no Monitor
+        for i in reversed(range(len(self.pins))):
+            pin = self.pins[i]
+            if pin.type not in DISABLED_TYPES and 0 <= pin.note < 128:
+                by_note[pin.note] = luts[i]
+        # Troca as referências de uma vez: o thread de leitura pode estar consultando
+        self.luts = luts
+        self.by_note = tuple(by_note)
+
+    def set_custom(self, pad, points):
+        self.custom[pad] = list(points)
+        self.rebuild()
+
+    def clear_custom(self, pad):
+        if self.custom.pop(pad, None) is not None:
+            self.rebuild()
+
+    def apply(self, note, vel):
+        return self.by_note[note][vel]